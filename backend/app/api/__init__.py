@@ -1,9 +1,13 @@
 from fastapi import APIRouter
-from .routes import health, generation, fork, schemas, prompts
+from .routes import health, generation, fork, schemas, prompts, jobs, export, history, search
 
 api_router = APIRouter()
 api_router.include_router(health.router, tags=["health"])
 api_router.include_router(generation.router, prefix="/cognition", tags=["cognition"])
 api_router.include_router(fork.router, prefix="/cognition", tags=["cognition"])
+api_router.include_router(search.router, prefix="/cognition", tags=["cognition"])
 api_router.include_router(schemas.router, prefix="/schemas", tags=["schemas"])
-api_router.include_router(prompts.router, prefix="/prompts", tags=["prompts"])
\ No newline at end of file
+api_router.include_router(prompts.router, prefix="/prompts", tags=["prompts"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(export.router, prefix="/export", tags=["export"])
+api_router.include_router(history.router, prefix="/sequences", tags=["history"])
\ No newline at end of file
@@ -0,0 +1,38 @@
+import asyncio
+from fastapi import APIRouter, HTTPException
+from ...core.schema.base import ResponseModel
+from ...core.schema.export import ExportRequest, ExportResult
+from ...core.utils.logger import app_logger
+from ...services.memory.export import ParquetExporter, parquet_exporter, parquet_available
+
+router = APIRouter()
+
+@router.post("/parquet", response_model=ResponseModel)
+async def export_parquet(request: ExportRequest):
+    """
+    Export the stored sequences, rows and beliefs as three linked Parquet tables.
+    
+    Args:
+        request: The export request, optionally overriding the record batch size
+        
+    Returns:
+        ResponseModel containing the path and record count of each table
+    """
+    if not parquet_available():
+        raise HTTPException(status_code=503, detail="Parquet export requires the 'pyarrow' package")
+    
+    try:
+        exporter = parquet_exporter
+        if request.batch_size is not None:
+            exporter = ParquetExporter(parquet_exporter.store, request.batch_size)
+        
+        result = await asyncio.to_thread(exporter.export, exporter.default_output_dir())
+        
+        return ResponseModel(
+            success=True,
+            message=f"Exported to {result['output_dir']}",
+            data=ExportResult(**result)
+        )
+    except Exception as e:
+        app_logger.error(f"Error exporting sequences: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,10 +1,17 @@
 import time
+import json
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from ...core.schema.base import ResponseModel
-from ...core.schema.cognition import ForkRequest, ForkResponse, CognitionRow
+from ...core.schema.cognition import ForkRequest, ForkResponse, BatchForkRequest, BatchForkResponse, ForkTreeRequest
 from ...core.utils.logger import app_logger
 from ...core.engine.forker import forker
-from ...core.engine.validator import validator
+from ...core.engine.tree import tree_expander
+from ...core.engine.coalescer import coalescer
+from ...core.utils.config import settings
+from ...services.llm.client import DeadlineExceededError
+from ...services.llm.policy import deadline_scope
+from ...services.memory.sequences import sequence_repository
 
 router = APIRouter()
 
@@ -24,51 +31,197 @@ async def create_fork(request: ForkRequest):
         
         start_time = time.time()
         
-        # In a real implementation, we would fetch the row from a database
-        # For now, we'll create a mock row
-        original_row = CognitionRow(
-            id=request.row_id,
-            goal="Sample goal for forking",
-            beliefs=[],
-            operation="Reflect",
-            output="Sample output for forking"
-        )
-        
-        # Create forks
-        forks = await forker.create_forks(
-            row=original_row,
-            num_forks=request.num_forks,
-            fork_type=request.fork_type,
-            context=request.context
-        )
+        original_row = await sequence_repository.get_row(request.row_id, request.sequence_id)
+        if original_row is None:
+            raise HTTPException(status_code=404, detail=f"Row {request.row_id} not found in sequence {request.sequence_id}")
         
-        # Validate forks
-        valid_forks = []
-        for fork in forks:
-            if validator.validate_row(fork):
-                valid_forks.append(fork)
-            else:
-                app_logger.warning(f"Invalid fork generated for row {request.row_id}")
+        # Create forks, sharing the LLM calls of any identical request already in flight
+        with deadline_scope(request.timeout or settings.LLM_REQUEST_DEADLINE):
+            forks = await coalescer.do(
+                f"fork:{request.model_dump_json()}",
+                lambda: forker.create_forks(
+                    row=original_row,
+                    num_forks=request.num_forks,
+                    fork_type=request.fork_type,
+                    context=request.context,
+                    cache=request.use_cache
+                )
+            )
         
+        # Forks were validated while being parsed
         processing_time = time.time() - start_time
         
         response = ForkResponse(
-            forks=valid_forks,
+            forks=forks,
             metadata={
                 "model": forker.model,
                 "provider": forker.provider,
                 "processing_time": processing_time,
                 "fork_type": request.fork_type,
                 "total_generated": len(forks),
-                "valid_forks": len(valid_forks)
+                "valid_forks": len(forks)
             }
         )
         
         return ResponseModel(
             success=True,
-            message=f"Created {len(valid_forks)} forks successfully",
+            message=f"Created {len(forks)} forks successfully",
             data=response
         )
+    except HTTPException:
+        raise
+    except DeadlineExceededError as e:
+        app_logger.error(f"Fork deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         app_logger.error(f"Error creating forks: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/fork/batch", response_model=ResponseModel)
+async def create_batch_forks(request: BatchForkRequest):
+    """
+    Create forks of several rows of a stored sequence, or of all of its rows.
+    
+    Rows are packed into as few LLM calls as the token budget allows and the packed
+    calls run concurrently.
+    
+    Args:
+        request: The batch fork request containing sequence_id, optional row_ids, and parameters
+        
+    Returns:
+        ResponseModel containing the forks keyed by the id of the row they fork
+    """
+    try:
+        app_logger.info(f"Batch fork request received for sequence {request.sequence_id}")
+        
+        start_time = time.time()
+        
+        sequence = await sequence_repository.get(request.sequence_id)
+        if sequence is None:
+            raise HTTPException(status_code=404, detail=f"Sequence {request.sequence_id} not found")
+        
+        if request.row_ids is None:
+            rows = sequence.rows
+        else:
+            rows_by_id = {row.id: row for row in sequence.rows}
+            unknown = [str(row_id) for row_id in request.row_ids if row_id not in rows_by_id]
+            if unknown:
+                raise HTTPException(status_code=404, detail=f"Rows not found in sequence: {', '.join(unknown)}")
+            rows = [rows_by_id[row_id] for row_id in dict.fromkeys(request.row_ids)]
+        
+        # Create forks, sharing the LLM calls of any identical request already in flight
+        with deadline_scope(request.timeout or settings.LLM_REQUEST_DEADLINE):
+            forks = await coalescer.do(
+                f"fork_batch:{request.model_dump_json()}",
+                lambda: forker.create_batch_forks(
+                    rows=rows,
+                    num_forks=request.num_forks,
+                    fork_type=request.fork_type,
+                    context=request.context,
+                    cache=request.use_cache
+                )
+            )
+        
+        # Forks were validated while being parsed
+        valid_count = sum(len(row_forks) for row_forks in forks.values())
+        
+        processing_time = time.time() - start_time
+        
+        response = BatchForkResponse(
+            forks=forks,
+            metadata={
+                "model": forker.model,
+                "provider": forker.provider,
+                "processing_time": processing_time,
+                "fork_type": request.fork_type,
+                "rows": len(rows),
+                "total_generated": valid_count,
+                "valid_forks": valid_count
+            }
+        )
+        
+        return ResponseModel(
+            success=True,
+            message=f"Created {valid_count} forks of {len(rows)} rows successfully",
+            data=response
+        )
+    except HTTPException:
+        raise
+    except DeadlineExceededError as e:
+        app_logger.error(f"Batch fork deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        app_logger.error(f"Error creating batch forks: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/fork/tree")
+async def expand_fork_tree(request: ForkTreeRequest):
+    """
+    Expand a stored row into a tree of forks and stream the tree as newline-delimited JSON.
+    
+    Levels are expanded breadth-first; each level keeps the best `beam_width` rows by
+    the chosen scorer and stops when `max_depth` or the call/token budget is reached.
+    Every kept fork is emitted as {"type": "node", "depth": d, "score": s, "data": ...}
+    as soon as its packed call returns (its parent_id links it into the tree), each level
+    ends with a {"type": "level", ...} summary, and the stream always ends with a
+    {"type": "metadata", "data": ...} frame.
+    
+    Args:
+        request: The fork tree request containing the root row and expansion limits
+        
+    Returns:
+        StreamingResponse of application/x-ndjson frames
+    """
+    app_logger.info(f"Fork tree request received for row {request.row_id}")
+    
+    root = await sequence_repository.get_row(request.row_id, request.sequence_id)
+    if root is None:
+        raise HTTPException(status_code=404, detail=f"Row {request.row_id} not found in sequence {request.sequence_id}")
+    
+    async def frames():
+        start_time = time.time()
+        nodes = 0
+        depth_reached = 0
+        calls_used = 0
+        tokens_used = 0
+        
+        with deadline_scope(request.timeout or settings.LLM_REQUEST_DEADLINE):
+            try:
+                async for event in tree_expander.expand(
+                    root=root,
+                    max_depth=request.max_depth,
+                    branching=request.branching,
+                    beam_width=request.beam_width,
+                    max_calls=request.max_calls,
+                    max_tokens=request.max_tokens,
+                    min_score=request.min_score,
+                    scorer=request.scorer,
+                    fork_type=request.fork_type,
+                    context=request.context,
+                    cache=request.use_cache
+                ):
+                    if event["type"] == "node":
+                        nodes += 1
+                        event["data"] = event["data"].model_dump(mode="json")
+                    elif event["type"] == "level":
+                        depth_reached = event["depth"]
+                        calls_used = event["calls_used"]
+                        tokens_used = event["tokens_used"]
+                    yield json.dumps(event) + "\n"
+            except Exception as e:
+                app_logger.error(f"Error expanding fork tree: {str(e)}")
+                yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+        
+        metadata = {
+            "model": forker.model,
+            "provider": forker.provider,
+            "processing_time": time.time() - start_time,
+            "fork_type": request.fork_type,
+            "nodes": nodes,
+            "depth_reached": depth_reached,
+            "calls_used": calls_used,
+            "estimated_tokens_used": tokens_used
+        }
+        yield json.dumps({"type": "metadata", "data": metadata}) + "\n"
+    
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
@@ -1,10 +1,17 @@
 import time
+import json
+from typing import Literal
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from ...core.schema.base import ResponseModel
-from ...core.schema.cognition import GenerationRequest, GenerationResponse
+from ...core.schema.cognition import GenerationRequest, GenerationResponse, CognitionRow
 from ...core.utils.logger import app_logger
 from ...core.engine.generator import generator
-from ...core.engine.validator import validator
+from ...core.engine.coalescer import coalescer
+from ...core.utils.config import settings
+from ...services.llm.client import DeadlineExceededError
+from ...services.llm.policy import deadline_scope
+from ...services.memory.sequences import sequence_repository
 
 router = APIRouter()
 
@@ -24,41 +31,146 @@ async def generate_sequence(request: GenerationRequest):
         
         start_time = time.time()
         
-        # Generate sequences
-        sequences = await generator.generate_sequence(
-            context=request.context,
-            schema=request.schema,
-            n=request.n,
-            temperature=request.temperature
-        )
+        async def generate_and_save():
+            sequences = await generator.generate_sequence(
+                context=request.context,
+                schema=request.schema_config or None,
+                n=request.n,
+                temperature=request.temperature,
+                cache=request.use_cache
+            )
+            # Sequences were validated while being parsed; keep them so their rows can be forked later.
+            # Saved here, once, rather than by every request that joined the shared call
+            await sequence_repository.save(sequences)
+            return sequences
         
-        # Validate sequences
-        valid_sequences = []
-        for sequence in sequences:
-            if validator.validate_sequence(sequence):
-                valid_sequences.append(sequence)
-            else:
-                app_logger.warning(f"Invalid sequence generated: {sequence.title}")
+        # Generate sequences, sharing the LLM calls of any identical request already in flight
+        with deadline_scope(request.timeout or settings.LLM_REQUEST_DEADLINE):
+            sequences = await coalescer.do(f"generate:{request.model_dump_json()}", generate_and_save)
         
         processing_time = time.time() - start_time
         
         response = GenerationResponse(
-            sequences=valid_sequences,
+            sequences=sequences,
             metadata={
                 "model": generator.model,
                 "provider": generator.provider,
                 "processing_time": processing_time,
                 "temperature": request.temperature,
                 "total_generated": len(sequences),
-                "valid_sequences": len(valid_sequences)
+                "valid_sequences": len(sequences)
             }
         )
         
         return ResponseModel(
             success=True,
-            message=f"Generated {len(valid_sequences)} sequences successfully",
+            message=f"Generated {len(sequences)} sequences successfully",
             data=response
         )
+    except DeadlineExceededError as e:
+        app_logger.error(f"Generation deadline exceeded: {str(e)}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         app_logger.error(f"Error generating sequence: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate/stream")
+async def generate_sequence_stream(
+    request: GenerationRequest,
+    granularity: Literal["sequence", "row"] = "sequence"
+):
+    """
+    Generate cognition sequences and stream them as newline-delimited JSON.
+    
+    With granularity "sequence", each validated sequence is emitted as soon as its LLM
+    request finishes, in completion order, as {"type": "sequence", "index": i, "data": ...}.
+    With granularity "row", the completions themselves are streamed and every row is
+    emitted as {"type": "row", "stream": k, "data": ...} the moment it is parsed, followed
+    by the validated sequence for stream k, or by an error frame if that stream was aborted
+    or dropped (as a near-duplicate, or once enough sequences are done), in which case its
+    rows should be discarded. Every sequence frame is saved before it is sent, so its rows
+    can be forked. The stream always ends with a {"type": "metadata", "data": ...} frame.
+    
+    Args:
+        request: The generation request containing context, schema, and parameters
+        granularity: Whether to emit whole sequences or individual rows
+        
+    Returns:
+        StreamingResponse of application/x-ndjson frames
+    """
+    app_logger.info(f"Streaming generation request received with context: {request.context[:50]}...")
+    
+    async def frames():
+        start_time = time.time()
+        total_generated = 0
+        valid_sequences = 0
+        rows_streamed = 0
+        first_result_time = None
+        schema = request.schema_config or None
+        
+        with deadline_scope(request.timeout or settings.LLM_REQUEST_DEADLINE):
+            try:
+                if granularity == "row":
+                    events = generator.iter_row_events(
+                        context=request.context,
+                        schema=schema,
+                        n=request.n,
+                        temperature=request.temperature,
+                        cache=request.use_cache
+                    )
+                else:
+                    events = (
+                        (None, sequence)
+                        async for sequence in generator.iter_sequences(
+                            context=request.context,
+                            schema=schema,
+                            n=request.n,
+                            temperature=request.temperature,
+                            cache=request.use_cache
+                        )
+                    )
+                
+                async for stream_index, item in events:
+                    if first_result_time is None:
+                        first_result_time = time.time() - start_time
+                
+                    if isinstance(item, Exception):
+                        yield json.dumps({"type": "error", "stream": stream_index, "message": str(item)}) + "\n"
+                        continue
+                
+                    if isinstance(item, CognitionRow):
+                        rows_streamed += 1
+                        frame = {"type": "row", "stream": stream_index, "data": item.model_dump(mode="json")}
+                        yield json.dumps(frame) + "\n"
+                        continue
+                
+                    total_generated += 1
+                    await sequence_repository.save([item])
+                    frame = {
+                        "type": "sequence",
+                        "index": valid_sequences,
+                        "data": item.model_dump(mode="json")
+                    }
+                    if stream_index is not None:
+                        frame["stream"] = stream_index
+                    valid_sequences += 1
+                    yield json.dumps(frame) + "\n"
+            except Exception as e:
+                app_logger.error(f"Error streaming sequences: {str(e)}")
+                yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+        
+        metadata = {
+            "model": generator.model,
+            "provider": generator.provider,
+            "processing_time": time.time() - start_time,
+            "first_result_time": first_result_time,
+            "temperature": request.temperature,
+            "granularity": granularity,
+            "requested": request.n,
+            "total_generated": total_generated,
+            "valid_sequences": valid_sequences,
+            "rows_streamed": rows_streamed
+        }
+        yield json.dumps({"type": "metadata", "data": metadata}) + "\n"
+    
+    return StreamingResponse(frames(), media_type="application/x-ndjson")
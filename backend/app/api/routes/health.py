@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from ...core.schema.base import ResponseModel
+from ...services.llm.client import llm_client
 
 router = APIRouter()
 
@@ -9,5 +10,10 @@ async def health_check():
     return ResponseModel(
         success=True,
         message="SimForge API is running",
-        data={"status": "healthy"}
+        data={
+            "status": "healthy",
+            "llm_limiter": llm_client.limiter.stats(),
+            "llm_cache": llm_client.cache.stats(),
+            "llm_endpoints": llm_client.registry.stats()
+        }
     )
\ No newline at end of file
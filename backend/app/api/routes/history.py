@@ -0,0 +1,159 @@
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, HTTPException
+from ...core.schema.base import ResponseModel
+from ...core.schema.history import EditRequest
+from ...core.utils.logger import app_logger
+from ...core.engine.history import history_manager
+
+router = APIRouter()
+
+async def _history(sequence_id: UUID):
+    history = await history_manager.get(sequence_id)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"Sequence not found: {sequence_id}")
+    return history
+
+def _result(result, sequence_id: UUID, action: str) -> ResponseModel:
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Sequence not found: {sequence_id}")
+    version, sequence = result
+    return ResponseModel(
+        success=True,
+        message=f"{action} sequence {sequence_id}, now at version {version.number}",
+        data={"version": version.info(head=True), "sequence": sequence}
+    )
+
+@router.post("/{sequence_id}/edits", response_model=ResponseModel)
+async def edit_sequence(sequence_id: UUID, request: EditRequest):
+    """
+    Apply edits to a stored sequence as one new version.
+    
+    Args:
+        sequence_id: ID of the sequence
+        request: The edit operations and an optional message
+        
+    Returns:
+        ResponseModel containing the new version and the edited sequence
+    """
+    try:
+        app_logger.info(f"Edit request received for sequence {sequence_id} with {len(request.operations)} operations")
+        result = await history_manager.commit(sequence_id, request.operations, request.message)
+        return _result(result, sequence_id, "Edited")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        app_logger.error(f"Error editing sequence {sequence_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{sequence_id}/undo", response_model=ResponseModel)
+async def undo_edit(sequence_id: UUID):
+    """
+    Undo the latest version of a sequence.
+    
+    Args:
+        sequence_id: ID of the sequence
+        
+    Returns:
+        ResponseModel containing the head version and the sequence after the undo
+    """
+    try:
+        return _result(await history_manager.undo(sequence_id), sequence_id, "Undid edit of")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        app_logger.error(f"Error undoing edit of sequence {sequence_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{sequence_id}/redo", response_model=ResponseModel)
+async def redo_edit(sequence_id: UUID):
+    """
+    Redo the version of a sequence last undone.
+    
+    Args:
+        sequence_id: ID of the sequence
+        
+    Returns:
+        ResponseModel containing the head version and the sequence after the redo
+    """
+    try:
+        return _result(await history_manager.redo(sequence_id), sequence_id, "Redid edit of")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        app_logger.error(f"Error redoing edit of sequence {sequence_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{sequence_id}/versions", response_model=ResponseModel)
+async def list_versions(sequence_id: UUID):
+    """
+    List the versions in a sequence's edit history.
+    
+    Args:
+        sequence_id: ID of the sequence
+        
+    Returns:
+        ResponseModel containing the versions, oldest first
+    """
+    history = await _history(sequence_id)
+    versions = history.versions()
+    return ResponseModel(
+        success=True,
+        message=f"Found {len(versions)} versions",
+        data=versions
+    )
+
+@router.get("/{sequence_id}/versions/{version}", response_model=ResponseModel)
+async def get_version(sequence_id: UUID, version: int):
+    """
+    Get a sequence as of a version.
+    
+    Args:
+        sequence_id: ID of the sequence
+        version: The version number
+        
+    Returns:
+        ResponseModel containing the sequence at that version
+    """
+    history = await _history(sequence_id)
+    try:
+        sequence = history.checkout(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Version {version} not found for sequence {sequence_id}")
+    return ResponseModel(
+        success=True,
+        message=f"Sequence {sequence_id} at version {version}",
+        data=sequence
+    )
+
+@router.get("/{sequence_id}/diff", response_model=ResponseModel)
+async def diff_versions(sequence_id: UUID, from_version: int, to_version: Optional[int] = None):
+    """
+    Compare two versions of a sequence.
+    
+    Args:
+        sequence_id: ID of the sequence
+        from_version: The version to compare from
+        to_version: The version to compare to (defaults to the head)
+        
+    Returns:
+        ResponseModel containing the differences
+    """
+    history = await _history(sequence_id)
+    if to_version is None:
+        to_version = history.head.number
+    try:
+        diff = history.diff(from_version, to_version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Version {e.args[0]} not found for sequence {sequence_id}")
+    return ResponseModel(
+        success=True,
+        message=f"Compared versions {from_version} and {to_version}",
+        data=diff
+    )
@@ -0,0 +1,130 @@
+import os
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from ...core.schema.base import ResponseModel
+from ...core.schema.jobs import JobRequest
+from ...core.utils.logger import app_logger
+from ...core.engine.jobs import job_manager
+
+router = APIRouter()
+
+@router.post("", response_model=ResponseModel)
+async def submit_job(request: JobRequest):
+    """
+    Submit a bulk generation job.
+    
+    Args:
+        request: The job request containing the contexts and generation parameters
+        
+    Returns:
+        ResponseModel containing the job status
+    """
+    try:
+        app_logger.info(f"Job request received with {len(request.contexts)} contexts")
+        
+        job = await job_manager.submit(request)
+        
+        return ResponseModel(
+            success=True,
+            message=f"Job {job.id} submitted",
+            data=job
+        )
+    except Exception as e:
+        app_logger.error(f"Error submitting job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("", response_model=ResponseModel)
+async def list_jobs(limit: int = 50):
+    """
+    List the most recent jobs.
+    
+    Args:
+        limit: Maximum number of jobs to return
+        
+    Returns:
+        ResponseModel containing the job statuses
+    """
+    try:
+        jobs = await job_manager.list_jobs(limit)
+        
+        return ResponseModel(
+            success=True,
+            message=f"Found {len(jobs)} jobs",
+            data=jobs
+        )
+    except Exception as e:
+        app_logger.error(f"Error listing jobs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{job_id}", response_model=ResponseModel)
+async def get_job(job_id: str):
+    """
+    Get the status and progress counts of a job.
+    
+    Args:
+        job_id: The id of the job
+        
+    Returns:
+        ResponseModel containing the job status
+    """
+    try:
+        job = await job_manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+        
+        return ResponseModel(
+            success=True,
+            message=f"Job {job_id} is {job.status}",
+            data=job
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        app_logger.error(f"Error getting job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{job_id}/cancel", response_model=ResponseModel)
+async def cancel_job(job_id: str):
+    """
+    Cancel a job. Results already written are kept.
+    
+    Args:
+        job_id: The id of the job
+        
+    Returns:
+        ResponseModel containing the job status
+    """
+    try:
+        job = await job_manager.cancel(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+        
+        return ResponseModel(
+            success=True,
+            message=f"Job {job_id} is {job.status}",
+            data=job
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        app_logger.error(f"Error cancelling job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{job_id}/results")
+async def get_job_results(job_id: str):
+    """
+    Download the JSONL results written so far for a job.
+    
+    Args:
+        job_id: The id of the job
+        
+    Returns:
+        The job's JSONL output file
+    """
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if not os.path.exists(job.output_path):
+        raise HTTPException(status_code=404, detail=f"No results written yet for job {job_id}")
+    
+    return FileResponse(job.output_path, media_type="application/x-ndjson", filename=f"{job_id}.jsonl")
@@ -1,10 +1,12 @@
 import os
 import json
+import asyncio
 from fastapi import APIRouter, HTTPException
 from ...core.schema.base import ResponseModel
-from ...core.schema.cognition import SchemaResponse
+from ...core.schema.cognition import SchemaResponse, SchemaValidationRequest, SchemaValidationResult
 from ...core.utils.logger import app_logger
 from ...core.utils.config import settings
+from ...core.engine.validator import validator
 
 router = APIRouter()
 
@@ -91,4 +93,39 @@ async def get_schema(schema_name: str):
         raise
     except Exception as e:
         app_logger.error(f"Error getting schema {schema_name}: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/{schema_name}/validate", response_model=ResponseModel)
+async def validate_documents(schema_name: str, request: SchemaValidationRequest):
+    """
+    Validate documents against a schema, compiling the schema once for the whole batch.
+    
+    Args:
+        schema_name: The name of the schema to validate against
+        request: The documents to validate
+        
+    Returns:
+        ResponseModel containing one result per document, in order
+    """
+    schema_path = os.path.join(settings.SCHEMAS_DIR, f"{schema_name}.json")
+    if not os.path.exists(schema_path):
+        raise HTTPException(status_code=404, detail=f"Schema not found: {schema_name}")
+    
+    schema = validator.load_schema_from_file(schema_path)
+    if schema is None:
+        raise HTTPException(status_code=500, detail=f"Error loading schema: {schema_name}")
+    
+    try:
+        results = await asyncio.to_thread(validator.validate_many_against_schema, request.documents, schema)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid schema {schema_name}: {str(e)}")
+    except Exception as e:
+        app_logger.error(f"Error validating documents against {schema_name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    valid = sum(1 for ok, _ in results if ok)
+    return ResponseModel(
+        success=True,
+        message=f"{valid} of {len(results)} documents are valid",
+        data=[SchemaValidationResult(valid=ok, errors=errors) for ok, errors in results]
+    )
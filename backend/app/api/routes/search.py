@@ -0,0 +1,102 @@
+import asyncio
+from typing import List, Literal, Optional
+from uuid import UUID
+from fastapi import APIRouter, HTTPException, Query
+from ...core.schema.base import ResponseModel
+from ...core.schema.search import SimilarRequest, SimilarHit
+from ...core.utils.logger import app_logger
+from ...core.utils.config import settings
+from ...services.memory.storage import sequence_store
+from ...services.memory.similarity import similarity_index
+
+router = APIRouter()
+
+@router.get("/search", response_model=ResponseModel)
+async def search_rows(
+    q: str = Query(min_length=1),
+    operation: Optional[List[Literal["Reflect", "Act", "Plan", "Fork"]]] = Query(default=None),
+    min_confidence: Optional[float] = Query(default=None, ge=0.0, le=1.0),
+    max_confidence: Optional[float] = Query(default=None, ge=0.0, le=1.0),
+    sequence_id: Optional[UUID] = None,
+    limit: int = Query(default=20, ge=1, le=200),
+    cursor: Optional[str] = None
+):
+    """
+    Full-text search over the goals, outputs and belief contents of stored rows.
+    
+    Args:
+        q: Search terms; every term must match, and a trailing * matches a prefix
+        operation: Only rows with one of these operations (repeatable)
+        min_confidence: Only rows with a belief at least this confident
+        max_confidence: Only rows with a belief at most this confident
+        sequence_id: Only rows of this sequence
+        limit: Maximum number of hits per page
+        cursor: The next_cursor of the previous page
+        
+    Returns:
+        ResponseModel containing the hits, best first, and the next page's cursor
+    """
+    try:
+        page = await sequence_store.search(
+            q,
+            operations=operation,
+            min_confidence=min_confidence,
+            max_confidence=max_confidence,
+            sequence_id=sequence_id,
+            limit=limit,
+            cursor=cursor
+        )
+        
+        return ResponseModel(
+            success=True,
+            message=f"Found {len(page.hits)} rows",
+            data=page
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        app_logger.error(f"Error searching rows: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/similar", response_model=ResponseModel)
+async def find_similar(request: SimilarRequest):
+    """
+    Find the stored rows most similar to a stored row or to free text.
+    
+    Args:
+        request: Either a row_id or a text, and the number of rows to return
+        
+    Returns:
+        ResponseModel containing the k nearest rows, most similar first
+    """
+    if not settings.SIMILARITY_ENABLED or not similarity_index.available:
+        raise HTTPException(status_code=503, detail="The similarity index is disabled or the 'numpy' package is not installed")
+    if (request.row_id is None) == (request.text is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of row_id or text")
+    
+    try:
+        if request.row_id is not None:
+            vector = await asyncio.to_thread(similarity_index.vector, request.row_id)
+            if vector is None:
+                raise HTTPException(status_code=404, detail=f"Row not found: {request.row_id}")
+        else:
+            vector = similarity_index.encode([request.text])
+        
+        neighbours = (await asyncio.to_thread(similarity_index.query, vector, request.k, [request.row_id]))[0]
+        rows = await asyncio.gather(*(sequence_store.get_row(row_id) for row_id, _, _ in neighbours))
+        hits = [
+            SimilarHit(row=row, sequence_id=sequence_id, score=score)
+            for row, (_, sequence_id, score) in zip(rows, neighbours)
+            if row is not None
+        ]
+        
+        return ResponseModel(
+            success=True,
+            message=f"Found {len(hits)} similar rows",
+            data=hits
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        app_logger.error(f"Error finding similar rows: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
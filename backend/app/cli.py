@@ -0,0 +1,111 @@
+"""
+Command line entry point for SimForge.
+Usage: python -m app.cli <command> [options] (from the backend directory)
+"""
+import sys
+import argparse
+from typing import List, Optional
+from uuid import UUID
+from .core.utils.config import settings
+from .services.memory.export import ParquetExporter, parquet_exporter, parquet_available
+from .services.memory.importer import BulkImporter, bulk_importer
+from .services.memory.segments import segment_log
+from .services.memory.sequences import sequence_repository
+from .services.memory.storage import SequenceStore
+
+def export_parquet(args: argparse.Namespace) -> int:
+    """Export the stored sequences, rows and beliefs as Parquet."""
+    if not parquet_available():
+        print("Parquet export requires the 'pyarrow' package", file=sys.stderr)
+        return 1
+    exporter = parquet_exporter
+    if args.batch_size is not None:
+        exporter = ParquetExporter(parquet_exporter.store, args.batch_size)
+    result = exporter.export(args.output or exporter.default_output_dir())
+    for table, info in result["tables"].items():
+        print(f"{table}: {info['records']} records -> {info['path']}")
+    return 0
+
+def import_sequences(args: argparse.Namespace) -> int:
+    """Import sequence JSON/JSONL files into the store, skipping files imported before."""
+    importer = bulk_importer
+    if args.workers is not None or args.batch_size is not None:
+        importer = BulkImporter(
+            bulk_importer.repository,
+            args.workers if args.workers is not None else bulk_importer.workers,
+            args.batch_size or bulk_importer.batch_size,
+            bulk_importer.chunk_bytes
+        )
+    report = importer.run(
+        args.paths or [settings.SEQUENCES_DIR],
+        progress=lambda report: print(
+            f"... {report.sequences} sequences from {report.count('imported')} files "
+            f"({report.sequences / report.elapsed:.0f} sequences/s)",
+            file=sys.stderr
+        )
+    )
+    for file_report in report.files:
+        if file_report.error_count or file_report.status == "duplicate":
+            print(f"{file_report.path}: {file_report.status}, {file_report.sequences} sequences, {file_report.error_count} rejected")
+            for error in file_report.errors:
+                print(f"  {error}")
+            if file_report.error_count > len(file_report.errors):
+                print(f"  ... and {file_report.error_count - len(file_report.errors)} more")
+    print(report.summary())
+    return 1 if report.errors else 0
+
+def replay_archive(args: argparse.Namespace) -> int:
+    """Rewrite archived sequences from the segment log into the store and its indexes."""
+    if args.sequence_ids:
+        sequences = []
+        for sequence_id in args.sequence_ids:
+            sequence = segment_log.get(UUID(sequence_id))
+            if sequence is None:
+                print(f"{sequence_id}: not archived", file=sys.stderr)
+                return 1
+            sequences.append(sequence)
+    else:
+        sequences = segment_log.iter_sequences()
+
+    replayed = 0
+    batch = []
+    for sequence in sequences:
+        batch.append(sequence)
+        if len(batch) >= args.batch_size:
+            sequence_repository.save_packed(SequenceStore.pack(batch))
+            replayed += len(batch)
+            batch = []
+    if batch:
+        sequence_repository.save_packed(SequenceStore.pack(batch))
+        replayed += len(batch)
+    print(f"Replayed {replayed} sequences from {segment_log.directory}")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="simforge", description="SimForge command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export-parquet", help="Export stored sequences as Parquet tables")
+    export.add_argument("-o", "--output", help="Output directory (default: a new directory under EXPORT_DIR)")
+    export.add_argument("--batch-size", type=int, help="Records per batch (default: EXPORT_BATCH_SIZE)")
+    export.set_defaults(handler=export_parquet)
+
+    load = commands.add_parser("import", help="Bulk-import sequence JSON and JSONL files")
+    load.add_argument("paths", nargs="*", help="Files or directories to import (default: SEQUENCES_DIR)")
+    load.add_argument("-j", "--workers", type=int, help="Worker processes (default: IMPORT_WORKERS, or one per CPU)")
+    load.add_argument("--batch-size", type=int, help="Sequences per write transaction (default: IMPORT_BATCH_SIZE)")
+    load.set_defaults(handler=import_sequences)
+
+    replay = commands.add_parser("replay", help="Restore the store from the segment log archive")
+    replay.add_argument("sequence_ids", nargs="*", help="Sequences to restore (default: the latest version of every archived sequence)")
+    replay.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE, help="Sequences per write transaction (default: IMPORT_BATCH_SIZE)")
+    replay.set_defaults(handler=replay_archive)
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
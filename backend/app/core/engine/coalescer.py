@@ -0,0 +1,72 @@
+"""
+Coalescer module for SimForge.
+Deduplicates concurrent identical engine calls so they share a single set of LLM requests.
+"""
+import asyncio
+from typing import Dict, Any, Callable, Awaitable, TypeVar
+from ...core.utils.logger import app_logger
+
+T = TypeVar("T")
+
+class _Flight:
+    """A shared in-flight call and the number of callers waiting on it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Single-flight call deduplication.
+
+    The first caller for a key starts the work as a task; concurrent callers with the
+    same key await that task through asyncio.shield, so one waiter being cancelled
+    (e.g. a client disconnecting) does not cancel the call for the others. The shared
+    task is only cancelled once every waiter has gone away.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.shared = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `factory()` once per concurrent `key` and return its result to every caller.
+
+        Args:
+            key: Identity of the call; callers with equal keys share one execution
+            factory: Zero-argument callable returning the awaitable to run
+
+        Returns:
+            The result of the shared call
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self.shared += 1
+            app_logger.debug(f"Joining in-flight call {key[:64]}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of in-flight keys and of calls served by joining."""
+        return {"in_flight": len(self._flights), "shared": self.shared}
+
+# Create a singleton instance
+coalescer = SingleFlight()
@@ -0,0 +1,123 @@
+"""
+Compact row module for SimForge.
+Slot-based, array-backed rows for the edit histories cached in memory, the one place rows are held long term.
+"""
+from array import array
+from typing import Dict, List, Tuple, Optional, Union, Any, get_args
+from uuid import UUID
+from ...core.schema.cognition import CognitionRow, Belief
+
+# The allowed operations, in a fixed order; compact rows store an index into this tuple
+OPERATIONS: Tuple[str, ...] = get_args(CognitionRow.model_fields["operation"].annotation)
+_OPERATION_CODES: Dict[str, int] = {operation: code for code, operation in enumerate(OPERATIONS)}
+
+Metadata = Dict[str, Union[str, int, float, bool]]
+
+class CompactRow:
+    """
+    Memory-lean equivalent of a CognitionRow.
+
+    Ids are kept as 128-bit ints, the operation as a small code, and the beliefs
+    as parallel columns: a tuple of contents, an array of confidences, and a
+    tuple of sources (None when no belief has one). Empty metadata is not stored.
+    Conversion to and from CognitionRow is lossless.
+    """
+
+    __slots__ = ("id", "goal", "op", "output", "parent_id", "contents", "confidences", "sources", "_metadata")
+
+    def __init__(
+        self,
+        id: int,
+        goal: str,
+        op: int,
+        output: Optional[str],
+        parent_id: Optional[int],
+        contents: Tuple[str, ...],
+        confidences: array,
+        sources: Optional[Tuple[Optional[str], ...]],
+        metadata: Optional[Metadata]
+    ):
+        self.id = id
+        self.goal = goal
+        self.op = op
+        self.output = output
+        self.parent_id = parent_id
+        self.contents = contents
+        self.confidences = confidences
+        self.sources = sources
+        self._metadata = metadata or None
+
+    @property
+    def operation(self) -> str:
+        return OPERATIONS[self.op]
+
+    @property
+    def metadata(self) -> Metadata:
+        return self._metadata if self._metadata is not None else {}
+
+    def __len__(self) -> int:
+        """Number of beliefs."""
+        return len(self.contents)
+
+    @classmethod
+    def from_model(cls, row: CognitionRow) -> "CompactRow":
+        """Pack a CognitionRow."""
+        beliefs = row.beliefs
+        sources = tuple(belief.source for belief in beliefs)
+        return cls(
+            row.id.int,
+            row.goal,
+            _OPERATION_CODES[row.operation],
+            row.output,
+            row.parent_id.int if row.parent_id is not None else None,
+            tuple(belief.content for belief in beliefs),
+            array("d", (belief.confidence for belief in beliefs)),
+            sources if any(source is not None for source in sources) else None,
+            dict(row.metadata) if row.metadata else None
+        )
+
+    def to_model(self) -> CognitionRow:
+        """Unpack into a CognitionRow. Values were validated on the way in, so they are not validated again."""
+        sources = self.sources or (None,) * len(self.contents)
+        return CognitionRow.model_construct(
+            id=UUID(int=self.id),
+            goal=self.goal,
+            beliefs=[
+                Belief.model_construct(content=content, confidence=confidence, source=source)
+                for content, confidence, source in zip(self.contents, self.confidences, sources)
+            ],
+            operation=OPERATIONS[self.op],
+            output=self.output,
+            parent_id=UUID(int=self.parent_id) if self.parent_id is not None else None,
+            metadata=dict(self._metadata) if self._metadata else {}
+        )
+
+    def to_list(self) -> List[Any]:
+        """Flatten into a JSON-serializable list, the inverse of from_list()."""
+        return [
+            self.id,
+            self.goal,
+            self.op,
+            self.output,
+            self.parent_id,
+            list(self.contents),
+            self.confidences.tolist(),
+            list(self.sources) if self.sources is not None else None,
+            self._metadata
+        ]
+
+    @classmethod
+    def from_list(cls, values: List[Any]) -> "CompactRow":
+        """Rebuild a row flattened by to_list()."""
+        id, goal, op, output, parent_id, contents, confidences, sources, metadata = values
+        return cls(
+            id,
+            goal,
+            op,
+            output,
+            parent_id,
+            tuple(contents),
+            array("d", confidences),
+            tuple(sources) if sources is not None else None,
+            metadata
+        )
@@ -0,0 +1,191 @@
+"""
+Decoding module for SimForge.
+Parses and validates LLM responses into cognition models in a single pass.
+"""
+from typing import List, Dict, Optional, Union, Annotated, Any, Iterable
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, BeforeValidator, WrapValidator, model_validator
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionRow, CognitionSequence, Belief
+from .compact import OPERATIONS
+
+_ROW_FIELDS = ("goal", "beliefs", "operation", "output")
+
+Content = Union[str, bytes]
+
+def _operation(value: Any) -> str:
+    """Fall back to "Reflect" for an unknown operation."""
+    return value if value in OPERATIONS else "Reflect"
+
+def _without(data: Any, fields: Iterable[str]) -> Any:
+    """Drop the given keys from a raw object, leaving anything else untouched."""
+    if isinstance(data, dict) and not data.keys().isdisjoint(fields):
+        return {key: value for key, value in data.items() if key not in fields}
+    return data
+
+def _unwrap_forks(value: Any) -> Any:
+    """Accept a fork answer wrapped in a {"forks": ...} object."""
+    return value["forks"] if isinstance(value, dict) and "forks" in value else value
+
+def _drop_invalid(value: Any, handler) -> Any:
+    """Validate one fork, logging and dropping it (as None) when it is invalid."""
+    try:
+        return handler(value)
+    except ValidationError as e:
+        app_logger.warning(f"Dropped invalid fork: {e.error_count()} errors, first: {e.errors()[0]['msg']}")
+        return None
+
+def _empty_if_invalid(value: Any, handler) -> Any:
+    """Validate the forks of one packed row, treating an unusable answer as no forks."""
+    try:
+        return handler(value)
+    except ValidationError:
+        return []
+
+class GeneratedBelief(Belief):
+    """A belief as written by the model; the content defaults to empty."""
+    content: str = ""
+
+class GeneratedRow(CognitionRow):
+    """
+    A row as written by the model.
+
+    Missing fields get defaults and an unknown operation becomes "Reflect". The id,
+    parent and metadata are ours to assign, so any the model wrote are ignored.
+    """
+    goal: str = ""
+    beliefs: List[GeneratedBelief] = Field(default_factory=list)
+    operation: Annotated[CognitionRow.model_fields["operation"].annotation, BeforeValidator(_operation)] = "Reflect"
+    output: Optional[str] = ""
+
+    @model_validator(mode="before")
+    @classmethod
+    def _ignore_assigned(cls, data: Any) -> Any:
+        return _without(data, ("id", "parent_id", "metadata"))
+
+class GeneratedSequence(CognitionSequence):
+    """A sequence as written by the model, with defaults for missing fields. Its id and timestamps are ours."""
+    title: str = "Untitled Sequence"
+    description: Optional[str] = ""
+    rows: List[GeneratedRow] = Field(default_factory=list)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _ignore_assigned(cls, data: Any) -> Any:
+        return _without(data, ("id", "created_at", "updated_at"))
+
+class _SequenceHeader(BaseModel):
+    """The sequence fields other than its rows, for when the rows were decoded separately."""
+    title: str = "Untitled Sequence"
+    description: Optional[str] = ""
+    metadata: Dict[str, Union[str, int, float, bool]] = Field(default_factory=dict)
+
+_ForkAnswer = Annotated[
+    List[Annotated[Optional[GeneratedRow], WrapValidator(_drop_invalid)]],
+    BeforeValidator(_unwrap_forks)
+]
+
+_header_adapter = TypeAdapter(_SequenceHeader)
+_forks_adapter = TypeAdapter(_ForkAnswer)
+_packed_forks_adapter = TypeAdapter(
+    Annotated[Dict[str, Annotated[_ForkAnswer, WrapValidator(_empty_if_invalid)]], BeforeValidator(_unwrap_forks)]
+)
+
+def decode_sequence(content: Content, rows: Optional[List[CognitionRow]] = None) -> CognitionSequence:
+    """
+    Parse and validate a generated sequence straight from the response text.
+
+    Args:
+        content: The raw JSON response
+        rows: Rows already decoded (e.g. while streaming); the response's own rows are then not validated
+
+    Returns:
+        The CognitionSequence
+
+    Raises:
+        ValidationError: If the content is not valid JSON or not a valid sequence
+    """
+    if rows is None:
+        return GeneratedSequence.model_validate_json(content)
+
+    header = _header_adapter.validate_json(content)
+    return CognitionSequence.model_construct(
+        title=header.title,
+        description=header.description,
+        rows=rows,
+        metadata=header.metadata
+    )
+
+def decode_row(content: Content) -> CognitionRow:
+    """
+    Parse and validate one streamed row.
+
+    Args:
+        content: The raw JSON of the row object
+
+    Returns:
+        The CognitionRow
+
+    Raises:
+        ValueError: If the content is not a valid row or has none of the row fields
+    """
+    row = GeneratedRow.model_validate_json(content)
+    if not row.model_fields_set.intersection(_ROW_FIELDS):
+        raise ValueError("object has none of the cognition row fields")
+    return row
+
+def _to_forks(rows: List[Optional[GeneratedRow]], original_row: CognitionRow, limit: int) -> List[CognitionRow]:
+    forks = []
+    for row in rows:
+        if row is None:
+            continue
+        if len(forks) == limit:
+            break
+        # A fork keeps the goal of its parent unless the model gave it a new one
+        if "goal" not in row.model_fields_set:
+            row.goal = original_row.goal
+        row.parent_id = original_row.id
+        forks.append(row)
+    return forks
+
+def decode_forks(content: Content, original_row: CognitionRow, limit: int) -> List[CognitionRow]:
+    """
+    Parse and validate the forks of one row, given as a list or as {"forks": [...]}.
+
+    Invalid forks are dropped individually.
+
+    Args:
+        content: The raw JSON response
+        original_row: The forked row
+        limit: Maximum number of forks to keep
+
+    Returns:
+        Up to `limit` fork rows, parented to `original_row`
+
+    Raises:
+        ValidationError: If the content is not valid JSON or not a list of forks
+    """
+    return _to_forks(_forks_adapter.validate_json(content), original_row, limit)
+
+def decode_packed_forks(
+    content: Content,
+    rows: Dict[str, CognitionRow],
+    limit: int
+) -> Dict[str, List[CognitionRow]]:
+    """
+    Parse and validate a packed fork answer, mapping row labels to their forks.
+
+    Invalid forks are dropped individually, and a label whose answer is unusable gets no forks.
+
+    Args:
+        content: The raw JSON response, {label: forks} optionally wrapped in {"forks": ...}
+        rows: The forked rows by label
+        limit: Maximum number of forks to keep per row
+
+    Returns:
+        Forks by label, for every label in `rows`
+
+    Raises:
+        ValidationError: If the content is not valid JSON or not an object of answers
+    """
+    answers = _packed_forks_adapter.validate_json(content)
+    return {label: _to_forks(answers.get(label, []), row, limit) for label, row in rows.items()}
@@ -0,0 +1,178 @@
+"""
+Deduplication module for SimForge.
+Drops near-identical rows and sequences using MinHash signatures with LSH banding.
+"""
+import re
+import math
+import hashlib
+import random
+from typing import List, Dict, Tuple, Optional, Callable, Iterable, Sequence, TypeVar
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionRow, CognitionSequence
+
+T = TypeVar("T")
+Signature = Tuple[int, ...]
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"\w+")
+
+def _row_state(row: CognitionRow) -> str:
+    return " ".join([row.goal, *(belief.content for belief in row.beliefs)])
+
+def _row_action(row: CognitionRow) -> str:
+    return f"{row.operation} {row.output or ''}"
+
+def row_fields(row: CognitionRow) -> Tuple[str, str]:
+    """
+    Fields compared for a row: its state (goal and beliefs) and its action (operation and output).
+
+    Rows are only near-duplicates when both fields are, so forks that share the
+    parent's goal and beliefs but act differently are kept.
+    """
+    return _row_state(row), _row_action(row)
+
+def sequence_fields(sequence: CognitionSequence) -> Tuple[str, str]:
+    """Fields compared for a sequence: the states and the actions of all of its rows."""
+    return (
+        " ".join(_row_state(row) for row in sequence.rows),
+        " ".join(_row_action(row) for row in sequence.rows)
+    )
+
+class MinHasher:
+    """MinHash signatures over word shingles, with a fixed set of universal hash permutations."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+    def shingles(self, text: str) -> set:
+        words = _WORD.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)}
+        return {
+            " ".join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text: str) -> Signature:
+        """Return the MinHash signature of `text`."""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+            for shingle in self.shingles(text)
+        ]
+        return tuple(
+            min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+            for a, b in self._perms
+        )
+
+def similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Choose (bands, rows per band) whose LSH threshold (1/b)^(1/r) is closest to `threshold`."""
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+class _SignatureSet:
+    """Accepted per-field signatures, bucketed by LSH band."""
+
+    def __init__(self, deduplicator: "Deduplicator"):
+        self.deduplicator = deduplicator
+        self._buckets: Dict[Tuple[int, int, Signature], List[Tuple[Signature, ...]]] = {}
+
+    def add_if_new(self, signatures: Tuple[Signature, ...]) -> bool:
+        """Add `signatures` unless a near-identical item was already added; return whether it was added."""
+        threshold = self.deduplicator.threshold
+        r = self.deduplicator.rows_per_band
+        keys = [
+            (field, band, signature[band * r:(band + 1) * r])
+            for field, signature in enumerate(signatures)
+            for band in range(self.deduplicator.bands)
+        ]
+        for key in keys:
+            for other in self._buckets.get(key, ()):
+                if all(similarity(mine, theirs) >= threshold for mine, theirs in zip(signatures, other)):
+                    return False
+        for key in keys:
+            self._buckets.setdefault(key, []).append(signatures)
+        return True
+
+class Deduplicator:
+    """
+    Keeps the first of every group of near-identical items.
+
+    Each item is described by one or more text fields, each with its own MinHash
+    signature. Signatures are banded into LSH buckets, so an item is only compared
+    with the few items sharing a bucket; a candidate is a duplicate when the
+    estimated Jaccard similarity of every field reaches `threshold`.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows_per_band = lsh_bands(num_perm, threshold)
+
+    def signatures(self, fields: Sequence[str]) -> Tuple[Signature, ...]:
+        return tuple(self.hasher.signature(field) for field in fields)
+
+    def filter(
+        self,
+        items: Iterable[T],
+        fields: Callable[[T], Sequence[str]],
+        limit: Optional[int] = None
+    ) -> List[T]:
+        """
+        Return the distinct items, in order.
+
+        Args:
+            items: Candidate items
+            fields: Function returning the text fields compared for an item
+            limit: Stop after this many distinct items
+
+        Returns:
+            The items that are not near-duplicates of an earlier item
+        """
+        accepted = _SignatureSet(self)
+        kept: List[T] = []
+        dropped = 0
+        for item in items:
+            if limit is not None and len(kept) >= limit:
+                break
+            if accepted.add_if_new(self.signatures(fields(item))):
+                kept.append(item)
+            else:
+                dropped += 1
+
+        if dropped:
+            app_logger.info(f"Dropped {dropped} near-duplicate items")
+        return kept
+
+    def tracker(self, fields: Callable[[T], Sequence[str]]) -> Callable[[T], bool]:
+        """Return a predicate that is True for each item distinct from every item it accepted before."""
+        accepted = _SignatureSet(self)
+        return lambda item: accepted.add_if_new(self.signatures(fields(item)))
+
+def overgenerate(count: int) -> int:
+    """Number of candidates to request so `count` distinct ones survive deduplication."""
+    if not settings.DEDUP_ENABLED:
+        return count
+    return max(count, math.ceil(count * settings.DEDUP_OVERGENERATE))
+
+# Create a singleton instance
+deduplicator = Deduplicator(settings.DEDUP_THRESHOLD, settings.DEDUP_NUM_PERM)
@@ -2,14 +2,45 @@
 Forker module for SimForge.
 Handles the creation of forks from existing cognition rows.
 """
-import json
 import asyncio
-from typing import List, Dict, Any, Optional, Literal
-from uuid import UUID, uuid4
-import httpx
+from typing import List, Dict, Optional, Literal, AsyncIterator, Tuple, Union
+from uuid import UUID
+from pydantic import ValidationError
 from ...core.utils.config import settings
 from ...core.utils.logger import app_logger
-from ...core.schema.cognition import CognitionRow, Belief
+from ...core.schema.cognition import CognitionRow
+from ...services.llm.client import llm_client
+from ..prompts.manager import prompt_manager
+from .dedup import deduplicator, row_fields, overgenerate
+from .decoding import decode_forks, decode_packed_forks
+
+# Rough completion size of one fork, used when packing rows into a call
+FORK_TOKENS_PER_FORK = 200
+
+class CallBudget:
+    """LLM calls and estimated tokens a batch of fork calls may still spend."""
+
+    def __init__(self, max_calls: int, max_tokens: Optional[int] = None):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.calls_used = 0
+        self.tokens_used = 0
+
+    def fits(self, calls: int, tokens: int) -> bool:
+        if self.calls_used + calls > self.max_calls:
+            return False
+        return self.max_tokens is None or self.tokens_used + tokens <= self.max_tokens
+
+    def charge(self, calls: int, tokens: int) -> None:
+        self.calls_used += calls
+        self.tokens_used += tokens
+
+    def spend(self, tokens: int) -> bool:
+        """Charge one call of `tokens` estimated tokens, if it still fits."""
+        if not self.fits(1, tokens):
+            return False
+        self.charge(1, tokens)
+        return True
 
 class Forker:
     """Forker class for creating forks from existing cognition rows."""
@@ -18,14 +49,16 @@ class Forker:
         self.provider = settings.LLM_PROVIDER
         self.api_key = settings.LLM_API_KEY
         self.model = settings.LLM_MODEL
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self.llm = llm_client
+        self.prompts = prompt_manager
     
     async def create_forks(
         self,
         row: CognitionRow,
         num_forks: int = 1,
         fork_type: Literal["invert_beliefs", "change_goal", "alternative_operation"] = "alternative_operation",
-        context: Optional[str] = None
+        context: Optional[str] = None,
+        cache: Optional[bool] = None
     ) -> List[CognitionRow]:
         """
         Create forks from an existing cognition row.
@@ -35,6 +68,7 @@ class Forker:
             num_forks: Number of forks to create
             fork_type: Type of fork to create
             context: Optional context for generation
+            cache: Response cache policy (None for the default, True to opt in, False to bypass)
             
         Returns:
             List of forked CognitionRow objects
@@ -42,11 +76,11 @@ class Forker:
         app_logger.info(f"Creating {num_forks} forks of type {fork_type}")
         
         if fork_type == "invert_beliefs":
-            return await self._create_inverted_belief_forks(row, num_forks, context)
+            return await self._create_inverted_belief_forks(row, num_forks, context, cache)
         elif fork_type == "change_goal":
-            return await self._create_alternative_goal_forks(row, num_forks, context)
+            return await self._create_alternative_goal_forks(row, num_forks, context, cache)
         elif fork_type == "alternative_operation":
-            return await self._create_alternative_operation_forks(row, num_forks, context)
+            return await self._create_alternative_operation_forks(row, num_forks, context, cache)
         else:
             raise ValueError(f"Unsupported fork type: {fork_type}")
     
@@ -54,340 +88,271 @@ class Forker:
         self,
         row: CognitionRow,
         num_forks: int,
-        context: Optional[str]
+        context: Optional[str],
+        cache: Optional[bool] = None
     ) -> List[CognitionRow]:
         """Create forks with inverted beliefs."""
-        system_prompt = """
-You are SimForge, a synthetic cognition system. Your task is to create alternative versions of a cognitive step by inverting or challenging some of the beliefs.
-
-For each alternative version:
-1. Identify 1-2 key beliefs to invert or challenge
-2. Modify the confidence levels appropriately
-3. Adjust the goal slightly if necessary based on the new beliefs
-4. Provide a new operation that follows from the modified beliefs
-5. Generate a new output that reflects the operation
-
-The alternative versions should be coherent and plausible, representing genuinely different perspectives or approaches.
-
-FORMAT YOUR RESPONSE AS A JSON ARRAY OF OBJECTS WITH THE FOLLOWING STRUCTURE:
-[
-  {
-    "goal": "Modified goal based on inverted beliefs",
-    "beliefs": [
-      {"content": "Inverted belief 1", "confidence": 0.7},
-      {"content": "Original belief 2", "confidence": 0.8}
-    ],
-    "operation": "New operation based on inverted beliefs",
-    "output": "New output based on the operation"
-  }
-]
-"""
-        
-        user_prompt = f"""
-Original cognitive step:
-Goal: {row.goal}
-Beliefs:
-{self._format_beliefs(row.beliefs)}
-Operation: {row.operation}
-Output: {row.output}
-
-Create {num_forks} alternative versions by inverting or challenging some of the beliefs.
-"""
-        
-        if context:
-            user_prompt = f"{context}\n\n{user_prompt}"
-        
-        return await self._generate_forks(row, system_prompt, user_prompt, num_forks)
+        return await self._create_single_forks("invert_beliefs", row, num_forks, context, cache)
     
     async def _create_alternative_goal_forks(
         self,
         row: CognitionRow,
         num_forks: int,
-        context: Optional[str]
+        context: Optional[str],
+        cache: Optional[bool] = None
     ) -> List[CognitionRow]:
         """Create forks with alternative goals."""
-        system_prompt = """
-You are SimForge, a synthetic cognition system. Your task is to create alternative versions of a cognitive step by changing the goal while keeping most beliefs similar.
-
-For each alternative version:
-1. Create a new goal that represents a different approach or priority
-2. Keep most beliefs the same, but adjust 1-2 if necessary for coherence
-3. Provide a new operation that follows from the new goal
-4. Generate a new output that reflects the operation
-
-The alternative versions should be coherent and plausible, representing genuinely different approaches to the situation.
-
-FORMAT YOUR RESPONSE AS A JSON ARRAY OF OBJECTS WITH THE FOLLOWING STRUCTURE:
-[
-  {
-    "goal": "Alternative goal",
-    "beliefs": [
-      {"content": "Original belief 1", "confidence": 0.8},
-      {"content": "Slightly modified belief 2", "confidence": 0.7}
-    ],
-    "operation": "New operation based on alternative goal",
-    "output": "New output based on the operation"
-  }
-]
-"""
-        
-        user_prompt = f"""
-Original cognitive step:
-Goal: {row.goal}
-Beliefs:
-{self._format_beliefs(row.beliefs)}
-Operation: {row.operation}
-Output: {row.output}
-
-Create {num_forks} alternative versions by changing the goal while keeping most beliefs similar.
-"""
-        
-        if context:
-            user_prompt = f"{context}\n\n{user_prompt}"
-        
-        return await self._generate_forks(row, system_prompt, user_prompt, num_forks)
+        return await self._create_single_forks("change_goal", row, num_forks, context, cache)
     
     async def _create_alternative_operation_forks(
         self,
         row: CognitionRow,
         num_forks: int,
-        context: Optional[str]
+        context: Optional[str],
+        cache: Optional[bool] = None
     ) -> List[CognitionRow]:
         """Create forks with alternative operations."""
-        system_prompt = """
-You are SimForge, a synthetic cognition system. Your task is to create alternative versions of a cognitive step by changing the operation while keeping the goal and beliefs the same.
-
-For each alternative version:
-1. Keep the same goal
-2. Keep the same beliefs
-3. Provide a different operation (Reflect, Act, Plan, or Fork)
-4. Generate a new output that reflects the new operation
-
-The alternative versions should be coherent and plausible, representing genuinely different approaches to the same goal and beliefs.
-
-FORMAT YOUR RESPONSE AS A JSON ARRAY OF OBJECTS WITH THE FOLLOWING STRUCTURE:
-[
-  {
-    "goal": "Same goal as original",
-    "beliefs": [
-      {"content": "Same belief 1", "confidence": 0.8},
-      {"content": "Same belief 2", "confidence": 0.7}
-    ],
-    "operation": "Alternative operation",
-    "output": "New output based on the alternative operation"
-  }
-]
-"""
+        return await self._create_single_forks("alternative_operation", row, num_forks, context, cache)
+    
+    async def _create_single_forks(
+        self,
+        fork_type: str,
+        row: CognitionRow,
+        num_forks: int,
+        context: Optional[str],
+        cache: Optional[bool] = None,
+        budget: Optional[CallBudget] = None
+    ) -> List[CognitionRow]:
+        """Create forks of one row with a dedicated prompt, charging the call to `budget` if given."""
+        if budget is not None and not budget.spend(self.estimate_fork_tokens(row, num_forks)):
+            app_logger.warning(f"Call budget exhausted; not forking row {row.id}")
+            return []
+        system_prompt = self.prompts.fork_system_prompt(fork_type)
+        requested = overgenerate(num_forks)
+        user_prompt = self.prompts.fork_user_prompt(row, requested, fork_type, context)
         
-        user_prompt = f"""
-Original cognitive step:
-Goal: {row.goal}
-Beliefs:
-{self._format_beliefs(row.beliefs)}
-Operation: {row.operation}
-Output: {row.output}
-
-Create {num_forks} alternative versions by changing the operation while keeping the goal and beliefs the same. Choose from operations: Reflect, Act, Plan, Fork.
-"""
+        forks = await self._generate_forks(row, system_prompt, user_prompt, requested, cache)
+        return self._distinct(forks, num_forks)
+    
+    async def create_batch_forks(
+        self,
+        rows: List[CognitionRow],
+        num_forks: int = 1,
+        fork_type: Literal["invert_beliefs", "change_goal", "alternative_operation"] = "alternative_operation",
+        context: Optional[str] = None,
+        cache: Optional[bool] = None
+    ) -> Dict[UUID, List[CognitionRow]]:
+        """
+        Create forks of many rows, packing several rows into each LLM call.
+        
+        Rows are packed greedily in order until the estimated prompt plus completion
+        size reaches FORK_PACK_TOKEN_BUDGET (or FORK_PACK_MAX_ROWS rows), so the system
+        prompt is sent once per pack instead of once per row. Packs run concurrently.
+        Rows the model skips in a packed answer are retried with a single-row prompt.
+        
+        Args:
+            rows: The rows to fork
+            num_forks: Number of forks to create per row
+            fork_type: Type of fork to create
+            context: Optional context for generation
+            cache: Response cache policy (None for the default, True to opt in, False to bypass)
+            
+        Returns:
+            Mapping of each row id to its forks (whose parent_id is that row)
+        """
+        if fork_type not in self.prompts.fork_types:
+            raise ValueError(f"Unsupported fork type: {fork_type}")
+        
+        packs = self._pack_rows(rows, num_forks)
+        app_logger.info(f"Creating {num_forks} forks of type {fork_type} for {len(rows)} rows in {len(packs)} packed calls")
         
-        if context:
-            user_prompt = f"{context}\n\n{user_prompt}"
+        results = await asyncio.gather(
+            *(self._generate_packed_forks(pack, num_forks, fork_type, context, cache) for pack in packs),
+            return_exceptions=True
+        )
         
-        return await self._generate_forks(row, system_prompt, user_prompt, num_forks)
+        forks: Dict[UUID, List[CognitionRow]] = {row.id: [] for row in rows}
+        errors = [result for result in results if isinstance(result, BaseException)]
+        for result in results:
+            if not isinstance(result, BaseException):
+                forks.update(result)
+        
+        # One failed pack should not discard the others
+        if errors:
+            app_logger.error(f"{len(errors)} of {len(packs)} packed fork calls failed: {errors[0]}")
+            if len(errors) == len(packs):
+                raise errors[0]
+        
+        return forks
     
-    async def _generate_forks(
+    async def iter_batch_forks(
         self,
-        original_row: CognitionRow,
-        system_prompt: str,
-        user_prompt: str,
-        num_forks: int
-    ) -> List[CognitionRow]:
-        """Generate forks using the LLM."""
-        if self.provider == "openai":
-            return await self._generate_forks_with_openai(original_row, system_prompt, user_prompt, num_forks)
-        elif self.provider == "local":
-            return await self._generate_forks_with_local(original_row, system_prompt, user_prompt, num_forks)
-        else:
-            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        rows: List[CognitionRow],
+        num_forks: int = 1,
+        fork_type: Literal["invert_beliefs", "change_goal", "alternative_operation"] = "alternative_operation",
+        context: Optional[str] = None,
+        cache: Optional[bool] = None,
+        budget: Optional[CallBudget] = None
+    ) -> AsyncIterator[Tuple[List[CognitionRow], Union[Dict[UUID, List[CognitionRow]], Exception]]]:
+        """
+        Like create_batch_forks, but yield each pack's forks as soon as its call completes.
+        
+        Closing the iterator cancels the packed calls still in flight. With a budget,
+        every call actually made, including the single-row retries of rows a packed
+        answer skipped, is charged to it, and retries that no longer fit are not made.
+        
+        Args:
+            rows: The rows to fork
+            num_forks: Number of forks to create per row
+            fork_type: Type of fork to create
+            context: Optional context for generation
+            cache: Response cache policy (None for the default, True to opt in, False to bypass)
+            budget: Calls and tokens the batch may spend (None for no limit)
+            
+        Yields:
+            (pack rows, mapping of row id to forks) in completion order, or
+            (pack rows, exception) for a pack whose call failed
+        """
+        if fork_type not in self.prompts.fork_types:
+            raise ValueError(f"Unsupported fork type: {fork_type}")
+        
+        packs = self._pack_rows(rows, num_forks)
+        
+        async def run(pack: List[CognitionRow]):
+            try:
+                return pack, await self._generate_packed_forks(pack, num_forks, fork_type, context, cache, budget)
+            except Exception as e:
+                app_logger.error(f"Error forking {len(pack)} packed rows: {str(e)}")
+                return pack, e
+        
+        tasks = [asyncio.ensure_future(run(pack)) for pack in packs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def estimate_pack_calls(self, rows: List[CognitionRow], num_forks: int) -> int:
+        """Number of LLM calls create_batch_forks would make for `rows`."""
+        return len(self._pack_rows(rows, num_forks))
     
-    async def _generate_forks_with_openai(
+    def estimate_fork_tokens(self, row: CognitionRow, num_forks: int) -> int:
+        """Rough prompt plus completion tokens spent forking `row`."""
+        return len(self.prompts.format_row(row)) // 4 + overgenerate(num_forks) * FORK_TOKENS_PER_FORK
+    
+    def _pack_rows(self, rows: List[CognitionRow], num_forks: int) -> List[List[CognitionRow]]:
+        """Split rows into packs that fit the per-call token budget."""
+        packs: List[List[CognitionRow]] = []
+        pack: List[CognitionRow] = []
+        pack_tokens = 0
+        
+        for row in rows:
+            row_tokens = self.estimate_fork_tokens(row, num_forks)
+            if pack and (
+                pack_tokens + row_tokens > settings.FORK_PACK_TOKEN_BUDGET
+                or len(pack) >= settings.FORK_PACK_MAX_ROWS
+            ):
+                packs.append(pack)
+                pack, pack_tokens = [], 0
+            pack.append(row)
+            pack_tokens += row_tokens
+        
+        if pack:
+            packs.append(pack)
+        return packs
+    
+    async def _generate_packed_forks(
         self,
-        original_row: CognitionRow,
-        system_prompt: str,
-        user_prompt: str,
-        num_forks: int
-    ) -> List[CognitionRow]:
-        """Generate forks using OpenAI API."""
-        if not self.api_key:
-            raise ValueError("OpenAI API key not provided")
+        rows: List[CognitionRow],
+        num_forks: int,
+        fork_type: str,
+        context: Optional[str],
+        cache: Optional[bool] = None,
+        budget: Optional[CallBudget] = None
+    ) -> Dict[UUID, List[CognitionRow]]:
+        """Fork every row of a pack with one LLM call and map the answers back to their rows."""
+        if len(rows) == 1:
+            return {rows[0].id: await self._create_single_forks(fork_type, rows[0], num_forks, context, cache, budget)}
+        
+        tokens = sum(self.estimate_fork_tokens(row, num_forks) for row in rows)
+        if budget is not None and not budget.spend(tokens):
+            app_logger.warning(f"Call budget exhausted; not forking {len(rows)} packed rows")
+            return {row.id: [] for row in rows}
+        
+        # Short labels survive the round trip far more reliably than UUIDs
+        labels = {f"r{i + 1}": row for i, row in enumerate(rows)}
+        
+        system_prompt = self.prompts.fork_system_prompt(fork_type, packed=True)
+        requested = overgenerate(num_forks)
+        user_prompt = self.prompts.packed_fork_user_prompt(labels, requested, fork_type, context)
+        
+        content = await self.llm.chat_completion(system_prompt, user_prompt, temperature=0.8, cache=cache)
         
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.8,
-                "response_format": {"type": "json_object"}
-            }
-            
-            response = await self.client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload
+            by_label = decode_packed_forks(content, labels, requested)
+        except ValidationError as e:
+            app_logger.error(f"Failed to parse packed fork response: {e}")
+            app_logger.debug(f"Raw response: {content}")
+            by_label = {}
+        
+        forks: Dict[UUID, List[CognitionRow]] = {}
+        missing: List[CognitionRow] = []
+        for label, row in labels.items():
+            row_forks = self._distinct(by_label.get(label, []), num_forks)
+            if row_forks:
+                forks[row.id] = row_forks
+            else:
+                missing.append(row)
+        
+        if missing:
+            app_logger.warning(f"Packed fork answer skipped {len(missing)} of {len(rows)} rows; retrying them individually")
+            retried = await asyncio.gather(
+                *(self._create_single_forks(fork_type, row, num_forks, context, cache, budget) for row in missing),
+                return_exceptions=True
             )
-            
-            response_data = response.json()
-            content = response_data["choices"][0]["message"]["content"]
-            
-            # Parse the JSON response
-            try:
-                fork_data = json.loads(content)
-                
-                # Ensure we have a list of forks
-                if not isinstance(fork_data, list):
-                    if isinstance(fork_data, dict) and "forks" in fork_data:
-                        fork_data = fork_data["forks"]
-                    else:
-                        app_logger.error("Invalid fork data format")
-                        return []
-                
-                # Limit to requested number of forks
-                fork_data = fork_data[:num_forks]
-                
-                # Create fork rows
-                forks = []
-                for fork in fork_data:
-                    beliefs = [
-                        Belief(
-                            content=belief.get("content", ""),
-                            confidence=belief.get("confidence", 1.0),
-                            source=belief.get("source")
-                        )
-                        for belief in fork.get("beliefs", [])
-                    ]
-                    
-                    # Ensure operation is one of the allowed values
-                    operation = fork.get("operation", "Reflect")
-                    if operation not in ["Reflect", "Act", "Plan", "Fork"]:
-                        operation = "Reflect"
-                    
-                    fork_row = CognitionRow(
-                        id=uuid4(),
-                        goal=fork.get("goal", original_row.goal),
-                        beliefs=beliefs,
-                        operation=operation,
-                        output=fork.get("output", ""),
-                        parent_id=original_row.id
-                    )
-                    forks.append(fork_row)
-                
-                return forks
-                
-            except json.JSONDecodeError as e:
-                app_logger.error(f"Failed to parse JSON response: {e}")
-                app_logger.debug(f"Raw response: {content}")
-                return []
-                
-        except Exception as e:
-            app_logger.error(f"Error generating forks with OpenAI: {str(e)}")
-            raise
+            for row, result in zip(missing, retried):
+                if isinstance(result, BaseException):
+                    app_logger.error(f"Error forking row {row.id}: {result}")
+                    forks[row.id] = []
+                else:
+                    forks[row.id] = result
+        
+        return forks
     
-    async def _generate_forks_with_local(
+    async def _generate_forks(
         self,
         original_row: CognitionRow,
         system_prompt: str,
         user_prompt: str,
-        num_forks: int
+        num_forks: int,
+        cache: Optional[bool] = None
     ) -> List[CognitionRow]:
-        """Generate forks using a local LLM provider."""
+        """Generate forks using the LLM."""
+        if self.provider not in ("openai", "local"):
+            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        
         try:
-            # Assuming local LLM API is running at the configured URL
-            local_api_url = settings.LOCAL_LLM_URL
+            content = await self.llm.chat_completion(system_prompt, user_prompt, temperature=0.8, cache=cache)
             
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "temperature": 0.8,
-                "response_format": {"type": "json_object"}
-            }
-            
-            response = await self.client.post(
-                f"{local_api_url}/v1/chat/completions",
-                json=payload
-            )
-            
-            response_data = response.json()
-            content = response_data["choices"][0]["message"]["content"]
-            
-            # Parse the JSON response
+            # Parse and validate the JSON response in one pass
             try:
-                fork_data = json.loads(content)
-                
-                # Ensure we have a list of forks
-                if not isinstance(fork_data, list):
-                    if isinstance(fork_data, dict) and "forks" in fork_data:
-                        fork_data = fork_data["forks"]
-                    else:
-                        app_logger.error("Invalid fork data format")
-                        return []
-                
-                # Limit to requested number of forks
-                fork_data = fork_data[:num_forks]
-                
-                # Create fork rows
-                forks = []
-                for fork in fork_data:
-                    beliefs = [
-                        Belief(
-                            content=belief.get("content", ""),
-                            confidence=belief.get("confidence", 1.0),
-                            source=belief.get("source")
-                        )
-                        for belief in fork.get("beliefs", [])
-                    ]
-                    
-                    # Ensure operation is one of the allowed values
-                    operation = fork.get("operation", "Reflect")
-                    if operation not in ["Reflect", "Act", "Plan", "Fork"]:
-                        operation = "Reflect"
-                    
-                    fork_row = CognitionRow(
-                        id=uuid4(),
-                        goal=fork.get("goal", original_row.goal),
-                        beliefs=beliefs,
-                        operation=operation,
-                        output=fork.get("output", ""),
-                        parent_id=original_row.id
-                    )
-                    forks.append(fork_row)
-                
-                return forks
-                
-            except json.JSONDecodeError as e:
-                app_logger.error(f"Failed to parse JSON response: {e}")
+                return decode_forks(content, original_row, num_forks)
+            except ValidationError as e:
+                app_logger.error(f"Failed to parse fork response: {e}")
                 app_logger.debug(f"Raw response: {content}")
                 return []
                 
         except Exception as e:
-            app_logger.error(f"Error generating forks with local LLM: {str(e)}")
+            app_logger.error(f"Error generating forks with {self.provider} LLM: {str(e)}")
             raise
     
-    def _format_beliefs(self, beliefs: List[Belief]) -> str:
-        """Format beliefs for the prompt."""
-        return "\n".join([
-            f"- {belief.content} (confidence: {belief.confidence})"
-            for belief in beliefs
-        ])
+    def _distinct(self, forks: List[CognitionRow], num_forks: int) -> List[CognitionRow]:
+        """Drop near-identical forks and keep at most `num_forks`."""
+        if not settings.DEDUP_ENABLED:
+            return forks[:num_forks]
+        return deduplicator.filter(forks, row_fields, limit=num_forks)
 
 # Create a singleton instance
 forker = Forker()
\ No newline at end of file
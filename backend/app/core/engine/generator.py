@@ -3,13 +3,20 @@ Generator module for SimForge.
 Handles the generation of cognition sequences using LLMs.
 """
 import os
-import json
 import asyncio
-from typing import List, Dict, Any, Optional
-import httpx
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple, Union
+from pydantic import ValidationError
 from ...core.utils.config import settings
 from ...core.utils.logger import app_logger
-from ...core.schema.cognition import CognitionSequence, CognitionRow, Belief
+from ...core.schema.cognition import CognitionSequence, CognitionRow
+from ...services.llm.client import llm_client
+from ..prompts.manager import prompt_manager
+from .stream_parser import IncrementalSequenceParser, StreamParseError
+from .decoding import decode_sequence, decode_row
+from .dedup import deduplicator, sequence_fields, overgenerate
+
+class DroppedStreamError(Exception):
+    """Reported for a row stream whose sequence is discarded after its rows were emitted."""
 
 class Generator:
     """Generator class for creating cognition sequences using LLMs."""
@@ -18,14 +25,16 @@ class Generator:
         self.provider = settings.LLM_PROVIDER
         self.api_key = settings.LLM_API_KEY
         self.model = settings.LLM_MODEL
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self.llm = llm_client
+        self.prompts = prompt_manager
         
     async def generate_sequence(
         self, 
         context: str, 
         schema: Optional[Dict[str, Any]] = None,
         n: int = 1, 
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        cache: Optional[bool] = None
     ) -> List[CognitionSequence]:
         """
         Generate cognition sequences based on the provided context and schema.
@@ -35,227 +44,255 @@ class Generator:
             schema: Optional schema to guide generation
             n: Number of sequences to generate
             temperature: Temperature for generation
+            cache: Response cache policy (None for the default, True to opt in, False to bypass)
             
         Returns:
             List of generated CognitionSequence objects
         """
         app_logger.info(f"Generating {n} sequences with temperature {temperature}")
         
-        if self.provider == "openai":
-            return await self._generate_with_openai(context, schema, n, temperature)
-        elif self.provider == "local":
-            return await self._generate_with_local(context, schema, n, temperature)
-        else:
+        if self.provider not in ("openai", "local"):
             raise ValueError(f"Unsupported LLM provider: {self.provider}")
-    
-    async def _generate_with_openai(
-        self, 
-        context: str, 
-        schema: Optional[Dict[str, Any]],
-        n: int, 
-        temperature: float
-    ) -> List[CognitionSequence]:
-        """Generate sequences using OpenAI API."""
-        if not self.api_key:
-            raise ValueError("OpenAI API key not provided")
         
         system_prompt = self._build_system_prompt(schema)
         
         try:
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
-            # Create batch requests
-            tasks = []
-            for _ in range(n):
-                payload = {
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": context}
-                    ],
-                    "temperature": temperature,
-                    "response_format": {"type": "json_object"}
-                }
-                
-                tasks.append(
-                    self.client.post(
-                        "https://api.openai.com/v1/chat/completions",
-                        headers=headers,
-                        json=payload
-                    )
-                )
-            
-            # Execute batch requests concurrently
-            responses = await asyncio.gather(*tasks)
+            # Sample all n sequences in one multi-choice request where the provider supports it
+            contents = await self.llm.chat_completions(
+                system_prompt,
+                context,
+                n=overgenerate(n),
+                temperature=temperature,
+                cache=cache
+            )
             
             sequences = []
-            for response in responses:
-                response_data = response.json()
-                content = response_data["choices"][0]["message"]["content"]
-                
-                # Parse the JSON response
+            for content in contents:
+                # Parse and validate the JSON response in one pass
                 try:
-                    sequence_data = json.loads(content)
-                    sequence = self._parse_sequence(sequence_data)
-                    sequences.append(sequence)
-                except json.JSONDecodeError as e:
-                    app_logger.error(f"Failed to parse JSON response: {e}")
+                    sequences.append(decode_sequence(content))
+                except ValidationError as e:
+                    app_logger.error(f"Failed to parse sequence response: {e}")
                     app_logger.debug(f"Raw response: {content}")
                     continue
             
-            return sequences
+            return self._distinct(sequences, n)
             
         except Exception as e:
-            app_logger.error(f"Error generating with OpenAI: {str(e)}")
+            app_logger.error(f"Error generating with {self.provider} LLM: {str(e)}")
             raise
     
-    async def _generate_with_local(
-        self, 
-        context: str, 
-        schema: Optional[Dict[str, Any]],
-        n: int, 
-        temperature: float
-    ) -> List[CognitionSequence]:
-        """Generate sequences using a local LLM provider (e.g., Ollama, LM Studio)."""
+    async def iter_sequences(
+        self,
+        context: str,
+        schema: Optional[Dict[str, Any]] = None,
+        n: int = 1,
+        temperature: float = 0.7,
+        cache: Optional[bool] = None
+    ) -> AsyncIterator[CognitionSequence]:
+        """
+        Generate cognition sequences and yield each one as soon as its request completes.
+        
+        Unlike generate_sequence, the n samples are sent as independent requests so the
+        first result is available at the latency of the fastest completion. Requests that
+        fail or return unparseable content, and near-duplicates of sequences already
+        yielded, are logged and skipped; with DEDUP_OVERGENERATE above 1 extra requests
+        are sent and the iterator stops after n distinct sequences. Closing the iterator
+        cancels the requests still in flight.
+        
+        Args:
+            context: The context for generation
+            schema: Optional schema to guide generation
+            n: Number of sequences to generate
+            temperature: Temperature for generation
+            cache: Response cache policy (None for the default, True to opt in, False to bypass)
+            
+        Yields:
+            CognitionSequence objects in completion order
+        """
+        app_logger.info(f"Streaming {n} sequences with temperature {temperature}")
+        
+        if self.provider not in ("openai", "local"):
+            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        
         system_prompt = self._build_system_prompt(schema)
+        tasks = [
+            asyncio.ensure_future(
+                self.llm.chat_completion(system_prompt, context, temperature=temperature, cache=cache, sample=sample)
+            )
+            for sample in range(overgenerate(n))
+        ]
+        is_new = deduplicator.tracker(sequence_fields) if settings.DEDUP_ENABLED else None
+        yielded = 0
         
         try:
-            # Assuming local LLM API is running at the configured URL
-            local_api_url = settings.LOCAL_LLM_URL
-            
-            # Create batch requests
-            tasks = []
-            for _ in range(n):
-                payload = {
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": context}
-                    ],
-                    "temperature": temperature,
-                    "response_format": {"type": "json_object"}
-                }
-                
-                tasks.append(
-                    self.client.post(
-                        f"{local_api_url}/v1/chat/completions",
-                        json=payload
-                    )
-                )
-            
-            # Execute batch requests concurrently
-            responses = await asyncio.gather(*tasks)
-            
-            sequences = []
-            for response in responses:
-                response_data = response.json()
-                content = response_data["choices"][0]["message"]["content"]
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    content = await next_done
+                except Exception as e:
+                    app_logger.error(f"Error generating with {self.provider} LLM: {str(e)}")
+                    continue
                 
-                # Parse the JSON response
                 try:
-                    sequence_data = json.loads(content)
-                    sequence = self._parse_sequence(sequence_data)
-                    sequences.append(sequence)
-                except json.JSONDecodeError as e:
-                    app_logger.error(f"Failed to parse JSON response: {e}")
+                    sequence = decode_sequence(content)
+                except ValidationError as e:
+                    app_logger.error(f"Failed to parse sequence response: {e}")
                     app_logger.debug(f"Raw response: {content}")
                     continue
-            
-            return sequences
-            
-        except Exception as e:
-            app_logger.error(f"Error generating with local LLM: {str(e)}")
-            raise
+                
+                if is_new is not None and not is_new(sequence):
+                    app_logger.info(f"Dropped near-duplicate sequence: {sequence.title}")
+                    continue
+                
+                yield sequence
+                yielded += 1
+                if yielded >= n:
+                    return
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
     
-    def _build_system_prompt(self, schema: Optional[Dict[str, Any]] = None) -> str:
-        """Build the system prompt for generation."""
-        base_prompt = """
-You are SimForge, a synthetic cognition system. Your task is to generate a sequence of cognitive steps that represent how an agent would approach a problem.
-
-For each step in the sequence, provide:
-1. A clear goal or objective
-2. The beliefs held at that point (with confidence levels from 0-1)
-3. The operation or action taken (one of: "Reflect", "Act", "Plan", "Fork")
-4. The output or result of that operation
-
-The sequence should be coherent, logical, and demonstrate a progression of thought that leads to a solution or conclusion.
-
-CONSTRAINTS:
-- Each step should build on previous steps
-- Beliefs should evolve as new information is discovered
-- Operations should be specific and actionable
-- Outputs should be concrete and informative
-
-FORMAT YOUR RESPONSE AS A JSON OBJECT WITH THE FOLLOWING STRUCTURE:
-{
-  "title": "Title of the sequence",
-  "description": "Brief description of the sequence",
-  "rows": [
-    {
-      "goal": "Goal for step 1",
-      "beliefs": [
-        {"content": "Belief 1", "confidence": 0.8},
-        {"content": "Belief 2", "confidence": 0.6}
-      ],
-      "operation": "Reflect",
-      "output": "Output of step 1"
-    },
-    {
-      "goal": "Goal for step 2",
-      "beliefs": [
-        {"content": "Updated belief 1", "confidence": 0.9},
-        {"content": "New belief based on step 1", "confidence": 0.7}
-      ],
-      "operation": "Plan",
-      "output": "Output of step 2"
-    }
-  ]
-}
-"""
+    async def stream_rows(
+        self,
+        context: str,
+        schema: Optional[Dict[str, Any]] = None,
+        temperature: float = 0.7,
+        cache: Optional[bool] = None,
+        sample: int = 0
+    ) -> AsyncIterator[Union[CognitionRow, CognitionSequence]]:
+        """
+        Generate one sequence over a streaming completion, yielding rows as they close.
         
-        # If a schema is provided, include it in the system prompt
-        if schema:
-            schema_str = json.dumps(schema, indent=2)
-            base_prompt += f"\n\nUSE THIS SCHEMA FOR YOUR RESPONSE:\n{schema_str}"
+        Each CognitionRow is yielded as soon as its JSON object is complete; the final
+        item is the full CognitionSequence, which reuses the rows already yielded.
+        A clearly malformed stream raises StreamParseError and closes the connection
+        so the provider stops generating.
         
-        return base_prompt
+        Args:
+            context: The context for generation
+            schema: Optional schema to guide generation
+            temperature: Temperature for generation
+            cache: Response cache policy (None for the default, True to opt in, False to bypass)
+            sample: Index of this sample among identical requests, so cached samples stay distinct
+            
+        Yields:
+            CognitionRow objects, then the completed CognitionSequence
+        """
+        if self.provider not in ("openai", "local"):
+            raise ValueError(f"Unsupported LLM provider: {self.provider}")
+        
+        system_prompt = self._build_system_prompt(schema)
+        parser = IncrementalSequenceParser(decode_row)
+        stream = self.llm.stream_chat_completion(
+            system_prompt,
+            context,
+            temperature=temperature,
+            cache=cache,
+            sample=sample
+        )
+        
+        try:
+            async for delta in stream:
+                for row in parser.feed(delta):
+                    yield row
+        except StreamParseError as e:
+            app_logger.error(f"Aborting malformed generation after {len(parser.rows)} rows: {e}")
+            raise
+        finally:
+            await stream.aclose()
+        
+        yield parser.finish()
     
-    def _parse_sequence(self, data: Dict[str, Any]) -> CognitionSequence:
-        """Parse the sequence data into a CognitionSequence object."""
-        rows = []
+    async def iter_row_events(
+        self,
+        context: str,
+        schema: Optional[Dict[str, Any]] = None,
+        n: int = 1,
+        temperature: float = 0.7,
+        cache: Optional[bool] = None
+    ) -> AsyncIterator[Tuple[int, Union[CognitionRow, CognitionSequence, Exception]]]:
+        """
+        Run n streaming generations concurrently and merge their output.
         
-        for row_data in data.get("rows", []):
-            beliefs = [
-                Belief(
-                    content=belief.get("content", ""),
-                    confidence=belief.get("confidence", 1.0),
-                    source=belief.get("source")
-                )
-                for belief in row_data.get("beliefs", [])
-            ]
-            
-            # Ensure operation is one of the allowed values
-            operation = row_data.get("operation", "Reflect")
-            if operation not in ["Reflect", "Act", "Plan", "Fork"]:
-                operation = "Reflect"
+        As in iter_sequences, DEDUP_OVERGENERATE extra streams are started and completed
+        sequences that are near-duplicates of one already yielded are dropped. Rows are
+        emitted before their sequence can be compared, so a dropped stream, and every
+        stream still open once n distinct sequences are done, ends with a
+        DroppedStreamError telling the caller to discard the rows it already received.
+        
+        Args:
+            context: The context for generation
+            schema: Optional schema to guide generation
+            n: Number of sequences to generate
+            temperature: Temperature for generation
+            cache: Response cache policy (None for the default, True to opt in, False to bypass)
             
-            row = CognitionRow(
-                goal=row_data.get("goal", ""),
-                beliefs=beliefs,
-                operation=operation,
-                output=row_data.get("output", "")
-            )
-            rows.append(row)
+        Yields:
+            (stream index, item) pairs, where item is a CognitionRow, the completed
+            CognitionSequence, or the exception that ended that stream
+        """
+        app_logger.info(f"Streaming rows of {n} sequences with temperature {temperature}")
         
-        return CognitionSequence(
-            title=data.get("title", "Untitled Sequence"),
-            description=data.get("description", ""),
-            rows=rows,
-            metadata=data.get("metadata", {})
-        )
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def pump(index: int):
+            try:
+                async for item in self.stream_rows(context, schema, temperature, cache=cache, sample=index):
+                    await queue.put((index, item))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                app_logger.error(f"Error streaming with {self.provider} LLM: {str(e)}")
+                await queue.put((index, e))
+            finally:
+                queue.put_nowait((index, None))
+        
+        tasks = [asyncio.create_task(pump(index)) for index in range(overgenerate(n))]
+        is_new = deduplicator.tracker(sequence_fields) if settings.DEDUP_ENABLED else None
+        remaining = len(tasks)
+        # Streams that have emitted rows but not yet their sequence or error
+        open_streams = set()
+        yielded = 0
+        
+        try:
+            while remaining:
+                index, item = await queue.get()
+                if item is None:
+                    remaining -= 1
+                    continue
+                
+                if isinstance(item, CognitionRow):
+                    open_streams.add(index)
+                    yield index, item
+                    continue
+                
+                open_streams.discard(index)
+                if isinstance(item, CognitionSequence) and is_new is not None and not is_new(item):
+                    app_logger.info(f"Dropped near-duplicate sequence: {item.title}")
+                    item = DroppedStreamError("Near-duplicate of an earlier sequence")
+                yield index, item
+                
+                if isinstance(item, CognitionSequence):
+                    yielded += 1
+                    if yielded >= n:
+                        for other in sorted(open_streams):
+                            yield other, DroppedStreamError(f"Stopped after {n} distinct sequences")
+                        return
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def _distinct(self, sequences: List[CognitionSequence], n: int) -> List[CognitionSequence]:
+        """Drop near-identical sequences and keep at most `n`."""
+        if not settings.DEDUP_ENABLED:
+            return sequences[:n]
+        return deduplicator.filter(sequences, sequence_fields, limit=n)
+    
+    def _build_system_prompt(self, schema: Optional[Dict[str, Any]] = None) -> str:
+        """Build the system prompt for generation."""
+        return self.prompts.generation_system_prompt(schema)
 
 # Create a singleton instance
 generator = Generator()
\ No newline at end of file
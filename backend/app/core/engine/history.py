@@ -0,0 +1,567 @@
+"""
+History module for SimForge.
+Versioned edit history of sequences with row-level deltas, undo/redo and diffs.
+"""
+import json
+import asyncio
+import weakref
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Set, Tuple, Optional, Iterable, Any
+from uuid import UUID
+from pydantic import TypeAdapter
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionSequence
+from ...core.schema.history import EditOperation, VersionInfo, RowChange, SequenceDiff
+from ...services.memory.sequences import SequenceRepository, sequence_repository
+from .compact import CompactRow
+
+# Delta steps, applied in order to a list of rows:
+#   ("set", index, row), ("insert", index, row), ("delete", index, row), ("fields", {name: (old, new)})
+# "delete" carries the removed row so that every delta can be inverted.
+Step = Tuple[Any, ...]
+HEADER_FIELDS = ("title", "description", "metadata")
+# Validators of the header fields' values, so a bad value is rejected before it becomes a version
+_HEADER_TYPES = {name: TypeAdapter(CognitionSequence.model_fields[name].annotation) for name in HEADER_FIELDS}
+
+def _apply(rows: List[CompactRow], header: Dict[str, Any], steps: Tuple[Step, ...]) -> None:
+    for step in steps:
+        kind = step[0]
+        if kind == "set":
+            rows[step[1]] = step[2]
+        elif kind == "insert":
+            rows.insert(step[1], step[2])
+        elif kind == "delete":
+            del rows[step[1]]
+        else:
+            header.update((name, new) for name, (_, new) in step[1].items())
+
+def _encode_steps(steps: Tuple[Step, ...]) -> str:
+    return json.dumps([
+        [step[0], step[1]] if step[0] == "fields" else [step[0], step[1], step[2].to_list()]
+        for step in steps
+    ])
+
+def _decode_steps(text: str) -> Tuple[Step, ...]:
+    return tuple(
+        ("fields", step[1]) if step[0] == "fields" else (step[0], step[1], CompactRow.from_list(step[2]))
+        for step in json.loads(text)
+    )
+
+def _stable(old_indexes: Iterable[int]) -> Set[int]:
+    """
+    Positions (in new order) of the rows kept in place: a longest run of shared rows whose
+    old order is preserved. Every other shared row counts as moved.
+    """
+    tails: List[int] = []
+    tail_positions: List[int] = []
+    previous: List[int] = []
+    for position, old_index in enumerate(old_indexes):
+        slot = bisect_left(tails, old_index)
+        previous.append(tail_positions[slot - 1] if slot else -1)
+        if slot == len(tails):
+            tails.append(old_index)
+            tail_positions.append(position)
+        else:
+            tails[slot] = old_index
+            tail_positions[slot] = position
+    stable = set()
+    position = tail_positions[-1] if tail_positions else -1
+    while position >= 0:
+        stable.add(position)
+        position = previous[position]
+    return stable
+
+class Version:
+    """
+    One version of a sequence: its parent, the delta from the parent, and the inverse delta.
+
+    Every `snapshot_interval` versions along a branch also keep a full snapshot of
+    their rows. Snapshots are tuples of the same immutable CompactRow objects the
+    other versions reference, so they share every unchanged row.
+    """
+
+    __slots__ = ("number", "parent", "forward", "inverse", "snapshot", "header", "distance", "message", "created_at", "size")
+
+    def __init__(
+        self,
+        number: int,
+        parent: Optional["Version"],
+        forward: Tuple[Step, ...],
+        inverse: Tuple[Step, ...],
+        message: Optional[str],
+        size: int,
+        created_at: Optional[datetime] = None
+    ):
+        self.number = number
+        self.parent = parent
+        self.forward = forward
+        self.inverse = inverse
+        self.snapshot: Optional[Tuple[CompactRow, ...]] = None
+        self.header: Optional[Dict[str, Any]] = None
+        self.distance = parent.distance + 1 if parent is not None else 0
+        self.message = message
+        self.created_at = created_at or datetime.now()
+        self.size = size
+
+    def record(self, sequence_id: bytes) -> tuple:
+        """The version's stored record (see SequenceStore.save_edit)."""
+        snapshot = None
+        if self.snapshot is not None:
+            snapshot = json.dumps([[row.to_list() for row in self.snapshot], self.header])
+        return (
+            sequence_id,
+            self.number,
+            self.parent.number if self.parent is not None else None,
+            _encode_steps(self.forward),
+            _encode_steps(self.inverse),
+            snapshot,
+            self.message,
+            self.created_at.isoformat(),
+            self.size
+        )
+
+    def info(self, head: bool = False) -> VersionInfo:
+        return VersionInfo(
+            version=self.number,
+            parent=self.parent.number if self.parent is not None else None,
+            message=self.message,
+            created_at=self.created_at,
+            rows=self.size,
+            snapshot=self.snapshot is not None,
+            head=head
+        )
+
+class SequenceHistory:
+    """
+    Edit history of one sequence.
+
+    The head version's rows are kept materialized; committing an edit records only
+    the row-level delta and its inverse, so creating a version costs O(size of the
+    edit), and undo/redo apply one delta to the head. Versions form a tree: editing
+    after an undo starts a new branch and clears the redo stack, but every version
+    stays reachable by number. Checking out an arbitrary version replays at most
+    `snapshot_interval` deltas forward from the nearest snapshot.
+
+    Versions created since the last call to records() are kept for the caller to
+    store, and a stored history is rebuilt from those records with restore().
+    """
+
+    def __init__(self, sequence: CognitionSequence, snapshot_interval: int = 32):
+        self.sequence_id = sequence.id
+        self.created_at = sequence.created_at
+        self.snapshot_interval = snapshot_interval
+        self._rows = [CompactRow.from_model(row) for row in sequence.rows]
+        self._header = {name: getattr(sequence, name) for name in HEADER_FIELDS}
+        self._positions: Optional[Dict[int, int]] = None
+        self._versions: List[Version] = []
+        self._redo: List[Version] = []
+        root = Version(0, None, (), (), "Initial version", len(self._rows))
+        self._snapshot(root)
+        self._versions.append(root)
+        self._unsaved: List[Version] = [root]
+        self.head = root
+
+    @classmethod
+    def restore(
+        cls,
+        sequence: CognitionSequence,
+        head: int,
+        redo: List[int],
+        records: List[tuple],
+        snapshot_interval: int = 32
+    ) -> "SequenceHistory":
+        """
+        Rebuild a stored history.
+
+        Args:
+            sequence: The stored sequence, which holds the head version's content
+            head: Number of the head version
+            redo: Numbers of the versions on the redo stack, bottom first
+            records: (number, parent, forward, inverse, snapshot, message, created_at, size)
+                records of every version, ordered by number
+
+        Returns:
+            The history, with nothing left to store
+        """
+        history = cls(sequence, snapshot_interval)
+        history._versions = []
+        for number, parent, forward, inverse, snapshot, message, created_at, size in records:
+            version = Version(
+                number,
+                history._versions[parent] if parent is not None else None,
+                _decode_steps(forward),
+                _decode_steps(inverse),
+                message,
+                size,
+                datetime.fromisoformat(created_at)
+            )
+            if snapshot is not None:
+                rows, header = json.loads(snapshot)
+                version.snapshot = tuple(CompactRow.from_list(row) for row in rows)
+                version.header = header
+                version.distance = 0
+            history._versions.append(version)
+        history._redo = [history._versions[number] for number in redo]
+        history._unsaved = []
+        history.head = history._versions[head]
+        return history
+
+    def records(self) -> Tuple[tuple, List[tuple]]:
+        """
+        Hand over the history's state for storing: (head, redo) and the records of the
+        versions created since the last call.
+        """
+        sequence_id = self.sequence_id.bytes
+        records = [version.record(sequence_id) for version in self._unsaved]
+        self._unsaved = []
+        return (self.head.number, json.dumps([version.number for version in self._redo])), records
+
+    @property
+    def head_rows(self) -> Tuple[CompactRow, ...]:
+        return tuple(self._rows)
+
+    def changes_since(self, rows: Iterable[CompactRow]) -> Tuple[List[int], List[int], List[UUID]]:
+        """
+        Compare the head against earlier head rows.
+
+        Rows are immutable, so a row object still in the head is unchanged.
+
+        Returns:
+            Positions of the rows inserted or replaced, positions of the other rows that
+            moved, and the ids of the rows removed
+        """
+        previous = {row.id: (index, row) for index, row in enumerate(rows)}
+        changed: List[int] = []
+        moved: List[int] = []
+        for index, row in enumerate(self._rows):
+            old = previous.pop(row.id, None)
+            if old is None or old[1] is not row:
+                changed.append(index)
+            elif old[0] != index:
+                moved.append(index)
+        return changed, moved, [UUID(int=row_id) for row_id in previous]
+
+    def _snapshot(self, version: Version) -> None:
+        version.snapshot = tuple(self._rows)
+        version.header = dict(self._header)
+        version.distance = 0
+
+    def _position(self, row_id: int) -> Optional[int]:
+        if self._positions is None:
+            self._positions = {row.id: index for index, row in enumerate(self._rows)}
+        return self._positions.get(row_id)
+
+    def _steps(self, operations: List[EditOperation]) -> Tuple[Tuple[Step, ...], Tuple[Step, ...]]:
+        """
+        Translate edit operations into forward and inverse delta steps against the head, validating them.
+
+        Only row replacements and field updates leave positions unchanged, so the head
+        is used as is until the first insert, delete or move, and copied from there on.
+        """
+        rows = self._rows
+        header = dict(self._header)
+        position = self._position
+        # Replacements made while the head is still shared, by index
+        replaced: Optional[Dict[int, CompactRow]] = {}
+        forward: List[Step] = []
+        inverse: List[Step] = []
+
+        def find(row_id: Optional[UUID]) -> int:
+            index = position(row_id.int) if row_id is not None else None
+            if index is None:
+                raise ValueError(f"Row not found: {row_id}")
+            return index
+
+        for operation in operations:
+            if operation.op == "set_fields":
+                unknown = set(operation.fields) - set(HEADER_FIELDS)
+                if unknown:
+                    raise ValueError(f"Unsupported sequence fields: {', '.join(sorted(unknown))}")
+                values = {name: _HEADER_TYPES[name].validate_python(value) for name, value in operation.fields.items()}
+                changes = {
+                    name: (header[name], value)
+                    for name, value in values.items()
+                    if header[name] != value
+                }
+                if changes:
+                    forward.append(("fields", changes))
+                    inverse.append(("fields", {name: (new, old) for name, (old, new) in changes.items()}))
+                    header.update((name, new) for name, (_, new) in changes.items())
+                continue
+
+            if operation.op == "set_row":
+                if operation.row is None:
+                    raise ValueError("set_row requires a row")
+                index = find(operation.row.id)
+                row = CompactRow.from_model(operation.row)
+                forward.append(("set", index, row))
+                if replaced is None:
+                    inverse.append(("set", index, rows[index]))
+                    rows[index] = row
+                else:
+                    inverse.append(("set", index, replaced.get(index, rows[index])))
+                    replaced[index] = row
+                continue
+
+            if replaced is not None:
+                rows = list(rows)
+                for index, row in replaced.items():
+                    rows[index] = row
+                replaced = None
+            if operation.op == "insert_row":
+                if operation.row is None:
+                    raise ValueError("insert_row requires a row")
+                row = CompactRow.from_model(operation.row)
+                if position(row.id) is not None:
+                    raise ValueError(f"Row already exists: {operation.row.id}")
+                index = len(rows) if operation.index is None else min(operation.index, len(rows))
+                steps = [("insert", index, row)]
+            elif operation.op == "delete_row":
+                index = find(operation.row_id)
+                steps = [("delete", index, rows[index])]
+            else:
+                if operation.index is None:
+                    raise ValueError("move_row requires an index")
+                index = find(operation.row_id)
+                steps = [("delete", index, rows[index]), ("insert", min(operation.index, len(rows) - 1), rows[index])]
+
+            for step in steps:
+                forward.append(step)
+                inverse.append(("delete" if step[0] == "insert" else "insert", step[1], step[2]))
+            _apply(rows, {}, tuple(steps))
+            positions = {row.id: index for index, row in enumerate(rows)}
+            position = positions.get
+
+        return tuple(forward), tuple(reversed(inverse))
+
+    def _advance(self, steps: Tuple[Step, ...]) -> None:
+        """Apply steps to the head, dropping the cached row positions if rows moved."""
+        _apply(self._rows, self._header, steps)
+        if any(step[0] in ("insert", "delete") for step in steps):
+            self._positions = None
+
+    def commit(self, operations: List[EditOperation], message: Optional[str] = None) -> Version:
+        """
+        Apply edits to the head as one new version.
+
+        Args:
+            operations: The edits, applied in order
+            message: Optional description of the change
+
+        Returns:
+            The new head version
+        """
+        forward, inverse = self._steps(operations)
+        self._advance(forward)
+
+        version = Version(len(self._versions), self.head, forward, inverse, message, len(self._rows))
+        if version.distance >= self.snapshot_interval:
+            self._snapshot(version)
+        self._versions.append(version)
+        self._unsaved.append(version)
+        self._redo.clear()
+        self.head = version
+        return version
+
+    def undo(self) -> Version:
+        """Move the head back to its parent version."""
+        if self.head.parent is None:
+            raise ValueError("Nothing to undo")
+        self._advance(self.head.inverse)
+        self._redo.append(self.head)
+        self.head = self.head.parent
+        return self.head
+
+    def redo(self) -> Version:
+        """Move the head forward to the version last undone."""
+        if not self._redo:
+            raise ValueError("Nothing to redo")
+        version = self._redo.pop()
+        self._advance(version.forward)
+        self.head = version
+        return version
+
+    def version(self, number: int) -> Version:
+        if not 0 <= number < len(self._versions):
+            raise KeyError(number)
+        return self._versions[number]
+
+    def _materialize(self, number: int) -> Tuple[List[CompactRow], Dict[str, Any]]:
+        version = self.version(number)
+        if version is self.head:
+            return list(self._rows), dict(self._header)
+
+        chain = []
+        while version.snapshot is None:
+            chain.append(version)
+            version = version.parent
+        rows = list(version.snapshot)
+        header = dict(version.header)
+        for step in reversed(chain):
+            _apply(rows, header, step.forward)
+        return rows, header
+
+    def checkout(self, number: Optional[int] = None) -> CognitionSequence:
+        """
+        Return the sequence as of a version.
+
+        Args:
+            number: The version number (None for the head)
+
+        Returns:
+            The sequence's content at that version
+        """
+        version = self.head if number is None else self.version(number)
+        rows, header = self._materialize(version.number)
+        return CognitionSequence(
+            id=self.sequence_id,
+            rows=[row.to_model() for row in rows],
+            created_at=self.created_at,
+            updated_at=version.created_at,
+            **header
+        )
+
+    def diff(self, from_number: int, to_number: int) -> SequenceDiff:
+        """
+        Compare two versions.
+
+        Args:
+            from_number: The version to compare from
+            to_number: The version to compare to
+
+        Returns:
+            The changed sequence fields, and the rows added, removed or changed
+        """
+        old_rows, old_header = self._materialize(from_number)
+        new_rows, new_header = self._materialize(to_number)
+        old_positions = {row.id: (index, row) for index, row in enumerate(old_rows)}
+
+        diff = SequenceDiff(from_version=from_number, to_version=to_number)
+        diff.fields = {
+            name: {"from": old_header[name], "to": new_header[name]}
+            for name in HEADER_FIELDS
+            if old_header[name] != new_header[name]
+        }
+        shared = [(index, row, old_positions[row.id]) for index, row in enumerate(new_rows) if row.id in old_positions]
+        stayed = _stable(old_index for _, _, (old_index, _) in shared)
+        diff.added = [row.to_model() for row in new_rows if row.id not in old_positions]
+        for position, (index, row, (old_index, old_row)) in enumerate(shared):
+            fields = [] if old_row is row else self._changed_fields(old_row, row)
+            if fields or position not in stayed:
+                diff.changed.append(RowChange(row_id=UUID(int=row.id), fields=fields, from_index=old_index, to_index=index))
+        seen = {row.id for _, row, _ in shared}
+        diff.removed = [UUID(int=row.id) for row in old_rows if row.id not in seen]
+        return diff
+
+    @staticmethod
+    def _changed_fields(old: CompactRow, new: CompactRow) -> List[str]:
+        fields = [
+            name for name in ("goal", "operation", "output", "parent_id", "metadata")
+            if getattr(old, name) != getattr(new, name)
+        ]
+        if (old.contents, list(old.confidences), old.sources) != (new.contents, list(new.confidences), new.sources):
+            fields.append("beliefs")
+        return fields
+
+    def versions(self) -> List[VersionInfo]:
+        return [version.info(head=version is self.head) for version in self._versions]
+
+class HistoryManager:
+    """
+    Keeps the edit histories of sequences in the store, and those of recently edited sequences in memory.
+
+    A history is started from the stored sequence the first time it is edited. Every
+    commit, undo and redo is written back in one transaction with the new versions'
+    deltas (and snapshots) and the head and redo stack, and only the rows it inserted,
+    replaced, moved or removed are written and re-indexed, so the stored sequence
+    always matches the head. The least recently used histories beyond `max_sequences`
+    are dropped from memory and reloaded from the store when next needed; a stored
+    history whose sequence was since replaced by a plain save is started over.
+    """
+
+    def __init__(self, repository: SequenceRepository, snapshot_interval: int = 32, max_sequences: int = 256):
+        self.repository = repository
+        self.snapshot_interval = snapshot_interval
+        self.max_sequences = max_sequences
+        self._histories: "OrderedDict[UUID, SequenceHistory]" = OrderedDict()
+        # A lock lives as long as a caller holds or waits for it, so evicting a history never drops one in use
+        self._locks: "weakref.WeakValueDictionary[UUID, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _lock(self, sequence_id: UUID) -> asyncio.Lock:
+        lock = self._locks.get(sequence_id)
+        if lock is None:
+            lock = self._locks[sequence_id] = asyncio.Lock()
+        return lock
+
+    async def get(self, sequence_id: UUID) -> Optional[SequenceHistory]:
+        """Return the history of a stored sequence, starting one if needed (None if the sequence is not stored)."""
+        history = self._histories.get(sequence_id)
+        if history is not None:
+            self._histories.move_to_end(sequence_id)
+            return history
+
+        sequence = await self.repository.get(sequence_id)
+        if sequence is None:
+            return None
+        stored = await self.repository.get_history(sequence_id)
+        history = self._histories.get(sequence_id)
+        if history is None:
+            history = self._start(sequence, stored)
+            self._histories[sequence_id] = history
+            while len(self._histories) > self.max_sequences:
+                evicted, _ = self._histories.popitem(last=False)
+                app_logger.info(f"Dropped edit history of sequence {evicted}")
+        return history
+
+    def _start(self, sequence: CognitionSequence, stored: Optional[Tuple[int, str, str, List[tuple]]]) -> SequenceHistory:
+        if stored is not None:
+            head, redo, updated_at, records = stored
+            # The stored sequence carries the head version's timestamp unless it was saved over since
+            if records[head][6] == updated_at:
+                return SequenceHistory.restore(sequence, head, json.loads(redo), records, self.snapshot_interval)
+            app_logger.warning(f"Sequence {sequence.id} was replaced outside its edit history, starting a new history")
+        return SequenceHistory(sequence, self.snapshot_interval)
+
+    async def _update(self, sequence_id: UUID, change) -> Optional[Tuple[Version, CognitionSequence]]:
+        async with self._lock(sequence_id):
+            history = await self.get(sequence_id)
+            if history is None:
+                return None
+            rows = history.head_rows
+            version = change(history)
+            try:
+                sequence = history.checkout()
+                changed, moved, deleted = history.changes_since(rows)
+                await self.repository.save_edit(sequence, changed, moved, deleted, history.records())
+            except Exception:
+                # Reload from the store next time rather than keep a head that was not stored
+                self._histories.pop(sequence_id, None)
+                raise
+            return version, sequence
+
+    async def commit(
+        self,
+        sequence_id: UUID,
+        operations: List[EditOperation],
+        message: Optional[str] = None
+    ) -> Optional[Tuple[Version, CognitionSequence]]:
+        """Apply edits as a new version and store the result; None if the sequence is not stored."""
+        return await self._update(sequence_id, lambda history: history.commit(operations, message))
+
+    async def undo(self, sequence_id: UUID) -> Optional[Tuple[Version, CognitionSequence]]:
+        """Undo the head version and store the result; None if the sequence is not stored."""
+        return await self._update(sequence_id, lambda history: history.undo())
+
+    async def redo(self, sequence_id: UUID) -> Optional[Tuple[Version, CognitionSequence]]:
+        """Redo the version last undone and store the result; None if the sequence is not stored."""
+        return await self._update(sequence_id, lambda history: history.redo())
+
+# Create a singleton instance
+history_manager = HistoryManager(
+    sequence_repository,
+    settings.HISTORY_SNAPSHOT_INTERVAL,
+    settings.HISTORY_MAX_SEQUENCES
+)
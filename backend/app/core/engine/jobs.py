@@ -0,0 +1,351 @@
+"""
+Jobs module for SimForge.
+Runs bulk sequence generation in the background with persistent, resumable progress.
+"""
+import os
+import json
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Set, Tuple
+from uuid import uuid4
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionSequence
+from ...core.schema.jobs import JobRequest, JobStatus
+from ...services.memory.sequences import sequence_repository
+from .generator import generator
+
+class JobManager:
+    """
+    Background job queue for bulk generation.
+
+    Every context of a job is a persisted work item. A fixed pool of workers pulls
+    items from a shared queue, so JOB_CONCURRENCY bounds the number of concurrent
+    generations across all jobs. Each finished item's sequences are saved to the
+    sequence store (an idempotent upsert), then appended to the job's JSONL
+    file and marked done in the same locked step, and on restart every item not
+    marked done is queued again. Delivery is at-least-once: an item interrupted
+    between the two steps can appear twice in the output, tagged with the same
+    item index.
+    """
+
+    def __init__(self, db_path: str, output_dir: str, concurrency: int, max_attempts: int):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, Set[asyncio.Task]] = {}
+        self._cancelled: Set[str] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    sequences_written INTEGER NOT NULL DEFAULT 0,
+                    output_path TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    error TEXT
+                );
+                CREATE TABLE IF NOT EXISTS job_items (
+                    job_id TEXT NOT NULL,
+                    idx INTEGER NOT NULL,
+                    context TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    PRIMARY KEY (job_id, idx)
+                );
+                CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items(job_id, status);
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    async def start(self) -> None:
+        """Start the worker pool and requeue unfinished work from a previous run."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.concurrency)]
+
+        pending = await asyncio.to_thread(self._load_unfinished)
+        for job_id, idx in pending:
+            self._queue.put_nowait((job_id, idx))
+        if pending:
+            app_logger.info(f"Resumed {len(pending)} pending job items")
+
+    async def stop(self) -> None:
+        """Stop the workers. In-flight items stay pending and resume on the next start."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _load_unfinished(self) -> List[Tuple[str, int]]:
+        with self._lock:
+            conn = self._connect()
+            return conn.execute(
+                "SELECT i.job_id, i.idx FROM job_items i JOIN jobs j ON j.id = i.job_id "
+                "WHERE j.status IN ('pending', 'running') AND i.status = 'pending' "
+                "ORDER BY j.created_at, i.idx"
+            ).fetchall()
+
+    async def submit(self, request: JobRequest) -> JobStatus:
+        """
+        Persist a new job and queue its items.
+
+        Args:
+            request: The job request containing the contexts and generation parameters
+
+        Returns:
+            JobStatus of the new job
+        """
+        if self._queue is None:
+            await self.start()
+
+        job_id = str(uuid4())
+        output_path = os.path.join(self.output_dir, f"{job_id}.jsonl")
+        await asyncio.to_thread(self._insert_job, job_id, request, output_path)
+        for idx in range(len(request.contexts)):
+            self._queue.put_nowait((job_id, idx))
+
+        app_logger.info(f"Submitted job {job_id} with {len(request.contexts)} contexts")
+        return await self.get(job_id)
+
+    def _insert_job(self, job_id: str, request: JobRequest, output_path: str) -> None:
+        now = datetime.now().isoformat()
+        params = request.model_dump(exclude={"contexts"})
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, status, request, total, output_path, created_at, updated_at) "
+                    "VALUES (?, 'pending', ?, ?, ?, ?, ?)",
+                    (job_id, json.dumps(params), len(request.contexts), output_path, now, now)
+                )
+                conn.executemany(
+                    "INSERT INTO job_items (job_id, idx, context, status) VALUES (?, ?, ?, 'pending')",
+                    ((job_id, idx, context) for idx, context in enumerate(request.contexts))
+                )
+
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        """Return the status and progress counts of a job, or None if it does not exist."""
+        return await asyncio.to_thread(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT id, status, total, sequences_written, output_path, created_at, updated_at, error "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status",
+                (job_id,)
+            ).fetchall())
+
+        return JobStatus(
+            id=row[0],
+            status=row[1],
+            total=row[2],
+            completed=counts.get("done", 0),
+            failed=counts.get("failed", 0),
+            pending=counts.get("pending", 0),
+            sequences_written=row[3],
+            output_path=row[4],
+            created_at=datetime.fromisoformat(row[5]),
+            updated_at=datetime.fromisoformat(row[6]),
+            error=row[7]
+        )
+
+    async def list_jobs(self, limit: int = 50) -> List[JobStatus]:
+        """Return the most recent jobs."""
+        job_ids = await asyncio.to_thread(self._list_ids, limit)
+        jobs = [await self.get(job_id) for job_id in job_ids]
+        return [job for job in jobs if job is not None]
+
+    def _list_ids(self, limit: int) -> List[str]:
+        with self._lock:
+            conn = self._connect()
+            return [r[0] for r in conn.execute(
+                "SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()]
+
+    async def cancel(self, job_id: str) -> Optional[JobStatus]:
+        """
+        Cancel a job: pending items are skipped and in-flight generations are cancelled.
+
+        Returns:
+            JobStatus after cancellation, or None if the job does not exist
+        """
+        job = await self.get(job_id)
+        if job is None:
+            return None
+        if job.status in ("pending", "running"):
+            self._cancelled.add(job_id)
+            await asyncio.to_thread(self._set_status, job_id, "cancelled")
+            for task in list(self._running.get(job_id, ())):
+                task.cancel()
+            app_logger.info(f"Cancelled job {job_id}")
+        return await self.get(job_id)
+
+    def _set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = COALESCE(?, error), updated_at = ? WHERE id = ?",
+                    (status, error, datetime.now().isoformat(), job_id)
+                )
+
+    def _claim(self, job_id: str, idx: int) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Load a pending item and mark its job running; None if it should be skipped."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT j.status, j.request, i.context, i.status FROM job_items i "
+                "JOIN jobs j ON j.id = i.job_id WHERE i.job_id = ? AND i.idx = ?",
+                (job_id, idx)
+            ).fetchone()
+            if row is None or row[0] not in ("pending", "running") or row[3] != "pending":
+                return None
+            if row[0] == "pending":
+                with conn:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?",
+                        (datetime.now().isoformat(), job_id)
+                    )
+            return row[2], json.loads(row[1])
+
+    def _record(
+        self,
+        job_id: str,
+        idx: int,
+        sequences: List[CognitionSequence],
+        error: Optional[str]
+    ) -> bool:
+        """
+        Append an item's results to the job output and update its state.
+
+        Returns:
+            True if a failed item should be retried
+        """
+        with self._lock:
+            conn = self._connect()
+            retry = False
+            with conn:
+                if error is None:
+                    output_path = conn.execute("SELECT output_path FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+                    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                    with open(output_path, "a") as f:
+                        for sequence in sequences:
+                            f.write(json.dumps({
+                                "job_id": job_id,
+                                "item": idx,
+                                "sequence": sequence.model_dump(mode="json")
+                            }) + "\n")
+                    conn.execute(
+                        "UPDATE job_items SET status = 'done', attempts = attempts + 1, error = NULL "
+                        "WHERE job_id = ? AND idx = ?",
+                        (job_id, idx)
+                    )
+                    conn.execute(
+                        "UPDATE jobs SET sequences_written = sequences_written + ? WHERE id = ?",
+                        (len(sequences), job_id)
+                    )
+                else:
+                    attempts = conn.execute(
+                        "SELECT attempts FROM job_items WHERE job_id = ? AND idx = ?", (job_id, idx)
+                    ).fetchone()[0] + 1
+                    retry = attempts < self.max_attempts
+                    conn.execute(
+                        "UPDATE job_items SET status = ?, attempts = ?, error = ? WHERE job_id = ? AND idx = ?",
+                        ("pending" if retry else "failed", attempts, error, job_id, idx)
+                    )
+
+                counts = dict(conn.execute(
+                    "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+                ).fetchall())
+                status = "running"
+                if not counts.get("pending"):
+                    status = "completed" if counts.get("done") else "failed"
+                conn.execute(
+                    "UPDATE jobs SET status = CASE WHEN status = 'running' THEN ? ELSE status END, "
+                    "updated_at = ? WHERE id = ?",
+                    (status, datetime.now().isoformat(), job_id)
+                )
+            return retry
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id, idx = await self._queue.get()
+            try:
+                if job_id in self._cancelled:
+                    continue
+                claimed = await asyncio.to_thread(self._claim, job_id, idx)
+                if claimed is None:
+                    continue
+                context, params = claimed
+
+                task = asyncio.create_task(self._generate(context, params))
+                self._running.setdefault(job_id, set()).add(task)
+                try:
+                    sequences = await task
+                    error = None
+                except asyncio.CancelledError:
+                    if job_id not in self._cancelled:
+                        raise
+                    continue
+                except Exception as e:
+                    app_logger.error(f"Job {job_id} item {idx} failed: {str(e)}")
+                    sequences, error = [], str(e)
+                finally:
+                    self._running.get(job_id, set()).discard(task)
+
+                if await asyncio.to_thread(self._record, job_id, idx, sequences, error):
+                    self._queue.put_nowait((job_id, idx))
+            finally:
+                self._queue.task_done()
+
+    async def _generate(self, context: str, params: Dict[str, Any]) -> List[CognitionSequence]:
+        sequences = await generator.generate_sequence(
+            context=context,
+            schema=params.get("schema_config") or None,
+            n=params.get("n", 1),
+            temperature=params.get("temperature", 0.7),
+            cache=params.get("use_cache")
+        )
+        # Sequences were validated while being parsed
+        await sequence_repository.save(sequences)
+        return sequences
+
+# Create a singleton instance
+job_manager = JobManager(
+    db_path=settings.JOBS_DB_PATH,
+    output_dir=settings.OUTPUT_DIR,
+    concurrency=settings.JOB_CONCURRENCY,
+    max_attempts=settings.JOB_MAX_ATTEMPTS
+)
@@ -0,0 +1,187 @@
+"""
+Stream parser module for SimForge.
+Incrementally parses a streamed cognition sequence so rows can be emitted before the completion finishes.
+"""
+import re
+from typing import List, Optional, Callable
+from ...core.schema.cognition import CognitionSequence, CognitionRow
+from .decoding import decode_sequence
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+class StreamParseError(ValueError):
+    """Raised when a streamed completion is clearly not a well-formed cognition sequence."""
+
+class IncrementalSequenceParser:
+    """
+    Incremental parser for a JSON cognition sequence arriving in text deltas.
+
+    The parser tracks string/escape state and the container stack as characters arrive,
+    and slices out each object of the top-level "rows" array the moment it closes. Only
+    the row object's text is handed to the row factory, which parses and validates it in
+    one pass. The scan buffer is trimmed after every delta to the part still needed (an
+    open row or a short string that may be a key), so the work per delta is proportional
+    to the delta size. Structural errors (wrong top-level type, mismatched brackets,
+    trailing content, undecodable rows) raise StreamParseError immediately so the caller
+    can abort the request instead of paying for the rest of a bad generation.
+    """
+
+    MAX_PREAMBLE = 64
+    # Longer strings are never taken as object keys, so they need not be kept for that
+    MAX_KEY_LENGTH = 256
+
+    def __init__(self, row_factory: Callable[[str], CognitionRow]):
+        self._row_factory = row_factory
+        self._chunks: List[str] = []
+        self._buffer = ""
+        self._offset = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start: Optional[int] = 0
+        self._last_string: Optional[str] = None
+        self._pending_key: Optional[str] = None
+        self._container_keys: List[Optional[str]] = []
+        self._row_start: Optional[int] = None
+        self._closed = False
+        self.rows: List[CognitionRow] = []
+
+    def feed(self, chunk: str) -> List[CognitionRow]:
+        """
+        Consume a text delta.
+
+        Args:
+            chunk: The next piece of the completion
+
+        Returns:
+            Rows completed by this delta, in order
+        """
+        self._chunks.append(chunk)
+        completed: List[CognitionRow] = []
+        text = self._buffer + chunk
+        offset = self._offset
+
+        while self._pos < len(text):
+            i = self._pos
+            char = text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    continue
+                # Jump straight to the next quote or backslash; string bodies are most of the text
+                match = _STRING_SPECIAL.search(text, i)
+                if match is None:
+                    self._pos = len(text)
+                    break
+                j = match.start()
+                self._pos = j + 1
+                if text[j] == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                    self._last_string = text[self._string_start:j] if self._string_start is not None else None
+                continue
+
+            if char.isspace():
+                continue
+
+            if self._closed:
+                if char == "`":
+                    continue
+                raise StreamParseError(f"Unexpected content after the sequence object at offset {offset + i}")
+
+            if not self._stack and char != "{":
+                if offset + i >= self.MAX_PREAMBLE or char in "}]\"[":
+                    raise StreamParseError(f"Expected a JSON object, got {char!r} at offset {offset + i}")
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif char == ":":
+                if not self._stack or self._stack[-1] != "{":
+                    raise StreamParseError(f"Unexpected ':' at offset {offset + i}")
+                self._pending_key = self._last_string
+            elif char == ",":
+                self._pending_key = None
+            elif char in "{[":
+                if not self._stack:
+                    self._start = offset + i
+                self._container_keys.append(self._pending_key)
+                self._stack.append(char)
+                self._pending_key = None
+                if char == "{" and self._in_rows_array(depth_offset=1):
+                    self._row_start = i
+            elif char in "}]":
+                expected = "{" if char == "}" else "["
+                if not self._stack or self._stack[-1] != expected:
+                    raise StreamParseError(f"Mismatched {char!r} at offset {offset + i}")
+                is_row = char == "}" and self._row_start is not None and self._in_rows_array(depth_offset=1)
+                self._stack.pop()
+                self._container_keys.pop()
+                self._pending_key = None
+                if is_row:
+                    completed.append(self._emit_row(text[self._row_start:i + 1]))
+                    self._row_start = None
+                if not self._stack:
+                    self._closed = True
+                    self._end = offset + i + 1
+
+        self._trim(text)
+        return completed
+
+    def _trim(self, text: str) -> None:
+        """Keep only the part of the scanned text a later delta can still need."""
+        keep = self._pos
+        if self._row_start is not None:
+            keep = min(keep, self._row_start)
+        if self._in_string and self._string_start is not None:
+            if self._pos - self._string_start > self.MAX_KEY_LENGTH:
+                self._string_start = None
+            else:
+                keep = min(keep, self._string_start)
+        self._buffer = text[keep:]
+        self._offset += keep
+        self._pos -= keep
+        if self._row_start is not None:
+            self._row_start -= keep
+        if self._string_start is not None:
+            self._string_start -= keep
+
+    def _in_rows_array(self, depth_offset: int = 0) -> bool:
+        """Whether the container `depth_offset` levels below the top is the top-level rows array."""
+        depth = len(self._stack) - depth_offset
+        return (
+            depth == 2
+            and self._stack[1] == "["
+            and self._container_keys[1] == "rows"
+        )
+
+    def _emit_row(self, raw: str) -> CognitionRow:
+        try:
+            row = self._row_factory(raw)
+        except ValueError as e:
+            raise StreamParseError(f"Row {len(self.rows)} is not a valid cognition row: {e}")
+        self.rows.append(row)
+        return row
+
+    def finish(self) -> CognitionSequence:
+        """
+        Finalize the stream and build the sequence.
+
+        The rows already emitted are reused as-is, so their ids match what the caller saw.
+
+        Returns:
+            The complete CognitionSequence
+        """
+        if not self._closed or self._in_string:
+            raise StreamParseError("Stream ended before the sequence object was closed")
+        try:
+            return decode_sequence("".join(self._chunks)[self._start:self._end], rows=self.rows)
+        except ValueError as e:
+            raise StreamParseError(f"Sequence is not valid: {e}")
@@ -0,0 +1,151 @@
+"""
+Fork tree module for SimForge.
+Expands a row into a tree of forks breadth-first under depth, branching and LLM budgets.
+"""
+from typing import List, Dict, Any, Optional, Literal, AsyncIterator, Callable, Union
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionRow
+from .forker import Forker, CallBudget, forker
+
+Scorer = Callable[[CognitionRow], float]
+
+def mean_belief_confidence(row: CognitionRow) -> float:
+    """Score a row by the mean confidence of its beliefs (0 for a row without beliefs)."""
+    if not row.beliefs:
+        return 0.0
+    return sum(belief.confidence for belief in row.beliefs) / len(row.beliefs)
+
+# Named scorers selectable from the API; expand() also accepts any callable
+SCORERS: Dict[str, Scorer] = {
+    "confidence": mean_belief_confidence,
+    "uniform": lambda row: 0.0
+}
+
+class ForkTreeExpander:
+    """
+    Breadth-first fork tree expansion with beam pruning.
+
+    Each level ranks the current frontier with the scorer, keeps the best `beam_width`
+    rows that still fit the budget, and forks them all at once through the forker's
+    packed batch path, so a level's calls run concurrently under the shared LLM
+    limiter. Children scoring below `min_score` are pruned before they can be expanded.
+    The forker charges the budget for every call it actually makes, retries included,
+    and the expansion stops once the next level no longer fits.
+    """
+
+    def __init__(self, forker: Forker):
+        self.forker = forker
+
+    async def expand(
+        self,
+        root: CognitionRow,
+        max_depth: int = 3,
+        branching: int = 2,
+        beam_width: int = 4,
+        max_calls: int = 20,
+        max_tokens: Optional[int] = None,
+        min_score: Optional[float] = None,
+        scorer: Union[str, Scorer] = "confidence",
+        fork_type: Literal["invert_beliefs", "change_goal", "alternative_operation"] = "alternative_operation",
+        context: Optional[str] = None,
+        cache: Optional[bool] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Expand `root` into a fork tree and yield progress events as it grows.
+
+        Args:
+            root: The row at the root of the tree
+            max_depth: Number of fork levels below the root
+            branching: Forks requested per expanded row
+            beam_width: Rows expanded per level at most
+            max_calls: Total LLM calls the expansion may make
+            max_tokens: Total estimated tokens the expansion may spend (None for no limit)
+            min_score: Children scoring below this are pruned (None to keep all)
+            scorer: Name of a scorer in SCORERS or a callable scoring a row
+            fork_type: Type of fork to create
+            context: Optional context for generation
+            cache: Response cache policy (None for the default, True to opt in, False to bypass)
+
+        Yields:
+            {"type": "node", "depth", "score", "data": CognitionRow} for the root and every kept fork,
+            {"type": "level", ...} after each level, {"type": "error", ...} for failed calls,
+            and {"type": "budget_exhausted", ...} if the budget stops the expansion early
+        """
+        if isinstance(scorer, str):
+            if scorer not in SCORERS:
+                raise ValueError(f"Unsupported scorer: {scorer}")
+            score = SCORERS[scorer]
+        else:
+            score = scorer
+
+        budget = CallBudget(max_calls, max_tokens)
+        root_score = score(root)
+        yield {"type": "node", "depth": 0, "score": root_score, "data": root}
+
+        frontier = [(root_score, root)]
+        for depth in range(1, max_depth + 1):
+            if not frontier:
+                break
+
+            frontier.sort(key=lambda item: item[0], reverse=True)
+            selected = self._select(frontier[:beam_width], budget, branching)
+            if not selected:
+                yield {
+                    "type": "budget_exhausted",
+                    "depth": depth,
+                    "calls_used": budget.calls_used,
+                    "tokens_used": budget.tokens_used
+                }
+                break
+
+            app_logger.info(f"Expanding {len(selected)} of {len(frontier)} rows at depth {depth}")
+
+            children = []
+            pruned = len(frontier) - len(selected)
+            async for pack, result in self.forker.iter_batch_forks(
+                selected, branching, fork_type, context, cache, budget
+            ):
+                if isinstance(result, Exception):
+                    yield {
+                        "type": "error",
+                        "depth": depth,
+                        "parents": [str(row.id) for row in pack],
+                        "message": str(result)
+                    }
+                    continue
+
+                for forks in result.values():
+                    for fork in forks:
+                        fork_score = score(fork)
+                        if min_score is not None and fork_score < min_score:
+                            pruned += 1
+                            continue
+                        children.append((fork_score, fork))
+                        yield {"type": "node", "depth": depth, "score": fork_score, "data": fork}
+
+            yield {
+                "type": "level",
+                "depth": depth,
+                "expanded": len(selected),
+                "children": len(children),
+                "pruned": pruned,
+                "calls_used": budget.calls_used,
+                "tokens_used": budget.tokens_used
+            }
+            frontier = children
+
+    def _select(self, ranked: List[Any], budget: CallBudget, branching: int) -> List[CognitionRow]:
+        """Take rows in rank order while forking them still fits the remaining budget."""
+        selected: List[CognitionRow] = []
+        tokens = 0
+        for _, row in ranked:
+            row_tokens = self.forker.estimate_fork_tokens(row, branching)
+            calls = self.forker.estimate_pack_calls(selected + [row], branching)
+            if not budget.fits(calls, tokens + row_tokens):
+                break
+            selected.append(row)
+            tokens += row_tokens
+        return selected
+
+# Create a singleton instance
+tree_expander = ForkTreeExpander(forker)
@@ -2,14 +2,356 @@
 Validator module for SimForge.
 Handles validation of cognition sequences against schemas.
 """
+import re
 import json
-from typing import Dict, Any, List, Optional, Union, Tuple
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Union, Tuple, Callable
 from pydantic import ValidationError
 from ...core.utils.logger import app_logger
 from ...core.schema.cognition import CognitionSequence, CognitionRow
 
+# A JSON path as a linked list of (parent, key) pairs, rendered only when an error is reported
+Path = Optional[Tuple[Any, Union[str, int]]]
+Checker = Callable[[Any, Path, List[str]], None]
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def format_path(path: Path) -> str:
+    """Render a path as a JSON path such as $.rows[0].beliefs[1].confidence."""
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    parts = ["$"]
+    for key in reversed(keys):
+        if isinstance(key, int):
+            parts.append(f"[{key}]")
+        elif _IDENTIFIER.match(key):
+            parts.append(f".{key}")
+        else:
+            parts.append(f"[{json.dumps(key)}]")
+    return "".join(parts)
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda value: isinstance(value, str),
+    "number": _is_number,
+    "integer": lambda value: _is_number(value) and (isinstance(value, int) or value.is_integer()),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict),
+    "null": lambda value: value is None
+}
+
+def _json_equal(first: Any, second: Any) -> bool:
+    """Equality under JSON semantics, where true is not 1."""
+    if isinstance(first, bool) or isinstance(second, bool):
+        return isinstance(first, bool) and isinstance(second, bool) and first == second
+    if isinstance(first, list) and isinstance(second, list):
+        return len(first) == len(second) and all(_json_equal(a, b) for a, b in zip(first, second))
+    if isinstance(first, dict) and isinstance(second, dict):
+        return first.keys() == second.keys() and all(_json_equal(first[key], second[key]) for key in first)
+    return first == second
+
+def _json_key(value: Any) -> Any:
+    """A hashable key such that two values have equal keys exactly when they are _json_equal."""
+    if isinstance(value, bool):
+        return ("bool", value)
+    if isinstance(value, list):
+        return ("array", tuple(_json_key(item) for item in value))
+    if isinstance(value, dict):
+        return ("object", frozenset((key, _json_key(item)) for key, item in value.items()))
+    if _is_number(value):
+        # 1 and 1.0 hash and compare equal
+        return ("number", value)
+    return (type(value).__name__, value)
+
+def _noop(value: Any, path: Path, errors: List[str]) -> None:
+    pass
+
+class SchemaCompiler:
+    """
+    Compiles a JSON Schema (draft-07 keywords) into a tree of checker closures.
+
+    Each schema node becomes one closure that runs only the checks its keywords
+    need. Supported keywords: type, enum, const, properties, required,
+    additionalProperties, minProperties, maxProperties, items (single or tuple),
+    minItems, maxItems, uniqueItems, minimum, maximum, exclusiveMinimum,
+    exclusiveMaximum, multipleOf, minLength, maxLength, pattern, allOf, anyOf,
+    oneOf, not, and local $ref. Annotations such as format and description are ignored.
+    """
+
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self._refs: Dict[str, Checker] = {}
+
+    def compile(self, schema: Union[Dict[str, Any], bool]) -> Checker:
+        if schema is True or schema == {}:
+            return _noop
+        if schema is False:
+            return lambda value, path, errors: errors.append(f"{format_path(path)}: no value is allowed here")
+        if not isinstance(schema, dict):
+            raise ValueError(f"Invalid schema: {schema!r}")
+        if "$ref" in schema:
+            return self._ref(schema["$ref"])
+
+        checks: List[Checker] = []
+        for build in (self._type, self._enum, self._numeric, self._string, self._object, self._array, self._combinators):
+            checks.extend(build(schema))
+
+        if not checks:
+            return _noop
+        if len(checks) == 1:
+            return checks[0]
+
+        def check(value: Any, path: Path, errors: List[str]) -> None:
+            for item in checks:
+                item(value, path, errors)
+        return check
+
+    def _ref(self, ref: str) -> Checker:
+        if ref in self._refs:
+            return self._refs[ref]
+        if not ref.startswith("#"):
+            raise ValueError(f"Only local $ref values are supported: {ref}")
+
+        # Register a forwarding checker first so recursive references resolve
+        target: List[Checker] = []
+        self._refs[ref] = lambda value, path, errors: target[0](value, path, errors)
+
+        node: Any = self.root
+        for token in filter(None, ref[1:].split("/")):
+            token = token.replace("~1", "/").replace("~0", "~")
+            try:
+                node = node[int(token)] if isinstance(node, list) else node[token]
+            except (KeyError, IndexError, ValueError):
+                raise ValueError(f"Unresolvable $ref: {ref}")
+        target.append(self.compile(node))
+        return self._refs[ref]
+
+    def _type(self, schema: Dict[str, Any]) -> List[Checker]:
+        if "type" not in schema:
+            return []
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        unknown = [name for name in names if name not in _TYPE_CHECKS]
+        if unknown:
+            raise ValueError(f"Unsupported type: {', '.join(unknown)}")
+        tests = [_TYPE_CHECKS[name] for name in names]
+        expected = " or ".join(names)
+
+        def check(value: Any, path: Path, errors: List[str]) -> None:
+            for test in tests:
+                if test(value):
+                    return
+            errors.append(f"{format_path(path)}: expected {expected}, got {type(value).__name__}")
+        return [check]
+
+    def _enum(self, schema: Dict[str, Any]) -> List[Checker]:
+        checks: List[Checker] = []
+        if "enum" in schema:
+            options = list(schema["enum"])
+
+            def check_enum(value: Any, path: Path, errors: List[str]) -> None:
+                if not any(_json_equal(value, option) for option in options):
+                    errors.append(f"{format_path(path)}: {value!r} is not one of {options!r}")
+            checks.append(check_enum)
+        if "const" in schema:
+            constant = schema["const"]
+
+            def check_const(value: Any, path: Path, errors: List[str]) -> None:
+                if not _json_equal(value, constant):
+                    errors.append(f"{format_path(path)}: expected {constant!r}")
+            checks.append(check_const)
+        return checks
+
+    def _numeric(self, schema: Dict[str, Any]) -> List[Checker]:
+        bounds = []
+        if "minimum" in schema:
+            bounds.append((lambda value, limit: value >= limit, schema["minimum"], "less than the minimum"))
+        if "maximum" in schema:
+            bounds.append((lambda value, limit: value <= limit, schema["maximum"], "greater than the maximum"))
+        if "exclusiveMinimum" in schema:
+            bounds.append((lambda value, limit: value > limit, schema["exclusiveMinimum"], "not greater than the exclusive minimum"))
+        if "exclusiveMaximum" in schema:
+            bounds.append((lambda value, limit: value < limit, schema["exclusiveMaximum"], "not less than the exclusive maximum"))
+        if "multipleOf" in schema:
+            bounds.append((lambda value, limit: abs(value / limit - round(value / limit)) < 1e-9, schema["multipleOf"], "not a multiple of"))
+        if not bounds:
+            return []
+
+        def check(value: Any, path: Path, errors: List[str]) -> None:
+            if not _is_number(value):
+                return
+            for test, limit, message in bounds:
+                if not test(value, limit):
+                    errors.append(f"{format_path(path)}: {value} is {message} {limit}")
+        return [check]
+
+    def _string(self, schema: Dict[str, Any]) -> List[Checker]:
+        min_length = schema.get("minLength")
+        max_length = schema.get("maxLength")
+        pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+        if min_length is None and max_length is None and pattern is None:
+            return []
+
+        def check(value: Any, path: Path, errors: List[str]) -> None:
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{format_path(path)}: shorter than {min_length} characters")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{format_path(path)}: longer than {max_length} characters")
+            if pattern is not None and not pattern.search(value):
+                errors.append(f"{format_path(path)}: does not match pattern {pattern.pattern!r}")
+        return [check]
+
+    def _object(self, schema: Dict[str, Any]) -> List[Checker]:
+        properties = [(name, self.compile(subschema)) for name, subschema in schema.get("properties", {}).items()]
+        known = {name for name, _ in properties}
+        required = list(schema.get("required", []))
+        additional = schema.get("additionalProperties", True)
+        check_additional = None if additional is True else self.compile(additional)
+        min_properties = schema.get("minProperties")
+        max_properties = schema.get("maxProperties")
+        properties = [(name, check) for name, check in properties if check is not _noop]
+        if not (properties or required or check_additional or min_properties is not None or max_properties is not None):
+            return []
+
+        def check(value: Any, path: Path, errors: List[str]) -> None:
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{format_path(path)}: missing required property {name!r}")
+            for name, check_property in properties:
+                if name in value:
+                    check_property(value[name], (path, name), errors)
+            if check_additional is not None:
+                for name in value:
+                    if name not in known:
+                        if additional is False:
+                            errors.append(f"{format_path(path)}: additional property {name!r} is not allowed")
+                        else:
+                            check_additional(value[name], (path, name), errors)
+            if min_properties is not None and len(value) < min_properties:
+                errors.append(f"{format_path(path)}: fewer than {min_properties} properties")
+            if max_properties is not None and len(value) > max_properties:
+                errors.append(f"{format_path(path)}: more than {max_properties} properties")
+        return [check]
+
+    def _array(self, schema: Dict[str, Any]) -> List[Checker]:
+        items = schema.get("items", True)
+        if isinstance(items, list):
+            positional = [self.compile(item) for item in items]
+            check_items = None
+        else:
+            positional = []
+            check_items = self.compile(items)
+            if check_items is _noop:
+                check_items = None
+        min_items = schema.get("minItems")
+        max_items = schema.get("maxItems")
+        unique = schema.get("uniqueItems", False)
+        if not (positional or check_items or min_items is not None or max_items is not None or unique):
+            return []
+
+        def check(value: Any, path: Path, errors: List[str]) -> None:
+            if not isinstance(value, list):
+                return
+            if check_items is not None:
+                for index, item in enumerate(value):
+                    check_items(item, (path, index), errors)
+            for index, check_item in enumerate(positional[:len(value)]):
+                check_item(value[index], (path, index), errors)
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{format_path(path)}: fewer than {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{format_path(path)}: more than {max_items} items")
+            if unique:
+                seen = set()
+                for item in value:
+                    key = _json_key(item)
+                    if key in seen:
+                        errors.append(f"{format_path(path)}: items are not unique")
+                        break
+                    seen.add(key)
+        return [check]
+
+    def _combinators(self, schema: Dict[str, Any]) -> List[Checker]:
+        checks: List[Checker] = []
+        for subschema in schema.get("allOf", []):
+            checks.append(self.compile(subschema))
+
+        for keyword in ("anyOf", "oneOf"):
+            if keyword not in schema:
+                continue
+            options = [self.compile(subschema) for subschema in schema[keyword]]
+            exactly_one = keyword == "oneOf"
+
+            def check_options(value: Any, path: Path, errors: List[str], options=options, exactly_one=exactly_one, keyword=keyword) -> None:
+                passed = 0
+                for option in options:
+                    option_errors: List[str] = []
+                    option(value, path, option_errors)
+                    if not option_errors:
+                        passed += 1
+                        if not exactly_one:
+                            return
+                if passed == 0:
+                    errors.append(f"{format_path(path)}: does not match any schema in {keyword}")
+                elif exactly_one and passed > 1:
+                    errors.append(f"{format_path(path)}: matches {passed} schemas in oneOf")
+            checks.append(check_options)
+
+        if "not" in schema:
+            negated = self.compile(schema["not"])
+
+            def check_not(value: Any, path: Path, errors: List[str]) -> None:
+                negated_errors: List[str] = []
+                negated(value, path, negated_errors)
+                if not negated_errors:
+                    errors.append(f"{format_path(path)}: must not match the schema in not")
+            checks.append(check_not)
+        return checks
+
+class CompiledSchema:
+    """A schema compiled once and reusable for any number of documents."""
+
+    __slots__ = ("schema", "_check")
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._check = SchemaCompiler(schema).compile(schema)
+
+    def errors(self, data: Any) -> List[str]:
+        """Every violation in `data`, each prefixed with its JSON path."""
+        errors: List[str] = []
+        self._check(data, None, errors)
+        return errors
+
+    def is_valid(self, data: Any) -> bool:
+        return not self.errors(data)
+
 class Validator:
-    """Validator class for validating cognition sequences against schemas."""
+    """
+    Validator class for validating cognition sequences against schemas.
+    
+    JSON Schemas are compiled once and cached by the hash of their canonical JSON,
+    so validating many documents against the same schema only walks the data.
+    Passing the same schema object again skips even the hashing; schemas must
+    therefore not be modified in place after they were first used.
+    """
+    
+    def __init__(self, max_compiled_schemas: int = 128):
+        self.max_compiled_schemas = max_compiled_schemas
+        self._compiled: "OrderedDict[str, CompiledSchema]" = OrderedDict()
+        # id(schema) -> (schema, compiled); the schema is kept so its id cannot be reused
+        self._by_identity: Dict[int, Tuple[Dict[str, Any], CompiledSchema]] = {}
+        self._lock = threading.Lock()
     
     def validate_sequence(self, sequence: CognitionSequence) -> bool:
         """
@@ -47,6 +389,44 @@ class Validator:
             app_logger.error(f"Validation error: {str(e)}")
             return False
     
+    def compile_schema(self, schema: Dict[str, Any]) -> CompiledSchema:
+        """
+        Return the compiled form of a JSON schema, compiling it on first use.
+        
+        Args:
+            schema: The schema to compile
+            
+        Returns:
+            CompiledSchema: The cached compiled schema
+        """
+        entry = self._by_identity.get(id(schema))
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+        
+        key = hashlib.sha256(
+            json.dumps(schema, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                self._remember(schema, compiled)
+                return compiled
+        
+        compiled = CompiledSchema(schema)
+        with self._lock:
+            self._compiled[key] = compiled
+            while len(self._compiled) > self.max_compiled_schemas:
+                self._compiled.popitem(last=False)
+            self._remember(schema, compiled)
+        return compiled
+    
+    def _remember(self, schema: Dict[str, Any], compiled: CompiledSchema) -> None:
+        """Map a schema object to its compiled form, dropping the oldest entry when full. Called under the lock."""
+        self._by_identity[id(schema)] = (schema, compiled)
+        if len(self._by_identity) > self.max_compiled_schemas:
+            del self._by_identity[next(iter(self._by_identity))]
+    
     def validate_json_against_schema(
         self, 
         data: Dict[str, Any], 
@@ -60,39 +440,40 @@ class Validator:
             schema: The schema to validate against
             
         Returns:
-            tuple: (is_valid, errors)
+            tuple: (is_valid, errors), each error prefixed with its JSON path
         """
         try:
-            # For more complex schema validation, we could use jsonschema library
-            # For now, we'll do a simple validation based on required fields
-            required_fields = schema.get("required", [])
-            errors = []
-            
-            for field in required_fields:
-                if field not in data:
-                    errors.append(f"Missing required field: {field}")
-            
-            # Validate properties
-            properties = schema.get("properties", {})
-            for field, field_schema in properties.items():
-                if field in data:
-                    field_type = field_schema.get("type")
-                    if field_type == "string" and not isinstance(data[field], str):
-                        errors.append(f"Field {field} should be a string")
-                    elif field_type == "number" and not isinstance(data[field], (int, float)):
-                        errors.append(f"Field {field} should be a number")
-                    elif field_type == "integer" and not isinstance(data[field], int):
-                        errors.append(f"Field {field} should be an integer")
-                    elif field_type == "array" and not isinstance(data[field], list):
-                        errors.append(f"Field {field} should be an array")
-                    elif field_type == "object" and not isinstance(data[field], dict):
-                        errors.append(f"Field {field} should be an object")
-            
+            errors = self.compile_schema(schema).errors(data)
             return len(errors) == 0, errors
         except Exception as e:
             app_logger.error(f"Schema validation error: {str(e)}")
             return False, [str(e)]
     
+    def validate_many_against_schema(
+        self,
+        documents: List[Any],
+        schema: Dict[str, Any]
+    ) -> List[Tuple[bool, List[str]]]:
+        """
+        Validate many JSON documents against one JSON schema, compiling it once.
+        
+        Args:
+            documents: The documents to validate
+            schema: The schema to validate against
+            
+        Returns:
+            list: (is_valid, errors) for each document, in order
+            
+        Raises:
+            ValueError: If the schema cannot be compiled
+        """
+        compiled = self.compile_schema(schema)
+        results = []
+        for document in documents:
+            errors = compiled.errors(document)
+            results.append((not errors, errors))
+        return results
+    
     def load_schema_from_file(self, schema_path: str) -> Optional[Dict[str, Any]]:
         """
         Load a JSON schema from a file.
@@ -0,0 +1,153 @@
+"""
+Prompt manager module for SimForge.
+Builds the engines' prompts from precompiled templates so their static parts are byte-identical.
+"""
+import json
+import hashlib
+import textwrap
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from ...core.schema.cognition import CognitionRow
+from .templates import (
+    GENERATION_SYSTEM_PROMPT,
+    SCHEMA_SECTION,
+    FORK_TASKS,
+    FORK_EXAMPLES,
+    FORK_INSTRUCTIONS,
+    FORK_SYSTEM,
+    PACKED_FORK_SYSTEM,
+    FORK_USER,
+    PACKED_FORK_USER,
+    CONTEXT_SECTION,
+    FORK_ROW
+)
+
+class PromptManager:
+    """
+    Renders system and user prompts for generation and forking.
+
+    Fork system prompts are rendered once per fork type up front. Generation system
+    prompts with a schema are cached by the hash of the schema's canonical JSON, and
+    the schema is rendered with sorted keys, so equal schemas always produce the same
+    prompt bytes and provider-side prefix caches can hit. A schema object seen before
+    (e.g. one config reused for a whole job) skips the hashing entirely; like
+    Validator.compile_schema, this assumes schemas are not mutated after first use.
+    """
+
+    def __init__(self, max_schema_entries: int = 128):
+        self.max_schema_entries = max_schema_entries
+        self._schema_prompts: "OrderedDict[str, str]" = OrderedDict()
+        self._by_identity: Dict[int, Tuple[Dict[str, Any], str]] = {}
+        self._lock = threading.Lock()
+        self._fork_system = {
+            fork_type: FORK_SYSTEM.render(task=task, example=FORK_EXAMPLES[fork_type])
+            for fork_type, task in FORK_TASKS.items()
+        }
+        self._packed_fork_system = {
+            fork_type: PACKED_FORK_SYSTEM.render(
+                task=task,
+                example=textwrap.indent(FORK_EXAMPLES[fork_type], "    ")
+            )
+            for fork_type, task in FORK_TASKS.items()
+        }
+
+    @property
+    def fork_types(self) -> List[str]:
+        return list(FORK_TASKS)
+
+    def generation_system_prompt(self, schema: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Return the system prompt for sequence generation.
+
+        Args:
+            schema: Optional schema to guide generation
+
+        Returns:
+            The static generation prompt, followed by the rendered schema if one is given
+        """
+        if not schema:
+            return GENERATION_SYSTEM_PROMPT
+
+        entry = self._by_identity.get(id(schema))
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+
+        key = hashlib.sha256(
+            json.dumps(schema, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        ).hexdigest()
+        with self._lock:
+            prompt = self._schema_prompts.get(key)
+            if prompt is not None:
+                self._schema_prompts.move_to_end(key)
+                self._remember(schema, prompt)
+                return prompt
+
+        prompt = GENERATION_SYSTEM_PROMPT + SCHEMA_SECTION.render(
+            schema=json.dumps(schema, indent=2, sort_keys=True)
+        )
+        with self._lock:
+            self._schema_prompts[key] = prompt
+            while len(self._schema_prompts) > self.max_schema_entries:
+                self._schema_prompts.popitem(last=False)
+            self._remember(schema, prompt)
+        return prompt
+
+    def _remember(self, schema: Dict[str, Any], prompt: str) -> None:
+        """Map a schema object to its prompt, dropping the oldest entry when full. Called under the lock."""
+        self._by_identity[id(schema)] = (schema, prompt)
+        if len(self._by_identity) > self.max_schema_entries:
+            del self._by_identity[next(iter(self._by_identity))]
+
+    def fork_system_prompt(self, fork_type: str, packed: bool = False) -> str:
+        """Return the precompiled system prompt for a fork type."""
+        prompts = self._packed_fork_system if packed else self._fork_system
+        if fork_type not in prompts:
+            raise ValueError(f"Unsupported fork type: {fork_type}")
+        return prompts[fork_type]
+
+    def fork_user_prompt(
+        self,
+        row: CognitionRow,
+        num_forks: int,
+        fork_type: str,
+        context: Optional[str] = None
+    ) -> str:
+        """Return the user prompt asking for forks of one row."""
+        return FORK_USER.render(
+            row=self.format_row(row),
+            num_forks=num_forks,
+            instruction=FORK_INSTRUCTIONS[fork_type],
+            context=CONTEXT_SECTION.render(context=context) if context else ""
+        )
+
+    def packed_fork_user_prompt(
+        self,
+        labelled_rows: Dict[str, CognitionRow],
+        num_forks: int,
+        fork_type: str,
+        context: Optional[str] = None
+    ) -> str:
+        """Return the user prompt asking for forks of several labelled rows."""
+        steps = "\n\n".join(f"[{label}]\n{self.format_row(row)}" for label, row in labelled_rows.items())
+        return PACKED_FORK_USER.render(
+            steps=steps,
+            num_forks=num_forks,
+            instruction=FORK_INSTRUCTIONS[fork_type],
+            context=CONTEXT_SECTION.render(context=context) if context else ""
+        )
+
+    def format_row(self, row: CognitionRow) -> str:
+        """Format a row for a prompt."""
+        return FORK_ROW.render(
+            goal=row.goal,
+            beliefs="\n".join(
+                f"- {belief.content} (confidence: {belief.confidence})"
+                for belief in row.beliefs
+            ),
+            operation=row.operation,
+            output=row.output
+        )
+
+# Create a singleton instance
+prompt_manager = PromptManager()
@@ -0,0 +1,212 @@
+"""
+Prompt templates module for SimForge.
+Prompt texts and the compiled template type used to render them.
+"""
+import re
+from typing import List, Any
+
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+class PromptTemplate:
+    """
+    A prompt compiled once into literal segments and `{{variable}}` slots.
+
+    Rendering joins the precomputed segments, so the text before the first
+    variable (`prefix`) is byte-identical on every render.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        parts = _PLACEHOLDER.split(text)
+        self._literals: List[str] = parts[0::2]
+        self._fields: List[str] = parts[1::2]
+        self.variables = frozenset(self._fields)
+
+    @property
+    def prefix(self) -> str:
+        """The static text before the first variable."""
+        return self._literals[0]
+
+    def render(self, **values: Any) -> str:
+        """
+        Fill the template's variables.
+
+        Args:
+            **values: A value for every variable of the template
+
+        Returns:
+            The rendered prompt
+        """
+        missing = self.variables.difference(values)
+        if missing:
+            raise ValueError(f"Missing variables for prompt {self.name}: {', '.join(sorted(missing))}")
+
+        out = [self._literals[0]]
+        for field, literal in zip(self._fields, self._literals[1:]):
+            out.append(str(values[field]))
+            out.append(literal)
+        return "".join(out)
+
+GENERATION_SYSTEM_PROMPT = """
+You are SimForge, a synthetic cognition system. Your task is to generate a sequence of cognitive steps that represent how an agent would approach a problem.
+
+For each step in the sequence, provide:
+1. A clear goal or objective
+2. The beliefs held at that point (with confidence levels from 0-1)
+3. The operation or action taken (one of: "Reflect", "Act", "Plan", "Fork")
+4. The output or result of that operation
+
+The sequence should be coherent, logical, and demonstrate a progression of thought that leads to a solution or conclusion.
+
+CONSTRAINTS:
+- Each step should build on previous steps
+- Beliefs should evolve as new information is discovered
+- Operations should be specific and actionable
+- Outputs should be concrete and informative
+
+FORMAT YOUR RESPONSE AS A JSON OBJECT WITH THE FOLLOWING STRUCTURE:
+{
+  "title": "Title of the sequence",
+  "description": "Brief description of the sequence",
+  "rows": [
+    {
+      "goal": "Goal for step 1",
+      "beliefs": [
+        {"content": "Belief 1", "confidence": 0.8},
+        {"content": "Belief 2", "confidence": 0.6}
+      ],
+      "operation": "Reflect",
+      "output": "Output of step 1"
+    },
+    {
+      "goal": "Goal for step 2",
+      "beliefs": [
+        {"content": "Updated belief 1", "confidence": 0.9},
+        {"content": "New belief based on step 1", "confidence": 0.7}
+      ],
+      "operation": "Plan",
+      "output": "Output of step 2"
+    }
+  ]
+}
+"""
+
+SCHEMA_SECTION = PromptTemplate(
+    "schema_section",
+    "\n\nUSE THIS SCHEMA FOR YOUR RESPONSE:\n{{schema}}"
+)
+
+FORK_TASKS = {
+    "invert_beliefs": """You are SimForge, a synthetic cognition system. Your task is to create alternative versions of a cognitive step by inverting or challenging some of the beliefs.
+
+For each alternative version:
+1. Identify 1-2 key beliefs to invert or challenge
+2. Modify the confidence levels appropriately
+3. Adjust the goal slightly if necessary based on the new beliefs
+4. Provide a new operation that follows from the modified beliefs
+5. Generate a new output that reflects the operation
+
+The alternative versions should be coherent and plausible, representing genuinely different perspectives or approaches.""",
+    "change_goal": """You are SimForge, a synthetic cognition system. Your task is to create alternative versions of a cognitive step by changing the goal while keeping most beliefs similar.
+
+For each alternative version:
+1. Create a new goal that represents a different approach or priority
+2. Keep most beliefs the same, but adjust 1-2 if necessary for coherence
+3. Provide a new operation that follows from the new goal
+4. Generate a new output that reflects the operation
+
+The alternative versions should be coherent and plausible, representing genuinely different approaches to the situation.""",
+    "alternative_operation": """You are SimForge, a synthetic cognition system. Your task is to create alternative versions of a cognitive step by changing the operation while keeping the goal and beliefs the same.
+
+For each alternative version:
+1. Keep the same goal
+2. Keep the same beliefs
+3. Provide a different operation (Reflect, Act, Plan, or Fork)
+4. Generate a new output that reflects the new operation
+
+The alternative versions should be coherent and plausible, representing genuinely different approaches to the same goal and beliefs."""
+}
+
+FORK_EXAMPLES = {
+    "invert_beliefs": """  {
+    "goal": "Modified goal based on inverted beliefs",
+    "beliefs": [
+      {"content": "Inverted belief 1", "confidence": 0.7},
+      {"content": "Original belief 2", "confidence": 0.8}
+    ],
+    "operation": "New operation based on inverted beliefs",
+    "output": "New output based on the operation"
+  }""",
+    "change_goal": """  {
+    "goal": "Alternative goal",
+    "beliefs": [
+      {"content": "Original belief 1", "confidence": 0.8},
+      {"content": "Slightly modified belief 2", "confidence": 0.7}
+    ],
+    "operation": "New operation based on alternative goal",
+    "output": "New output based on the operation"
+  }""",
+    "alternative_operation": """  {
+    "goal": "Same goal as original",
+    "beliefs": [
+      {"content": "Same belief 1", "confidence": 0.8},
+      {"content": "Same belief 2", "confidence": 0.7}
+    ],
+    "operation": "Alternative operation",
+    "output": "New output based on the alternative operation"
+  }"""
+}
+
+FORK_INSTRUCTIONS = {
+    "invert_beliefs": "by inverting or challenging some of the beliefs.",
+    "change_goal": "by changing the goal while keeping most beliefs similar.",
+    "alternative_operation": "by changing the operation while keeping the goal and beliefs the same. Choose from operations: Reflect, Act, Plan, Fork."
+}
+
+FORK_SYSTEM = PromptTemplate("fork_system", """
+{{task}}
+
+FORMAT YOUR RESPONSE AS A JSON ARRAY OF OBJECTS WITH THE FOLLOWING STRUCTURE:
+[
+{{example}}
+]
+""")
+
+PACKED_FORK_SYSTEM = PromptTemplate("packed_fork_system", """
+{{task}}
+
+You will be given several original cognitive steps, each labelled with an id such as "r1". Create the alternative versions for every step independently.
+
+FORMAT YOUR RESPONSE AS A JSON OBJECT MAPPING EACH STEP ID TO AN ARRAY OF ALTERNATIVE VERSIONS WITH THE FOLLOWING STRUCTURE:
+{
+  "forks": {
+    "r1": [
+{{example}}
+    ]
+  }
+}
+""")
+
+# Parts shared by every row of a fork request (context, count, instruction) come before
+# the row itself, so consecutive fork calls share the longest possible prefix
+FORK_USER = PromptTemplate("fork_user", """{{context}}
+Create {{num_forks}} alternative versions of the original cognitive step below {{instruction}}
+
+Original cognitive step:
+{{row}}""")
+
+PACKED_FORK_USER = PromptTemplate("packed_fork_user", """{{context}}
+For each of the original cognitive steps below, create {{num_forks}} alternative versions {{instruction}}
+
+Original cognitive steps:
+
+{{steps}}""")
+
+CONTEXT_SECTION = PromptTemplate("context_section", "\nAdditional context:\n{{context}}\n")
+
+FORK_ROW = PromptTemplate("fork_row", """Goal: {{goal}}
+Beliefs:
+{{beliefs}}
+Operation: {{operation}}
+Output: {{output}}""")
@@ -38,6 +38,8 @@ class GenerationRequest(BaseModel):
     schema_config: Dict[str, Any] = Field(default_factory=dict)
     n: int = Field(default=1, ge=1, le=10)
     temperature: float = Field(default=0.7, ge=0.0, le=2.0)
+    use_cache: Optional[bool] = None
+    timeout: Optional[float] = Field(default=None, gt=0, le=600)
     
 class GenerationResponse(BaseModel):
     """Response model for generation requests."""
@@ -51,15 +53,57 @@ class ForkRequest(BaseModel):
     num_forks: int = Field(default=1, ge=1, le=5)
     fork_type: Literal["invert_beliefs", "change_goal", "alternative_operation"] = "alternative_operation"
     context: Optional[str] = None
+    use_cache: Optional[bool] = None
+    timeout: Optional[float] = Field(default=None, gt=0, le=600)
     
 class ForkResponse(BaseModel):
     """Response model for fork requests."""
     forks: List[CognitionRow]
     metadata: Dict[str, Union[str, int, float, bool]] = Field(default_factory=dict)
 
+class BatchForkRequest(BaseModel):
+    """Request model for forking several rows (or every row) of a stored sequence."""
+    sequence_id: UUID
+    row_ids: Optional[List[UUID]] = None
+    num_forks: int = Field(default=1, ge=1, le=5)
+    fork_type: Literal["invert_beliefs", "change_goal", "alternative_operation"] = "alternative_operation"
+    context: Optional[str] = None
+    use_cache: Optional[bool] = None
+    timeout: Optional[float] = Field(default=None, gt=0, le=600)
+
+class BatchForkResponse(BaseModel):
+    """Response model for batch fork requests, keyed by the id of the forked row."""
+    forks: Dict[UUID, List[CognitionRow]]
+    metadata: Dict[str, Union[str, int, float, bool]] = Field(default_factory=dict)
+
+class ForkTreeRequest(BaseModel):
+    """Request model for expanding a stored row into a tree of forks."""
+    row_id: UUID
+    sequence_id: UUID
+    max_depth: int = Field(default=3, ge=1, le=8)
+    branching: int = Field(default=2, ge=1, le=5)
+    beam_width: int = Field(default=4, ge=1, le=50)
+    max_calls: int = Field(default=20, ge=1, le=1000)
+    max_tokens: Optional[int] = Field(default=None, ge=1)
+    min_score: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    scorer: Literal["confidence", "uniform"] = "confidence"
+    fork_type: Literal["invert_beliefs", "change_goal", "alternative_operation"] = "alternative_operation"
+    context: Optional[str] = None
+    use_cache: Optional[bool] = None
+    timeout: Optional[float] = Field(default=None, gt=0, le=600)
+
 class SchemaResponse(BaseModel):
     """Response model for schema requests."""
     schemas: List[Dict[str, Any]]
+
+class SchemaValidationRequest(BaseModel):
+    """Request model for validating documents against a stored schema."""
+    documents: List[Any] = Field(min_length=1)
+
+class SchemaValidationResult(BaseModel):
+    """Validation result of one document, with every error prefixed by its JSON path."""
+    valid: bool
+    errors: List[str] = Field(default_factory=list)
     
 class PromptResponse(BaseModel):
     """Response model for prompt requests."""
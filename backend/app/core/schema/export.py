@@ -0,0 +1,16 @@
+from typing import Dict, Optional
+from pydantic import BaseModel, Field
+
+class ExportRequest(BaseModel):
+    """Request model for exporting the stored sequences as Parquet."""
+    batch_size: Optional[int] = Field(default=None, ge=1)
+
+class ExportTable(BaseModel):
+    """One exported Parquet table."""
+    path: str
+    records: int
+
+class ExportResult(BaseModel):
+    """Result of a Parquet export."""
+    output_dir: str
+    tables: Dict[str, ExportTable]
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Literal, Any
+from uuid import UUID
+from pydantic import BaseModel, Field
+from .cognition import CognitionRow
+
+class EditOperation(BaseModel):
+    """
+    One edit of a sequence.
+
+    - set_row: replace the row with the same id as `row`
+    - insert_row: insert `row` at `index` (appended when index is omitted)
+    - delete_row: remove the row `row_id`
+    - move_row: move the row `row_id` to `index`
+    - set_fields: update the sequence's title, description and/or metadata from `fields`
+    """
+    op: Literal["set_row", "insert_row", "delete_row", "move_row", "set_fields"]
+    row: Optional[CognitionRow] = None
+    row_id: Optional[UUID] = None
+    index: Optional[int] = Field(default=None, ge=0)
+    fields: Dict[str, Any] = Field(default_factory=dict)
+
+class EditRequest(BaseModel):
+    """Request model for applying edits to a stored sequence as one new version."""
+    operations: List[EditOperation] = Field(min_length=1)
+    message: Optional[str] = None
+
+class VersionInfo(BaseModel):
+    """A version in a sequence's edit history."""
+    version: int
+    parent: Optional[int] = None
+    message: Optional[str] = None
+    created_at: datetime
+    rows: int
+    snapshot: bool = False
+    head: bool = False
+
+class RowChange(BaseModel):
+    """A row present in both versions whose fields or position differ."""
+    row_id: UUID
+    fields: List[str] = Field(default_factory=list)
+    from_index: int
+    to_index: int
+
+class SequenceDiff(BaseModel):
+    """Differences between two versions of a sequence."""
+    from_version: int
+    to_version: int
+    fields: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    added: List[CognitionRow] = Field(default_factory=list)
+    removed: List[UUID] = Field(default_factory=list)
+    changed: List[RowChange] = Field(default_factory=list)
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Literal, Any
+from pydantic import BaseModel, Field
+
+JobState = Literal["pending", "running", "completed", "cancelled", "failed"]
+
+class JobRequest(BaseModel):
+    """Request model for submitting a bulk generation job."""
+    contexts: List[str] = Field(min_length=1)
+    schema_config: Dict[str, Any] = Field(default_factory=dict)
+    n: int = Field(default=1, ge=1, le=10)
+    temperature: float = Field(default=0.7, ge=0.0, le=2.0)
+    use_cache: Optional[bool] = None
+
+class JobStatus(BaseModel):
+    """Status and progress of a bulk generation job."""
+    id: str
+    status: JobState
+    total: int
+    completed: int = 0
+    failed: int = 0
+    pending: int = 0
+    sequences_written: int = 0
+    output_path: str
+    created_at: datetime
+    updated_at: datetime
+    error: Optional[str] = None
@@ -0,0 +1,29 @@
+from typing import List, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+from .cognition import CognitionRow
+
+class SearchHit(BaseModel):
+    """A stored row matching a full-text query."""
+    row: CognitionRow
+    sequence_id: UUID
+    position: int
+    score: float
+    snippet: str
+
+class SearchPage(BaseModel):
+    """One page of search hits, best first."""
+    hits: List[SearchHit]
+    next_cursor: Optional[str] = None
+
+class SimilarRequest(BaseModel):
+    """Request model for finding the rows most similar to a stored row or to free text."""
+    row_id: Optional[UUID] = None
+    text: Optional[str] = None
+    k: int = Field(default=10, ge=1, le=100)
+
+class SimilarHit(BaseModel):
+    """A stored row and its cosine similarity to the query."""
+    row: CognitionRow
+    sequence_id: UUID
+    score: float
@@ -18,12 +18,94 @@ class Settings(BaseSettings):
     LLM_API_KEY: str = os.getenv("LLM_API_KEY", "")
     LLM_MODEL: str = os.getenv("LLM_MODEL", "gpt-4o")
     LOCAL_LLM_URL: str = os.getenv("LOCAL_LLM_URL", "http://localhost:11434")
+
+    # LLM Transport Settings
+    LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "60.0"))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_MAX_KEEPALIVE: int = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+    LLM_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30.0"))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "False").lower() in ("true", "1", "t")
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_NATIVE_N: bool = os.getenv("LLM_NATIVE_N", "True").lower() in ("true", "1", "t")
+
+    # LLM Rate Limiting
+    LLM_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+    LLM_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+    LLM_INITIAL_CONCURRENCY: int = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+    LLM_AIMD_INCREASE: float = float(os.getenv("LLM_AIMD_INCREASE", "1.0"))
+    LLM_AIMD_DECREASE: float = float(os.getenv("LLM_AIMD_DECREASE", "0.5"))
+    LLM_DEFAULT_RETRY_AFTER: float = float(os.getenv("LLM_DEFAULT_RETRY_AFTER", "1.0"))
+    LLM_COMPLETION_TOKEN_ESTIMATE: int = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "1000"))
+
+    # LLM Request Policy
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_BACKOFF_BASE: float = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+    LLM_BACKOFF_MAX: float = float(os.getenv("LLM_BACKOFF_MAX", "20.0"))
+    LLM_REQUEST_DEADLINE: float = float(os.getenv("LLM_REQUEST_DEADLINE", "0"))
+    LLM_HEDGE: bool = os.getenv("LLM_HEDGE", "False").lower() in ("true", "1", "t")
+    LLM_HEDGE_QUANTILE: float = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+
+    # LLM Endpoint Routing
+    OPENAI_API_URLS: str = os.getenv("OPENAI_API_URLS", "https://api.openai.com")
+    LOCAL_LLM_URLS: str = os.getenv("LOCAL_LLM_URLS", "")
+    LLM_FALLBACK_PROVIDER: str = os.getenv("LLM_FALLBACK_PROVIDER", "")
+    LLM_FALLBACK_MODEL: str = os.getenv("LLM_FALLBACK_MODEL", "")
+    LLM_FALLBACK_API_KEY: str = os.getenv("LLM_FALLBACK_API_KEY", "")
+    LLM_HEALTH_CHECK_INTERVAL: float = float(os.getenv("LLM_HEALTH_CHECK_INTERVAL", "15.0"))
+    LLM_EJECT_AFTER_FAILURES: int = int(os.getenv("LLM_EJECT_AFTER_FAILURES", "3"))
+    LLM_LATENCY_EWMA_ALPHA: float = float(os.getenv("LLM_LATENCY_EWMA_ALPHA", "0.3"))
+    LLM_DEFAULT_LATENCY: float = float(os.getenv("LLM_DEFAULT_LATENCY", "1.0"))
+    
+    # LLM Response Cache
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() in ("true", "1", "t")
+    LLM_CACHE_DIR: str = os.getenv("LLM_CACHE_DIR", os.path.join(os.getenv("DATA_DIR", "../../data"), "cache"))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+    
+    # Deduplication
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "True").lower() in ("true", "1", "t")
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+    DEDUP_OVERGENERATE: float = float(os.getenv("DEDUP_OVERGENERATE", "1.0"))
+    DEDUP_NUM_PERM: int = int(os.getenv("DEDUP_NUM_PERM", "64"))
+    
+    # Forking
+    FORK_PACK_TOKEN_BUDGET: int = int(os.getenv("FORK_PACK_TOKEN_BUDGET", "3000"))
+    FORK_PACK_MAX_ROWS: int = int(os.getenv("FORK_PACK_MAX_ROWS", "6"))
     
     # Data Storage
     DATA_DIR: str = os.getenv("DATA_DIR", "../../data")
     SCHEMAS_DIR: str = os.getenv("SCHEMAS_DIR", "../../data/schemas")
     PROMPTS_DIR: str = os.getenv("PROMPTS_DIR", "../../data/prompts")
     SEQUENCES_DIR: str = os.getenv("SEQUENCES_DIR", "../../data/sequences")
+    OUTPUT_DIR: str = os.getenv("OUTPUT_DIR", "../../data/output")
+    EXPORT_DIR: str = os.getenv("EXPORT_DIR", os.path.join(os.getenv("OUTPUT_DIR", "../../data/output"), "exports"))
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+    IMPORT_WORKERS: int = int(os.getenv("IMPORT_WORKERS", "0"))
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+    IMPORT_CHUNK_BYTES: int = int(os.getenv("IMPORT_CHUNK_BYTES", str(16 * 1024 * 1024)))
+    STORAGE_DB_PATH: str = os.getenv("STORAGE_DB_PATH", os.path.join(os.getenv("DATA_DIR", "../../data"), "sequences.db"))
+    STORAGE_READ_THREADS: int = int(os.getenv("STORAGE_READ_THREADS", "4"))
+    SEGMENT_DIR: str = os.getenv("SEGMENT_DIR", os.path.join(os.getenv("DATA_DIR", "../../data"), "segments"))
+    SEGMENT_MAX_BYTES: int = int(os.getenv("SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+    SEGMENT_COMPRESSION: str = os.getenv("SEGMENT_COMPRESSION", "none")
+    SEGMENT_ARCHIVE_ENABLED: bool = os.getenv("SEGMENT_ARCHIVE_ENABLED", "False").lower() in ("true", "1", "t")
+    ROW_INDEX_PATH: str = os.getenv("ROW_INDEX_PATH", os.path.join(os.getenv("DATA_DIR", "../../data"), "row_index.bin"))
+    
+    # Similarity Index
+    SIMILARITY_ENABLED: bool = os.getenv("SIMILARITY_ENABLED", "True").lower() in ("true", "1", "t")
+    SIMILARITY_DIR: str = os.getenv("SIMILARITY_DIR", os.path.join(os.getenv("DATA_DIR", "../../data"), "similarity"))
+    SIMILARITY_DIM: int = int(os.getenv("SIMILARITY_DIM", "512"))
+    
+    # Edit History
+    HISTORY_SNAPSHOT_INTERVAL: int = int(os.getenv("HISTORY_SNAPSHOT_INTERVAL", "32"))
+    HISTORY_MAX_SEQUENCES: int = int(os.getenv("HISTORY_MAX_SEQUENCES", "256"))
+    
+    # Bulk Generation Jobs
+    JOBS_DB_PATH: str = os.getenv("JOBS_DB_PATH", os.path.join(os.getenv("DATA_DIR", "../../data"), "jobs.db"))
+    JOB_CONCURRENCY: int = int(os.getenv("JOB_CONCURRENCY", "8"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
     
     # Server Settings
     HOST: str = os.getenv("HOST", "0.0.0.0")
@@ -0,0 +1,176 @@
+"""
+Response cache module for SimForge.
+Persists LLM responses on disk, keyed by a hash of the canonicalized request payload.
+"""
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from typing import Dict, Any, Optional
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+
+# Payload fields that do not change the completion and must not split the cache
+_TRANSPORT_FIELDS = ("stream", "stream_options")
+
+class ResponseCache:
+    """
+    Content-addressed LLM response cache backed by SQLite.
+
+    Entries expire after `ttl` seconds and the least recently used entries are
+    evicted once the stored payloads exceed `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(payload: Dict[str, Any], sample: int = 0) -> str:
+        """
+        Hash a canonicalized payload.
+
+        Args:
+            payload: The chat-completion request body
+            sample: Index of an independent sample of the same payload, so fanned-out
+                duplicates are cached as distinct entries
+
+        Returns:
+            Hex digest identifying the request
+        """
+        canonical = {k: v for k, v in payload.items() if k not in _TRANSPORT_FIELDS}
+        if sample:
+            canonical["__sample__"] = sample
+        encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for `key`, or None on a miss or expired entry."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value, size, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or (self.ttl > 0 and now - row[2] > self.ttl):
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                    self._total_bytes -= row[1]
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a response and evict entries if the cache is over budget."""
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            self._total_bytes += len(data) - (old[0] if old else 0)
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under budget."""
+        if self.ttl > 0:
+            expired = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses WHERE created_at < ?",
+                (now - self.ttl,)
+            ).fetchone()
+            if expired[0]:
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+                self._total_bytes -= expired[1]
+                self.evictions += expired[0]
+
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the budget so we don't evict on every subsequent put
+        target = int(self.max_bytes * 0.9)
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if self._total_bytes <= target:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+            self.evictions += 1
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Async wrapper around get that keeps disk I/O off the event loop."""
+        try:
+            return await asyncio.to_thread(self.get, key)
+        except sqlite3.Error as e:
+            app_logger.warning(f"LLM response cache read failed: {e}")
+            return None
+
+    async def aput(self, key: str, value: Dict[str, Any]) -> None:
+        """Async wrapper around put that keeps disk I/O off the event loop."""
+        try:
+            await asyncio.to_thread(self.put, key, value)
+        except sqlite3.Error as e:
+            app_logger.warning(f"LLM response cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        """Close the underlying database."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+# Create a singleton instance
+response_cache = ResponseCache(
+    path=os.path.join(settings.LLM_CACHE_DIR, "llm_responses.db"),
+    max_bytes=settings.LLM_CACHE_MAX_BYTES,
+    ttl=settings.LLM_CACHE_TTL
+)
@@ -0,0 +1,524 @@
+"""
+LLM client module for SimForge.
+Provides the shared, pooled HTTP transport used by every engine that talks to an LLM.
+"""
+import json
+import time
+import asyncio
+from typing import List, Dict, Any, Optional, AsyncIterator
+import httpx
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from .limiter import AdaptiveLimiter, parse_retry_after, estimate_tokens
+from .cache import response_cache
+from .policy import RETRYABLE_STATUS_CODES, LatencyTracker, backoff_delay, remaining_time
+from .provider import ProviderRegistry, Endpoint
+
+# Statuses that feed the adaptive limiter (pause for Retry-After, shrink concurrency);
+# a 503 also counts against the endpoint's health like any other 5xx
+THROTTLE_STATUS_CODES = (429, 503)
+
+class LLMError(Exception):
+    """Raised when the LLM provider returns an unusable response."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class LLMRateLimitError(LLMError):
+    """Raised when the provider keeps throttling after all retries."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+class DeadlineExceededError(LLMError):
+    """Raised when the request deadline expires before the provider answers."""
+
+class LLMClient:
+    """Shared async transport for chat-completion requests."""
+
+    def __init__(self):
+        self.provider = settings.LLM_PROVIDER
+        self.api_key = settings.LLM_API_KEY
+        self.model = settings.LLM_MODEL
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache = response_cache
+        self.latency = LatencyTracker()
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.registry = ProviderRegistry.from_settings()
+        self.limiter = AdaptiveLimiter(
+            requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+            initial_concurrency=settings.LLM_INITIAL_CONCURRENCY,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            increase=settings.LLM_AIMD_INCREASE,
+            decrease=settings.LLM_AIMD_DECREASE
+        )
+
+    async def start(self) -> None:
+        """Open the pooled HTTP client. Safe to call more than once."""
+        if self._client is not None and not self._client.is_closed:
+            return
+
+        http2 = settings.LLM_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                app_logger.warning("LLM_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+                http2 = False
+
+        limits = httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY
+        )
+        self._client = httpx.AsyncClient(
+            timeout=settings.LLM_TIMEOUT,
+            limits=limits,
+            http2=http2
+        )
+        self.registry.start_health_checks(self._client)
+        app_logger.info(
+            f"LLM transport opened (max_connections={settings.LLM_MAX_CONNECTIONS}, "
+            f"max_keepalive={settings.LLM_MAX_KEEPALIVE}, http2={http2}, "
+            f"concurrency={self.limiter.concurrency}/{settings.LLM_MAX_CONCURRENCY})"
+        )
+
+    async def close(self) -> None:
+        """Close the pooled HTTP client and release its connections."""
+        await self.registry.stop_health_checks()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            app_logger.info("LLM transport closed")
+        self.cache.close()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled client, opening it lazily if the lifespan hook has not run."""
+        if self._client is None or self._client.is_closed:
+            await self.start()
+        return self._client
+
+    @staticmethod
+    def _for_endpoint(endpoint: Endpoint, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the payload addressed to the endpoint's model (which may differ on failover)."""
+        if payload.get("model") == endpoint.model:
+            return payload
+        return {**payload, "model": endpoint.model}
+
+    def _throttled(self, response: httpx.Response) -> LLMRateLimitError:
+        """Feed a 429/503 back into the limiter and build the matching error."""
+        retry_after = parse_retry_after(response.headers)
+        self.limiter.on_throttle(retry_after)
+        return LLMRateLimitError(
+            f"LLM provider returned {response.status_code}",
+            status_code=response.status_code,
+            retry_after=retry_after
+        )
+
+    def _use_cache(self, payload: Dict[str, Any], cache: Optional[bool]) -> bool:
+        """
+        Decide whether a request may be served from (and stored in) the response cache.
+
+        `cache=None` applies the default policy of caching only deterministic
+        (temperature 0) requests; True opts in and False bypasses the cache.
+        """
+        if not settings.LLM_CACHE_ENABLED:
+            return False
+        if cache is not None:
+            return cache
+        return payload.get("temperature") == 0
+
+    async def post_chat(
+        self,
+        payload: Dict[str, Any],
+        cache: Optional[bool] = None,
+        sample: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Send a chat-completion payload and return the decoded response body.
+
+        Args:
+            payload: The request body
+            cache: Cache policy override (None for the default, True to opt in, False to bypass)
+            sample: Index of an independent sample of the same payload
+
+        Returns:
+            The decoded JSON response
+        """
+        if not self._use_cache(payload, cache):
+            return await self._send(payload)
+
+        key = self.cache.make_key(payload, sample)
+        cached = await self.cache.aget(key)
+        if cached is not None:
+            return cached
+
+        response_data = await self._send(payload)
+        await self.cache.aput(key, response_data)
+        return response_data
+
+    async def _send(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a payload within the current deadline, hedging it when enabled."""
+        remaining = remaining_time()
+        if remaining is None:
+            return await self._send_hedged(payload)
+        if remaining <= 0:
+            raise DeadlineExceededError("Request deadline expired before the LLM call started")
+        try:
+            return await asyncio.wait_for(self._send_hedged(payload), timeout=remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(f"LLM call did not finish within the {remaining:.1f}s left on the deadline")
+
+    async def _send_hedged(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send a payload and, if it is slower than the recent p95 latency, race a duplicate.
+
+        The hedge is only sent when the limiter has spare concurrency, so hedging never
+        queues behind (or displaces) first attempts. Whichever copy succeeds first wins
+        and the other is cancelled.
+        """
+        hedge_delay = self.latency.quantile(settings.LLM_HEDGE_QUANTILE) if settings.LLM_HEDGE else None
+        if hedge_delay is None:
+            return await self._send_with_retries(payload)
+
+        primary = asyncio.ensure_future(self._send_with_retries(payload))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=max(hedge_delay, settings.LLM_HEDGE_MIN_DELAY))
+            if done or self.limiter.saturated:
+                return await primary
+
+            self.hedged += 1
+            app_logger.debug(f"Hedging LLM request after {hedge_delay:.2f}s")
+            hedge = asyncio.ensure_future(self._send_with_retries(payload))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _send_with_retries(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a payload, retrying retryable failures with jittered exponential back-off."""
+        client = await self._get_client()
+        estimated = estimate_tokens(payload)
+        attempts = settings.LLM_MAX_RETRIES + 1
+
+        for attempt in range(attempts):
+            try:
+                return await self._post_once(client, payload, estimated)
+            except LLMRateLimitError as e:
+                # The limiter already pauses every caller for the provider's Retry-After
+                error, delay = e, 0.0
+            except LLMError as e:
+                if e.status_code not in RETRYABLE_STATUS_CODES:
+                    raise
+                error, delay = e, backoff_delay(attempt)
+            except httpx.TransportError as e:
+                error, delay = LLMError(f"LLM transport error: {e!r}"), backoff_delay(attempt)
+
+            if attempt == attempts - 1:
+                raise error
+
+            remaining = remaining_time()
+            if remaining is not None and remaining <= delay:
+                raise DeadlineExceededError(f"Not enough time left on the deadline to retry: {error}")
+
+            app_logger.warning(f"Retrying LLM request in {delay:.2f}s (attempt {attempt + 2}/{attempts}): {error}")
+            await asyncio.sleep(delay)
+
+    async def _post_once(
+        self,
+        client: httpx.AsyncClient,
+        payload: Dict[str, Any],
+        estimated: int
+    ) -> Dict[str, Any]:
+        """Make one attempt on the best available endpoint and return the decoded body."""
+        n = payload.get("n", 1)
+        async with self.limiter.slot(estimated):
+            endpoint = self.registry.acquire(prefer_native_n=n > 1)
+            with self.registry.lease(endpoint):
+                started = time.monotonic()
+                try:
+                    response = await client.post(
+                        endpoint.chat_url,
+                        headers=endpoint.headers(),
+                        json=self._for_endpoint(endpoint, payload)
+                    )
+                except httpx.TransportError:
+                    endpoint.record_failure()
+                    raise
+        latency = time.monotonic() - started
+
+        if response.status_code >= 500:
+            endpoint.record_failure()
+
+        if response.status_code in THROTTLE_STATUS_CODES:
+            raise self._throttled(response)
+
+        if response.status_code >= 400:
+            raise LLMError(
+                f"LLM provider returned {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code
+            )
+
+        try:
+            response_data = response.json()
+        except ValueError as e:
+            raise LLMError(f"LLM provider returned invalid JSON: {e}", status_code=response.status_code)
+
+        if not response_data.get("choices"):
+            raise LLMError("LLM provider response has no choices", status_code=response.status_code)
+
+        endpoint.record_success(latency)
+        if n > 1 and endpoint.native_n is None:
+            endpoint.native_n = len(response_data["choices"]) >= n
+            if not endpoint.native_n:
+                app_logger.info(f"Endpoint {endpoint.base_url} ignores the 'n' parameter; falling back to fan-out")
+        self.latency.record(latency)
+        usage = response_data.get("usage") or {}
+        await self.limiter.on_success(usage.get("total_tokens"), estimated)
+        return response_data
+
+    def _build_payload(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        json_mode: bool,
+        n: int = 1
+    ) -> Dict[str, Any]:
+        """Build a chat-completion payload."""
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": temperature
+        }
+        if n > 1:
+            payload["n"] = n
+        if json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    async def chat_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        json_mode: bool = True,
+        cache: Optional[bool] = None,
+        sample: int = 0
+    ) -> str:
+        """
+        Run a single chat completion and return the message content.
+
+        Args:
+            system_prompt: The system message
+            user_prompt: The user message
+            temperature: Temperature for generation
+            json_mode: Whether to request a JSON object response
+            cache: Cache policy override (None for the default, True to opt in, False to bypass)
+            sample: Index of an independent sample of the same prompt
+
+        Returns:
+            The content of the first choice
+        """
+        payload = self._build_payload(system_prompt, user_prompt, temperature, json_mode)
+        response_data = await self.post_chat(payload, cache=cache, sample=sample)
+        return response_data["choices"][0]["message"]["content"]
+
+    async def chat_completions(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        n: int = 1,
+        temperature: float = 0.7,
+        json_mode: bool = True,
+        cache: Optional[bool] = None
+    ) -> List[str]:
+        """
+        Sample `n` completions for the same prompt.
+
+        Uses the provider's native `n` parameter so the prompt is sent and billed once.
+        Backends that ignore `n` are detected from the number of choices they return,
+        remembered per endpoint, and avoided for multi-choice calls; when no endpoint
+        honours `n` the samples are fanned out as single-choice requests.
+
+        Args:
+            system_prompt: The system message
+            user_prompt: The user message
+            n: Number of completions to sample
+            temperature: Temperature for generation
+            json_mode: Whether to request a JSON object response
+            cache: Cache policy override (None for the default, True to opt in, False to bypass)
+
+        Returns:
+            The content of every returned choice
+        """
+        if n <= 1:
+            return [await self.chat_completion(system_prompt, user_prompt, temperature, json_mode, cache=cache)]
+
+        contents: List[str] = []
+
+        if settings.LLM_NATIVE_N and self.registry.native_n_possible():
+            payload = self._build_payload(system_prompt, user_prompt, temperature, json_mode, n=n)
+            response_data = await self.post_chat(payload, cache=cache)
+            contents = [
+                choice["message"]["content"]
+                for choice in response_data["choices"][:n]
+            ]
+
+        missing = n - len(contents)
+        if missing > 0:
+            tasks = [
+                self.chat_completion(system_prompt, user_prompt, temperature, json_mode, cache=cache, sample=sample)
+                for sample in range(len(contents), n)
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            errors = [result for result in results if isinstance(result, BaseException)]
+            contents.extend(result for result in results if not isinstance(result, BaseException))
+
+            # One failed sample should not discard the others
+            if errors:
+                app_logger.error(f"{len(errors)} of {missing} fanned-out completions failed: {errors[0]}")
+                if not contents:
+                    raise errors[0]
+
+        return contents
+
+    async def stream_chat_completion(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        json_mode: bool = True,
+        cache: Optional[bool] = None,
+        sample: int = 0
+    ) -> AsyncIterator[str]:
+        """
+        Run a streaming chat completion and yield content deltas as they arrive.
+
+        Closing the iterator early closes the connection, which stops the provider
+        from generating (and billing) the rest of the completion.
+
+        Args:
+            system_prompt: The system message
+            user_prompt: The user message
+            temperature: Temperature for generation
+            json_mode: Whether to request a JSON object response
+            cache: Cache policy override (None for the default, True to opt in, False to bypass)
+            sample: Index of an independent sample of the same prompt
+
+        Yields:
+            Content deltas of the first choice (a cached response is yielded as one delta)
+        """
+        client = await self._get_client()
+        payload = self._build_payload(system_prompt, user_prompt, temperature, json_mode)
+        payload["stream"] = True
+
+        cache_key = None
+        if self._use_cache(payload, cache):
+            cache_key = self.cache.make_key(payload, sample)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                yield cached["choices"][0]["message"]["content"]
+                return
+        parts: List[str] = []
+        estimated = estimate_tokens(payload)
+        attempts = settings.LLM_MAX_RETRIES + 1
+
+        for attempt in range(attempts):
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError("Request deadline expired before the stream finished")
+            timeout = settings.LLM_TIMEOUT if remaining is None else min(settings.LLM_TIMEOUT, remaining)
+
+            endpoint: Optional[Endpoint] = None
+            try:
+                async with self.limiter.slot(estimated):
+                    endpoint = self.registry.acquire()
+                    with self.registry.lease(endpoint):
+                        started = time.monotonic()
+                        async with client.stream(
+                            "POST",
+                            endpoint.chat_url,
+                            headers=endpoint.headers(),
+                            json=self._for_endpoint(endpoint, payload),
+                            timeout=timeout
+                        ) as response:
+                            status_code = response.status_code
+                            if status_code >= 500:
+                                endpoint.record_failure()
+                            if status_code in THROTTLE_STATUS_CODES:
+                                raise self._throttled(response)
+
+                            if status_code >= 400:
+                                body = await response.aread()
+                                raise LLMError(
+                                    f"LLM provider returned {status_code}: {body[:200].decode(errors='replace')}",
+                                    status_code=status_code
+                                )
+
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    break
+                                try:
+                                    chunk = json.loads(data)
+                                except json.JSONDecodeError as e:
+                                    raise LLMError(f"LLM provider sent an invalid stream chunk: {e}", status_code=status_code)
+                                for choice in chunk.get("choices") or []:
+                                    delta = (choice.get("delta") or {}).get("content")
+                                    if delta:
+                                        parts.append(delta)
+                                        yield delta
+                                remaining = remaining_time()
+                                if remaining is not None and remaining <= 0:
+                                    raise DeadlineExceededError("Request deadline expired before the stream finished")
+                        endpoint.record_success(time.monotonic() - started)
+            except (LLMError, httpx.TransportError) as e:
+                if isinstance(e, httpx.TransportError) and endpoint is not None:
+                    endpoint.record_failure()
+                # Once content has been yielded the attempt cannot be replayed transparently
+                retryable = (
+                    isinstance(e, httpx.TransportError)
+                    or (not isinstance(e, DeadlineExceededError) and e.status_code in RETRYABLE_STATUS_CODES)
+                )
+                if parts or not retryable or attempt == attempts - 1:
+                    if isinstance(e, httpx.TimeoutException) and remaining is not None:
+                        raise DeadlineExceededError("Request deadline expired before the stream finished")
+                    raise
+                delay = 0.0 if isinstance(e, LLMRateLimitError) else backoff_delay(attempt)
+                app_logger.warning(f"Retrying LLM stream in {delay:.2f}s (attempt {attempt + 2}/{attempts}): {e!r}")
+                await asyncio.sleep(delay)
+                continue
+
+            await self.limiter.on_success(None, estimated)
+            if cache_key is not None:
+                await self.cache.aput(cache_key, {
+                    "choices": [{"message": {"role": "assistant", "content": "".join(parts)}}]
+                })
+            return
+
+# Create a singleton instance
+llm_client = LLMClient()
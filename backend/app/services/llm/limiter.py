@@ -0,0 +1,205 @@
+"""
+Rate limiter module for SimForge.
+Keeps LLM traffic inside the provider's request and token budgets and adapts
+concurrency to throttling signals (additive increase, multiplicative decrease).
+"""
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Mapping
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.rate = refill_per_second
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until `amount` tokens are available and take them. Waiters are served FIFO."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Return (positive) or charge (negative) tokens after the real cost is known."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+class AdaptiveLimiter:
+    """
+    Request/token budget enforcement with AIMD concurrency control.
+
+    Concurrency grows by `increase / limit` on every success (roughly +increase per
+    round trip) and is multiplied by `decrease` when the provider throttles us, at most
+    once per cool-down window so a single burst of 429s only halves it once.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        initial_concurrency: int,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        increase: float = 1.0,
+        decrease: float = 0.5
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+
+        self.request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+            if requests_per_minute > 0 else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+            if tokens_per_minute > 0 else None
+        )
+
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self.throttled = 0
+        self.completed = 0
+
+    @property
+    def concurrency(self) -> int:
+        """Current whole-number concurrency limit."""
+        return max(self.min_concurrency, int(self.limit))
+
+    @property
+    def saturated(self) -> bool:
+        """Whether every concurrency slot is currently taken."""
+        return self._in_flight >= self.concurrency
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait for rate budget and a concurrency slot."""
+        await self._wait_for_pause()
+        if self.request_bucket is not None:
+            await self.request_bucket.acquire(1)
+        if self.token_bucket is not None:
+            await self.token_bucket.acquire(estimated_tokens)
+
+        while True:
+            await self._wait_for_pause()
+            async with self._cond:
+                if self._in_flight < self.concurrency:
+                    self._in_flight += 1
+                    return
+                await self._cond.wait()
+
+    async def release(self) -> None:
+        """Give a concurrency slot back and wake one waiter."""
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int):
+        """Hold a rate-limited concurrency slot for the duration of the block."""
+        await self.acquire(estimated_tokens)
+        try:
+            yield
+        finally:
+            await self.release()
+
+    async def on_success(self, used_tokens: Optional[int], estimated_tokens: int) -> None:
+        """Record a successful call: reconcile the token estimate and grow concurrency."""
+        self.completed += 1
+        if self.token_bucket is not None and used_tokens is not None:
+            self.token_bucket.adjust(estimated_tokens - used_tokens)
+        previous = self.concurrency
+        self.limit = min(float(self.max_concurrency), self.limit + self.increase / self.limit)
+        if self.concurrency > previous:
+            # Wake the waiters that fit under the new limit; release() only wakes one per freed slot
+            async with self._cond:
+                self._cond.notify(self.concurrency - previous)
+
+    def on_throttle(self, retry_after: Optional[float]) -> None:
+        """Record a 429: back off for `retry_after` seconds and shrink concurrency."""
+        self.throttled += 1
+        now = time.monotonic()
+        delay = retry_after if retry_after is not None else settings.LLM_DEFAULT_RETRY_AFTER
+        self._paused_until = max(self._paused_until, now + delay)
+
+        if now - self._last_decrease >= max(delay, 1.0):
+            self.limit = max(float(self.min_concurrency), self.limit * self.decrease)
+            self._last_decrease = now
+            app_logger.warning(
+                f"LLM provider throttled; concurrency reduced to {self.concurrency}, pausing {delay:.1f}s"
+            )
+
+    async def _wait_for_pause(self) -> None:
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of the limiter state."""
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "throttled": self.throttled,
+            "requests_available": self.request_bucket.available if self.request_bucket else None,
+            "tokens_available": self.token_bucket.available if self.token_bucket else None
+        }
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Parse the provider's back-off hint.
+
+    Supports `retry-after-ms`, `Retry-After` in seconds, and `Retry-After` as an HTTP date.
+    """
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000.0)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def estimate_tokens(payload: Dict[str, Any]) -> int:
+    """Rough token cost of a chat payload (prompt at ~4 chars/token plus expected completion)."""
+    prompt_chars = sum(len(message.get("content") or "") for message in payload.get("messages", []))
+    completion = payload.get("max_tokens") or settings.LLM_COMPLETION_TOKEN_ESTIMATE
+    return prompt_chars // 4 + completion * payload.get("n", 1)
@@ -0,0 +1,71 @@
+"""
+Request policy module for SimForge.
+Deadlines, retry back-off and latency tracking for hedged LLM requests.
+"""
+import time
+import random
+from bisect import insort
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Deque, List
+from ...core.utils.config import settings
+
+# HTTP statuses worth retrying: timeouts, conflicts, throttling and transient server errors
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+# Absolute time.monotonic() deadline of the current API request, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]):
+    """
+    Bound every LLM call made inside the block (including tasks it spawns) by `timeout` seconds.
+
+    A nested scope can only tighten an enclosing deadline, never extend it.
+    """
+    if not timeout:
+        yield
+        return
+    deadline = time.monotonic() + timeout
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current deadline, or None when there is no deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential back-off with full jitter for the given (zero-based) retry attempt."""
+    ceiling = min(settings.LLM_BACKOFF_MAX, settings.LLM_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+class LatencyTracker:
+    """Sliding window of recent successful request latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._sorted: List[float] = []
+
+    def record(self, latency: float) -> None:
+        if len(self._samples) == self._samples.maxlen:
+            self._sorted.remove(self._samples[0])
+        self._samples.append(latency)
+        insort(self._sorted, latency)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the q-quantile of the window, or None until enough samples are recorded."""
+        if len(self._sorted) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        index = min(len(self._sorted) - 1, int(q * len(self._sorted)))
+        return self._sorted[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
@@ -0,0 +1,230 @@
+"""
+Provider module for SimForge.
+Registry of LLM endpoints with least-outstanding-requests routing, health checks and failover.
+"""
+import time
+import random
+import asyncio
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+import httpx
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+
+SUPPORTED_PROVIDERS = ("openai", "local")
+
+class Endpoint:
+    """A single OpenAI-compatible inference server."""
+
+    def __init__(self, provider: str, base_url: str, model: str, api_key: str = ""):
+        self.provider = provider
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.outstanding = 0
+        self.latency_ewma: Optional[float] = None
+        self.healthy = True
+        self.failures = 0
+        self.ejected_at: Optional[float] = None
+        # Whether the server honours the `n` parameter (None until observed)
+        self.native_n: Optional[bool] = None
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/v1/chat/completions"
+
+    @property
+    def health_url(self) -> str:
+        return f"{self.base_url}/v1/models"
+
+    def headers(self) -> Dict[str, str]:
+        """Return the request headers for this endpoint."""
+        headers = {"Content-Type": "application/json"}
+        if self.provider == "openai":
+            if not self.api_key:
+                raise ValueError("OpenAI API key not provided")
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        elif self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def score(self) -> float:
+        """Expected wait if routed here: queue depth weighted by observed latency."""
+        latency = self.latency_ewma if self.latency_ewma is not None else settings.LLM_DEFAULT_LATENCY
+        return (self.outstanding + 1) * latency
+
+    def record_success(self, latency: float) -> None:
+        alpha = settings.LLM_LATENCY_EWMA_ALPHA
+        self.latency_ewma = latency if self.latency_ewma is None else alpha * latency + (1 - alpha) * self.latency_ewma
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.healthy and self.failures >= settings.LLM_EJECT_AFTER_FAILURES:
+            self.healthy = False
+            self.ejected_at = time.monotonic()
+            app_logger.warning(f"Ejected LLM endpoint {self.base_url} after {self.failures} consecutive failures")
+
+    def readmit(self) -> None:
+        if not self.healthy:
+            app_logger.info(f"Readmitted LLM endpoint {self.base_url}")
+        self.healthy = True
+        self.failures = 0
+        self.ejected_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.base_url,
+            "model": self.model,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency_ewma": self.latency_ewma,
+            "failures": self.failures,
+            "native_n": self.native_n
+        }
+
+class ProviderPool:
+    """All endpoints serving one provider."""
+
+    def __init__(self, name: str, endpoints: List[Endpoint]):
+        self.name = name
+        self.endpoints = endpoints
+
+    def pick(self, prefer_native_n: bool = False) -> Optional[Endpoint]:
+        """Return the healthy endpoint with the lowest score, or None if all are ejected."""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+        if prefer_native_n:
+            candidates = [endpoint for endpoint in candidates if endpoint.native_n is not False] or candidates
+        if not candidates:
+            return None
+        best = min(endpoint.score() for endpoint in candidates)
+        return random.choice([endpoint for endpoint in candidates if endpoint.score() == best])
+
+class ProviderRegistry:
+    """
+    Routes LLM calls across the endpoints of a primary provider, failing over to a
+    secondary provider when every primary endpoint has been ejected.
+
+    Endpoints are ejected after LLM_EJECT_AFTER_FAILURES consecutive failures and
+    readmitted by a background health check. If every endpoint of every provider is
+    ejected, the primary endpoint with the fewest failures is used anyway rather
+    than failing the call outright.
+    """
+
+    def __init__(self, primary: ProviderPool, fallback: Optional[ProviderPool] = None):
+        self.primary = primary
+        self.fallback = fallback
+        self._health_task: Optional[asyncio.Task] = None
+        self.failovers = 0
+
+    @classmethod
+    def from_settings(cls) -> "ProviderRegistry":
+        """Build the registry from the LLM_* settings."""
+        primary = cls._build_pool(settings.LLM_PROVIDER, settings.LLM_MODEL, settings.LLM_API_KEY)
+        fallback = None
+        if settings.LLM_FALLBACK_PROVIDER:
+            fallback = cls._build_pool(
+                settings.LLM_FALLBACK_PROVIDER,
+                settings.LLM_FALLBACK_MODEL or settings.LLM_MODEL,
+                settings.LLM_FALLBACK_API_KEY or settings.LLM_API_KEY
+            )
+        return cls(primary, fallback)
+
+    @staticmethod
+    def _build_pool(provider: str, model: str, api_key: str) -> ProviderPool:
+        if provider == "openai":
+            urls = settings.OPENAI_API_URLS
+        elif provider == "local":
+            urls = settings.LOCAL_LLM_URLS or settings.LOCAL_LLM_URL
+        else:
+            urls = ""
+        endpoints = [
+            Endpoint(provider, url.strip(), model, api_key)
+            for url in urls.split(",") if url.strip()
+        ]
+        return ProviderPool(provider, endpoints)
+
+    @property
+    def pools(self) -> List[ProviderPool]:
+        return [pool for pool in (self.primary, self.fallback) if pool is not None]
+
+    def acquire(self, prefer_native_n: bool = False) -> Endpoint:
+        """
+        Choose the endpoint for the next call.
+
+        Args:
+            prefer_native_n: Avoid endpoints known to ignore the `n` parameter
+
+        Returns:
+            The selected Endpoint
+        """
+        if self.primary.name not in SUPPORTED_PROVIDERS:
+            raise ValueError(f"Unsupported LLM provider: {self.primary.name}")
+
+        endpoint = self.primary.pick(prefer_native_n)
+        if endpoint is not None:
+            return endpoint
+
+        if self.fallback is not None:
+            endpoint = self.fallback.pick(prefer_native_n)
+            if endpoint is not None:
+                self.failovers += 1
+                return endpoint
+
+        if not self.primary.endpoints:
+            raise ValueError(f"No endpoints configured for LLM provider {self.primary.name}")
+        return min(self.primary.endpoints, key=lambda e: (e.failures, e.score()))
+
+    def native_n_possible(self) -> bool:
+        """Whether any endpoint that may serve the next call could honour `n`."""
+        for pool in self.pools:
+            healthy = [endpoint for endpoint in pool.endpoints if endpoint.healthy]
+            if healthy:
+                return any(endpoint.native_n is not False for endpoint in healthy)
+        return True
+
+    @contextmanager
+    def lease(self, endpoint: Endpoint):
+        """Count a call against `endpoint` for the duration of the block."""
+        endpoint.outstanding += 1
+        try:
+            yield endpoint
+        finally:
+            endpoint.outstanding -= 1
+
+    def start_health_checks(self, client: httpx.AsyncClient) -> None:
+        """Start the background health-check loop."""
+        if self._health_task is None and settings.LLM_HEALTH_CHECK_INTERVAL > 0:
+            self._health_task = asyncio.create_task(self._health_loop(client))
+
+    async def stop_health_checks(self) -> None:
+        """Stop the background health-check loop."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+    async def _health_loop(self, client: httpx.AsyncClient) -> None:
+        while True:
+            await asyncio.sleep(settings.LLM_HEALTH_CHECK_INTERVAL)
+            endpoints = [endpoint for pool in self.pools for endpoint in pool.endpoints]
+            await asyncio.gather(*(self._check(client, endpoint) for endpoint in endpoints))
+
+    async def _check(self, client: httpx.AsyncClient, endpoint: Endpoint) -> None:
+        try:
+            response = await client.get(endpoint.health_url, headers=endpoint.headers(), timeout=5.0)
+            ok = response.status_code < 500
+        except (httpx.HTTPError, ValueError):
+            ok = False
+
+        if ok:
+            endpoint.readmit()
+        else:
+            endpoint.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-endpoint routing state."""
+        return {
+            pool.name: [endpoint.stats() for endpoint in pool.endpoints]
+            for pool in self.pools
+        } | {"failovers": self.failovers}
@@ -0,0 +1,135 @@
+"""
+Export module for SimForge.
+Writes the stored sequences, rows and beliefs as three linked Parquet tables.
+"""
+import os
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+from uuid import UUID
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from .storage import SequenceStore, sequence_store
+
+EXPORT_TABLES = ("sequences", "rows", "beliefs")
+
+def _load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+def parquet_available() -> bool:
+    """Whether the optional 'pyarrow' package needed for Parquet export is installed."""
+    return _load_pyarrow() is not None
+
+def _uuid(value: bytes) -> Optional[str]:
+    return str(UUID(bytes=value)) if value else None
+
+class ParquetExporter:
+    """
+    Streams the sequence store into sequences.parquet, rows.parquet and beliefs.parquet.
+
+    Tables are linked by string UUIDs (rows.sequence_id, rows.parent_id and
+    beliefs.row_id) and keep each item's position within its parent. The low
+    cardinality `operation` and `source` columns are dictionary-encoded. All three
+    tables are read from one snapshot of the store and written one record batch at
+    a time, so memory stays bounded by the batch size.
+    """
+
+    # Column index -> conversion from the stored value, per table
+    _CONVERTERS: Dict[str, Dict[int, Callable[[Any], Any]]] = {
+        "sequences": {0: _uuid, 4: datetime.fromisoformat, 5: datetime.fromisoformat},
+        "rows": {0: _uuid, 1: _uuid, 6: _uuid},
+        "beliefs": {0: _uuid}
+    }
+
+    def __init__(self, store: SequenceStore, batch_size: int = 10000):
+        self.store = store
+        self.batch_size = batch_size
+
+    def _schemas(self, pa) -> Dict[str, Any]:
+        dictionary = pa.dictionary(pa.int32(), pa.string())
+        return {
+            "sequences": pa.schema([
+                ("id", pa.string()),
+                ("title", pa.string()),
+                ("description", pa.string()),
+                ("metadata", pa.string()),
+                ("created_at", pa.timestamp("us")),
+                ("updated_at", pa.timestamp("us"))
+            ]),
+            "rows": pa.schema([
+                ("id", pa.string()),
+                ("sequence_id", pa.string()),
+                ("position", pa.int32()),
+                ("goal", pa.string()),
+                ("operation", dictionary),
+                ("output", pa.string()),
+                ("parent_id", pa.string()),
+                ("metadata", pa.string())
+            ]),
+            "beliefs": pa.schema([
+                ("row_id", pa.string()),
+                ("position", pa.int32()),
+                ("content", pa.string()),
+                ("confidence", pa.float64()),
+                ("source", dictionary)
+            ])
+        }
+
+    def _record_batch(self, pa, schema, table: str, records: List[tuple]):
+        columns = list(zip(*records))
+        converters = self._CONVERTERS[table]
+        arrays = []
+        for index, field in enumerate(schema):
+            values = columns[index]
+            convert = converters.get(index)
+            if convert is not None:
+                values = [convert(value) if value is not None else None for value in values]
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def export(self, output_dir: str) -> Dict[str, Any]:
+        """
+        Write the three tables into `output_dir`. Runs synchronously; call it from a worker thread.
+
+        Args:
+            output_dir: Directory for the Parquet files (created if missing)
+
+        Returns:
+            The output directory, plus the path and record count of each table
+        """
+        pa = _load_pyarrow()
+        if pa is None:
+            raise RuntimeError("Parquet export requires the 'pyarrow' package")
+        import pyarrow.parquet as pq
+
+        os.makedirs(output_dir, exist_ok=True)
+        schemas = self._schemas(pa)
+        result: Dict[str, Any] = {"output_dir": output_dir, "tables": {}}
+        with self.store.snapshot():
+            for table in EXPORT_TABLES:
+                path = os.path.join(output_dir, f"{table}.parquet")
+                schema = schemas[table]
+                count = 0
+                with pq.ParquetWriter(path, schema, compression="zstd", use_dictionary=True) as writer:
+                    for records in self.store.iter_table(table, self.batch_size):
+                        writer.write_batch(self._record_batch(pa, schema, table, records))
+                        count += len(records)
+                result["tables"][table] = {"path": path, "records": count}
+
+        counts = ", ".join(f"{info['records']} {table}" for table, info in result["tables"].items())
+        app_logger.info(f"Exported {counts} to {output_dir}")
+        return result
+
+    def default_output_dir(self) -> str:
+        """A fresh timestamped directory under EXPORT_DIR."""
+        return os.path.join(settings.EXPORT_DIR, datetime.now().strftime("%Y%m%dT%H%M%S%f"))
+
+# Create a singleton instance
+parquet_exporter = ParquetExporter(sequence_store, settings.EXPORT_BATCH_SIZE)
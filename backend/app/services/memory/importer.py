@@ -0,0 +1,430 @@
+"""
+Import module for SimForge.
+Bulk-imports sequence files (JSON and JSONL) using a process pool of parsers and a single writer.
+"""
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import List, Dict, Tuple, Set, Optional, Callable, Iterable, NamedTuple, Union
+from uuid import UUID, uuid5
+from pydantic import ValidationError
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionSequence
+from .storage import SequenceStore, SequenceBatch
+from .sequences import SequenceRepository, sequence_repository
+
+IMPORT_SUFFIXES = (".json", ".jsonl", ".ndjson")
+_LINE_SUFFIXES = (".jsonl", ".ndjson")
+
+# Sequences and rows imported without an id get one derived from the file content and
+# their position, so importing the same file again replaces them instead of duplicating them
+_ID_NAMESPACE = UUID("6dcab564-8bf5-4a96-a4a2-5b796981252b")
+
+MAX_REPORTED_ERRORS = 20
+_PROGRESS_INTERVAL = 5.0
+
+class ImportTask(NamedTuple):
+    """One unit of parsing work: a whole JSON file, or a byte range of a JSONL file."""
+    path: str
+    digest: str
+    start: int
+    end: int
+    archive: bool
+
+class ChunkResult(NamedTuple):
+    """What a worker sends back for one task: packed sequences plus per-record errors."""
+    task: ImportTask
+    batch: SequenceBatch
+    archive: List[Tuple[bytes, bytes]]
+    records: int
+    errors: List[Tuple[int, str]]
+
+def _is_lines(path: str) -> bool:
+    return path.lower().endswith(_LINE_SUFFIXES)
+
+def _describe(error: Exception) -> str:
+    """A one-line description of why a record was rejected."""
+    if isinstance(error, ValidationError):
+        first = error.errors()[0]
+        location = ".".join(str(part) for part in first["loc"])
+        more = f" (and {error.error_count() - 1} more errors)" if error.error_count() > 1 else ""
+        return f"{location}: {first['msg']}{more}" if location else f"{first['msg']}{more}"
+    return str(error)
+
+def _hash_file(path: str) -> Tuple[str, Optional[str], int, Optional[str]]:
+    """Return (path, sha256 hex digest, size, error) of a file (runs in a worker)."""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(1 << 20)
+                if not block:
+                    break
+                digest.update(block)
+                size += len(block)
+    except OSError as e:
+        return path, None, size, str(e)
+    return path, digest.hexdigest(), size, None
+
+def _load_sequence(raw: Union[bytes, object], digest: str, key: int) -> CognitionSequence:
+    """Validate one sequence, giving it (and its rows) content-derived ids where it has none."""
+    if isinstance(raw, bytes):
+        sequence = CognitionSequence.model_validate_json(raw)
+    else:
+        sequence = CognitionSequence.model_validate(raw)
+    if "id" not in sequence.model_fields_set:
+        sequence.id = uuid5(_ID_NAMESPACE, f"{digest}:{key}")
+    for position, row in enumerate(sequence.rows):
+        if "id" not in row.model_fields_set:
+            row.id = uuid5(sequence.id, str(position))
+    return sequence
+
+def _read_records(task: ImportTask) -> Iterable[Tuple[int, int, Union[bytes, object, Exception, None]]]:
+    """
+    Yield (record number, id key, raw record or the error reading it) for a task.
+
+    JSONL records are numbered by line within the task's range and keyed by byte offset,
+    with None for blank lines; a JSON file holds one sequence or an array of them,
+    numbered from 1.
+    """
+    if _is_lines(task.path):
+        with open(task.path, "rb") as f:
+            if task.start:
+                # Skip to the first line starting at or after `start`; the line crossing it
+                # belongs to the previous range
+                f.seek(task.start - 1)
+                f.readline()
+            offset = f.tell()
+            number = 0
+            while offset < task.end:
+                line = f.readline()
+                if not line:
+                    break
+                number += 1
+                yield number, offset, line if line.strip() else None
+                offset += len(line)
+        return
+
+    with open(task.path, "rb") as f:
+        content = f.read()
+    if not content.lstrip().startswith(b"["):
+        yield 1, 0, content
+        return
+    try:
+        items = json.loads(content)
+    except ValueError as e:
+        yield 1, 0, ValueError(f"Invalid JSON: {e}")
+        return
+    for index, item in enumerate(items):
+        yield index + 1, index, item
+
+def _parse_chunk(task: ImportTask) -> ChunkResult:
+    """Parse and validate the records of a task and pack them for the writer (runs in a worker)."""
+    sequences: Dict[UUID, CognitionSequence] = {}
+    row_owners: Dict[UUID, UUID] = {}
+    errors: List[Tuple[int, str]] = []
+    records = 0
+    try:
+        for number, key, raw in _read_records(task):
+            records = number
+            if raw is None:
+                continue
+            if isinstance(raw, Exception):
+                errors.append((number, str(raw)))
+                continue
+            try:
+                sequence = _load_sequence(raw, task.digest, key)
+            except ValueError as e:
+                errors.append((number, _describe(e)))
+                continue
+            # Within one batch a row id can only belong to one sequence; a later copy of
+            # the same sequence replaces the earlier one
+            clash = next(
+                (row.id for row in sequence.rows if row_owners.get(row.id, sequence.id) != sequence.id),
+                None
+            )
+            if clash is not None:
+                errors.append((number, f"row {clash} also belongs to sequence {row_owners[clash]}"))
+                continue
+            sequences[sequence.id] = sequence
+            row_owners.update((row.id, sequence.id) for row in sequence.rows)
+    except OSError as e:
+        errors.append((0, str(e)))
+
+    kept = list(sequences.values())
+    archive = [(sequence.id.bytes, sequence.model_dump_json().encode("utf-8")) for sequence in kept] if task.archive else []
+    return ChunkResult(task, SequenceStore.pack(kept), archive, records, errors)
+
+class FileReport:
+    """The outcome of importing one file."""
+
+    def __init__(self, path: str, digest: Optional[str], size: int):
+        self.path = path
+        self.digest = digest
+        self.size = size
+        self.status = "pending"
+        self.sequences = 0
+        self.rows = 0
+        self.error_count = 0
+        self.errors: List[str] = []
+        self._chunks_left = 0
+        self._chunks: List[Tuple[int, int, List[Tuple[int, str]]]] = []
+
+    def expect(self, tasks: int) -> None:
+        """Mark the file as being imported in `tasks` tasks."""
+        self.status = "importing"
+        self._chunks_left = tasks
+
+    def add(self, result: ChunkResult) -> Optional[tuple]:
+        """
+        Account for one finished task of this file.
+
+        Returns:
+            The file's import record once its last task is in and none of its records
+            were rejected, otherwise None, so a file with errors is attempted again
+        """
+        self._chunks.append((result.task.start, result.records, result.errors))
+        self._chunks_left -= 1
+        self.sequences += len(result.batch.sequences)
+        self.rows += len(result.batch.rows)
+        if self._chunks_left:
+            return None
+        self._finish()
+        if self.error_count:
+            return None
+        return (self.digest, self.path, self.sequences, self.error_count, datetime.now().isoformat())
+
+    def _finish(self) -> None:
+        """Number the collected errors by absolute line (JSONL) or item (JSON) once every range is in."""
+        lines = _is_lines(self.path)
+        base = 0
+        for _, records, errors in sorted(self._chunks):
+            for number, message in errors:
+                self.error_count += 1
+                if len(self.errors) < MAX_REPORTED_ERRORS:
+                    where = f"line {base + number}" if lines else f"item {number}"
+                    self.errors.append(f"{where}: {message}" if number else message)
+            base += records
+        self._chunks = []
+        self.status = "imported"
+
+class ImportReport:
+    """The outcome of an import run, with per-file results and throughput."""
+
+    def __init__(self):
+        self.files: List[FileReport] = []
+        self.elapsed = 0.0
+
+    def _total(self, field: str) -> int:
+        """Sum a field over the files imported (or being imported) by this run."""
+        return sum(getattr(report, field) for report in self.files if report.status in ("importing", "imported"))
+
+    @property
+    def sequences(self) -> int:
+        return self._total("sequences")
+
+    @property
+    def rows(self) -> int:
+        return self._total("rows")
+
+    @property
+    def errors(self) -> int:
+        return sum(report.error_count for report in self.files)
+
+    @property
+    def bytes(self) -> int:
+        return self._total("size")
+
+    def count(self, status: str) -> int:
+        """Number of files with the given status."""
+        return sum(1 for report in self.files if report.status == status)
+
+    def summary(self) -> str:
+        elapsed = self.elapsed or 1e-9
+        return (
+            f"{self.count('imported')} files imported, {self.count('skipped')} already imported, "
+            f"{self.count('duplicate')} duplicates, {self.count('unreadable')} unreadable; "
+            f"{self.sequences} sequences ({self.rows} rows), {self.errors} rejected records "
+            f"in {self.elapsed:.1f}s ({self.sequences / elapsed:.0f} sequences/s, "
+            f"{self.bytes / elapsed / (1024 * 1024):.1f} MiB/s)"
+        )
+
+class BulkImporter:
+    """
+    Imports directories of sequence JSON files and JSONL dumps into the sequence repository.
+
+    Files are hashed and parsed in a process pool. A JSON file is one task; a JSONL file
+    larger than `chunk_bytes` is split into line-aligned byte ranges so that one big dump
+    still uses every worker. Workers validate each sequence and send back store-ready
+    insert parameters (SequenceStore.pack), which the calling thread, as the single writer,
+    merges into transactions of about `batch_size` sequences. A file's content hash is
+    committed together with its last sequences, so an interrupted import resumes by
+    skipping every file already recorded. The hash of a file with rejected records is not
+    recorded, so the file is attempted again (e.g. once it is fixed) and keeps being
+    reported. A file cut off midway or attempted again is simply imported again:
+    sequences are replaced by id, and missing ids are derived from the file content.
+    """
+
+    def __init__(
+        self,
+        repository: SequenceRepository,
+        workers: int = 0,
+        batch_size: int = 500,
+        chunk_bytes: int = 16 * 1024 * 1024
+    ):
+        self.repository = repository
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.chunk_bytes = chunk_bytes
+
+    def discover(self, paths: Iterable[str]) -> List[str]:
+        """
+        Expand the given files and directories into the files to import.
+
+        Args:
+            paths: Files (imported whatever their suffix) and directories (searched
+                recursively for .json, .jsonl and .ndjson files)
+
+        Returns:
+            The files, in a stable order without repeats
+        """
+        files: List[str] = []
+        for path in paths:
+            if os.path.isdir(path):
+                for directory, _, names in sorted(os.walk(path)):
+                    files.extend(
+                        os.path.join(directory, name) for name in sorted(names) if name.lower().endswith(IMPORT_SUFFIXES)
+                    )
+            else:
+                files.append(path)
+        return list(dict.fromkeys(os.path.abspath(path) for path in files))
+
+    def _tasks(self, report: FileReport, archive: bool) -> List[ImportTask]:
+        if not _is_lines(report.path) or report.size <= self.chunk_bytes:
+            return [ImportTask(report.path, report.digest, 0, max(report.size, 1), archive)]
+        return [
+            ImportTask(report.path, report.digest, start, min(start + self.chunk_bytes, report.size), archive)
+            for start in range(0, report.size, self.chunk_bytes)
+        ]
+
+    def run(self, paths: Iterable[str], progress: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+        """
+        Import files synchronously; call it from a command line tool or worker thread.
+
+        Args:
+            paths: Files and directories to import (see discover())
+            progress: Called with the report so far every few seconds
+
+        Returns:
+            The report of the run
+        """
+        report = ImportReport()
+        started = time.perf_counter()
+        files = self.discover(paths)
+        archive = self.repository.archive is not None
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            hashed = list(pool.map(_hash_file, files, chunksize=max(1, len(files) // (self.workers * 4))))
+            done = self.repository.store.imported([digest for _, digest, _, _ in hashed if digest])
+
+            tasks: List[ImportTask] = []
+            by_path: Dict[str, FileReport] = {}
+            seen: Set[str] = set()
+            for path, digest, size, error in hashed:
+                file_report = FileReport(path, digest, size)
+                report.files.append(file_report)
+                if error is not None:
+                    file_report.status = "unreadable"
+                    file_report.error_count = 1
+                    file_report.errors.append(error)
+                elif digest in done:
+                    file_report.status = "skipped"
+                elif digest in seen:
+                    file_report.status = "duplicate"
+                else:
+                    seen.add(digest)
+                    file_tasks = self._tasks(file_report, archive)
+                    file_report.expect(len(file_tasks))
+                    by_path[path] = file_report
+                    tasks.extend(file_tasks)
+
+            app_logger.info(
+                f"Importing {len(by_path)} files ({len(tasks)} tasks) with {self.workers} workers; "
+                f"{report.count('skipped')} already imported"
+            )
+            writer = _Writer(self.repository, self.batch_size)
+            last_progress = time.perf_counter()
+            pending = iter(tasks)
+            in_flight: Set[Future] = set()
+            while True:
+                # Keep a bounded number of tasks queued so results never pile up ahead of the writer
+                for task in pending:
+                    in_flight.add(pool.submit(_parse_chunk, task))
+                    if len(in_flight) >= self.workers * 2:
+                        break
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    result = future.result()
+                    writer.add(result, by_path[result.task.path].add(result))
+
+                if progress is not None and time.perf_counter() - last_progress >= _PROGRESS_INTERVAL:
+                    report.elapsed = time.perf_counter() - started
+                    progress(report)
+                    last_progress = time.perf_counter()
+            writer.flush()
+
+        report.elapsed = time.perf_counter() - started
+        app_logger.info(f"Import finished: {report.summary()}")
+        return report
+
+class _Writer:
+    """Merges worker results into batches and commits them through the repository."""
+
+    def __init__(self, repository: SequenceRepository, batch_size: int):
+        self.repository = repository
+        self.batch_size = batch_size
+        self._reset()
+
+    def _reset(self) -> None:
+        self.batch = SequenceBatch([], [], [], [])
+        self.archive: List[Tuple[bytes, bytes]] = []
+        self.imports: List[tuple] = []
+        self.sequence_ids: Set[bytes] = set()
+        self.row_ids: Set[bytes] = set()
+
+    def add(self, result: ChunkResult, completed: Optional[tuple]) -> None:
+        """Queue a result (and the import record of the file it completes), committing when the batch is full."""
+        sequence_ids = [params[0] for params in result.batch.sequences]
+        row_ids = [params[0] for params in result.batch.rows]
+        # A batch must not hold two versions of a sequence or row; commit the older one first
+        if not self.sequence_ids.isdisjoint(sequence_ids) or not self.row_ids.isdisjoint(row_ids):
+            self.flush()
+        for pending, incoming in zip(self.batch, result.batch):
+            pending.extend(incoming)
+        self.archive.extend(result.archive)
+        self.sequence_ids.update(sequence_ids)
+        self.row_ids.update(row_ids)
+        if completed is not None:
+            self.imports.append(completed)
+        if len(self.batch.sequences) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.batch.sequences or self.imports:
+            self.repository.save_packed(self.batch, self.archive, self.imports)
+        self._reset()
+
+# Create a singleton instance
+bulk_importer = BulkImporter(
+    sequence_repository,
+    settings.IMPORT_WORKERS,
+    settings.IMPORT_BATCH_SIZE,
+    settings.IMPORT_CHUNK_BYTES
+)
@@ -0,0 +1,157 @@
+"""
+Row index module for SimForge.
+Maps every stored row id to its sequence, position and parent for constant-time lookups.
+"""
+import os
+import struct
+import asyncio
+import threading
+from typing import Dict, Tuple, Optional, Iterable, NamedTuple
+from uuid import UUID
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionSequence
+
+# row id, sequence id, position, parent id (16 zero bytes for no parent)
+_RECORD = struct.Struct("<16s16sI16s")
+_NO_PARENT = bytes(16)
+# Position of a tombstone record, which drops the row from the index
+_TOMBSTONE = 0xFFFFFFFF
+
+class RowLocation(NamedTuple):
+    """Where a row is stored."""
+    sequence_id: UUID
+    position: int
+    parent_id: Optional[UUID]
+
+class RowIndex:
+    """
+    Append-only on-disk row index, held in memory as a dict keyed by the raw row id bytes.
+
+    Each save appends one fixed-size record per row and later records win, so
+    re-saving a sequence simply supersedes its old entries; a removed row gets a
+    tombstone record. The file is compacted on load once superseded records and
+    tombstones outnumber live ones, and a torn record left by a crash mid-append
+    is truncated away.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rows: Dict[bytes, Tuple[bytes, int, bytes]] = {}
+        self._records = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Read the index file into memory. Safe to call more than once."""
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = b""
+
+            usable = len(data) - len(data) % _RECORD.size
+            if usable != len(data):
+                app_logger.warning(f"Truncating torn record at the end of row index {self.path}")
+                with open(self.path, "r+b") as f:
+                    f.truncate(usable)
+
+            rows = self._rows
+            for row_id, sequence_id, position, parent_id in _RECORD.iter_unpack(memoryview(data)[:usable]):
+                if position == _TOMBSTONE:
+                    rows.pop(row_id, None)
+                else:
+                    rows[row_id] = (sequence_id, position, parent_id)
+            self._records = usable // _RECORD.size
+            self._loaded = True
+
+            if self._records > 2 * len(rows) and self._records > 1024:
+                self._compact()
+        app_logger.info(f"Row index loaded with {len(self._rows)} rows")
+
+    def _compact(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(
+                _RECORD.pack(row_id, sequence_id, position, parent_id)
+                for row_id, (sequence_id, position, parent_id) in self._rows.items()
+            ))
+        os.replace(tmp_path, self.path)
+        app_logger.info(f"Compacted row index from {self._records} to {len(self._rows)} records")
+        self._records = len(self._rows)
+
+    def add_sequence(self, sequence: CognitionSequence) -> None:
+        """Index (or re-index) every row of a sequence."""
+        sequence_id = sequence.id.bytes
+        self.add_rows(
+            (row.id.bytes, sequence_id, position, row.parent_id.bytes if row.parent_id else None)
+            for position, row in enumerate(sequence.rows)
+        )
+
+    def add_rows(self, rows: Iterable[Tuple[bytes, bytes, int, Optional[bytes]]]) -> None:
+        """Index (or re-index) rows given as raw (row id, sequence id, position, parent id or None) tuples."""
+        self.load()
+        entries = [
+            (row_id, (sequence_id, position, parent_id or _NO_PARENT))
+            for row_id, sequence_id, position, parent_id in rows
+        ]
+        if not entries:
+            return
+
+        data = b"".join(_RECORD.pack(row_id, *location) for row_id, location in entries)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(data)
+            self._rows.update(entries)
+            self._records += len(entries)
+
+    def remove_rows(self, row_ids: Iterable[bytes]) -> None:
+        """Drop rows given by raw id from the index, e.g. rows deleted by an edit."""
+        self.load()
+        row_ids = list(row_ids)
+        if not row_ids:
+            return
+
+        data = b"".join(_RECORD.pack(row_id, _NO_PARENT, _TOMBSTONE, _NO_PARENT) for row_id in row_ids)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(data)
+            for row_id in row_ids:
+                self._rows.pop(row_id, None)
+            self._records += len(row_ids)
+
+    def get(self, row_id: UUID) -> Optional[RowLocation]:
+        """
+        Look up where a row is stored.
+
+        Args:
+            row_id: ID of the row
+
+        Returns:
+            The row's location, or None if it is not indexed
+        """
+        if not self._loaded:
+            self.load()
+        entry = self._rows.get(row_id.bytes)
+        if entry is None:
+            return None
+        sequence_id, position, parent_id = entry
+        return RowLocation(
+            UUID(bytes=sequence_id),
+            position,
+            UUID(bytes=parent_id) if parent_id != _NO_PARENT else None
+        )
+
+    async def aload(self) -> None:
+        await asyncio.to_thread(self.load)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+# Create a singleton instance
+row_index = RowIndex(settings.ROW_INDEX_PATH)
@@ -0,0 +1,173 @@
+"""
+Sequence repository module for SimForge.
+Persists generated cognition sequences and keeps the row index in step with the store.
+"""
+import asyncio
+from typing import List, Tuple, Optional
+from uuid import UUID
+from ...core.utils.config import settings
+from ...core.schema.cognition import CognitionSequence, CognitionRow
+from .storage import SequenceStore, SequenceBatch, sequence_store
+from .row_index import RowIndex, row_index
+from .segments import SegmentLog, segment_log
+from .similarity import SimilarityIndex, similarity_index, row_text
+
+class SequenceRepository:
+    """
+    Stores sequences in the SQLite sequence store and indexes their rows.
+
+    When an archive is given, every saved sequence is also appended to it, and when
+    a similarity index is given, its rows are added to that index.
+    """
+
+    def __init__(
+        self,
+        store: SequenceStore,
+        index: RowIndex,
+        archive: Optional[SegmentLog] = None,
+        similarity: Optional[SimilarityIndex] = None
+    ):
+        self.store = store
+        self.index = index
+        self.archive = archive
+        self.similarity = similarity
+
+    async def get(self, sequence_id: UUID) -> Optional[CognitionSequence]:
+        """
+        Load a stored sequence.
+
+        Args:
+            sequence_id: ID of the sequence
+
+        Returns:
+            The sequence, or None if it is not stored
+        """
+        return await self.store.get_sequence(sequence_id)
+
+    async def get_row(self, row_id: UUID, sequence_id: Optional[UUID] = None) -> Optional[CognitionRow]:
+        """
+        Load a stored row, using the row index to reject unknown rows without touching the store.
+
+        Args:
+            row_id: ID of the row
+            sequence_id: If given, the row must belong to this sequence
+
+        Returns:
+            The row, or None if it is not stored (in that sequence)
+        """
+        location = self.index.get(row_id)
+        if location is None or (sequence_id is not None and location.sequence_id != sequence_id):
+            return None
+        return await self.store.get_row(row_id)
+
+    async def save(self, sequences: List[CognitionSequence]) -> None:
+        """
+        Store (or overwrite) sequences as one batch.
+
+        Args:
+            sequences: The sequences to store
+        """
+        if not sequences:
+            return
+        dropped = await self.store.save_many(sequences)
+        await asyncio.to_thread(self._index, sequences, dropped)
+
+    async def save_edit(
+        self,
+        sequence: CognitionSequence,
+        changed: List[int],
+        moved: List[int],
+        deleted: List[UUID],
+        history: Optional[Tuple[tuple, List[tuple]]] = None
+    ) -> None:
+        """
+        Store an edit of a stored sequence, writing and indexing only the rows it touched.
+
+        Args:
+            sequence: The sequence after the edit
+            changed: Positions of the rows inserted or changed by the edit
+            moved: Positions of the unchanged rows the edit moved
+            deleted: IDs of the rows the edit removed
+            history: Edit history state and new version records to store with it (see SequenceStore.save_edit)
+        """
+        await self.store.save_edit(sequence, changed, moved, deleted, history)
+        await asyncio.to_thread(self._index_edit, sequence, changed, moved, deleted)
+
+    async def get_history(self, sequence_id: UUID) -> Optional[Tuple[int, str, str, List[tuple]]]:
+        """Load the stored edit history of a sequence (see SequenceStore.get_history)."""
+        return await self.store.get_history(sequence_id)
+
+    def save_packed(
+        self,
+        batch: SequenceBatch,
+        archive: Optional[List[Tuple[bytes, bytes]]] = None,
+        imports: Optional[List[tuple]] = None
+    ) -> None:
+        """
+        Store and index a batch packed by SequenceStore.pack, on the calling thread.
+
+        Meant for bulk tools running outside the event loop; the rows are indexed from
+        the packed parameters, so no models are rebuilt.
+
+        Args:
+            batch: The packed sequences
+            archive: The sequences as (id bytes, JSON) pairs, needed when an archive is configured
+            imports: Import file records to commit with the batch (see SequenceStore.save_packed)
+        """
+        dropped = self.store.save_packed(batch, imports)
+        self.index.remove_rows(dropped)
+        self.index.add_rows((row[0], row[1], row[2], row[6]) for row in batch.rows)
+        if self.archive is not None and archive:
+            self.archive.append_encoded(archive)
+        if self.similarity is not None:
+            # Same text as row_text(): goal, belief contents, output
+            self.similarity.add_rows(
+                (row[0], row[1], " ".join((row[3], beliefs, row[5] or "")))
+                for row, (beliefs, _) in zip(batch.rows, batch.texts)
+            )
+
+    def backfill_similarity(self, batch_size: int = 5000) -> int:
+        """
+        Add the stored rows missing from the similarity index, e.g. rows stored before
+        the index existed or while it was disabled. Runs on the calling thread.
+
+        Returns:
+            The number of rows added
+        """
+        if self.similarity is None:
+            return 0
+        missing = self.similarity.missing(self.store.row_ids())
+        for start in range(0, len(missing), batch_size):
+            self.similarity.add_rows(self.store.row_texts(missing[start:start + batch_size]))
+        return len(missing)
+
+    def _index(self, sequences: List[CognitionSequence], dropped: List[bytes]) -> None:
+        self.index.remove_rows(dropped)
+        for sequence in sequences:
+            self.index.add_sequence(sequence)
+        if self.archive is not None:
+            self.archive.append(sequences)
+        if self.similarity is not None:
+            self.similarity.add_sequences(sequences)
+
+    def _index_edit(self, sequence: CognitionSequence, changed: List[int], moved: List[int], deleted: List[UUID]) -> None:
+        sequence_id = sequence.id.bytes
+        rows = sequence.rows
+        self.index.remove_rows(row_id.bytes for row_id in deleted)
+        self.index.add_rows(
+            (rows[position].id.bytes, sequence_id, position, rows[position].parent_id.bytes if rows[position].parent_id else None)
+            for position in sorted(changed + moved)
+        )
+        # Archive records are whole sequences, so the archive gets the edited sequence as a whole
+        if self.archive is not None:
+            self.archive.append([sequence])
+        if self.similarity is not None and changed:
+            self.similarity.add_rows((rows[position].id.bytes, sequence_id, row_text(rows[position])) for position in changed)
+
+# Create a singleton instance
+sequence_repository = SequenceRepository(
+    sequence_store,
+    row_index,
+    segment_log if settings.SEGMENT_ARCHIVE_ENABLED else None,
+    similarity_index if settings.SIMILARITY_ENABLED and similarity_index.available else None
+)
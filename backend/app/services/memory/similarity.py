@@ -0,0 +1,309 @@
+"""
+Similarity module for SimForge.
+Local nearest-neighbour search over rows with hashed TF-IDF vectors in a memory-mapped matrix.
+"""
+import os
+import re
+import math
+import zlib
+import threading
+from typing import List, Dict, Tuple, Optional, Iterable
+from uuid import UUID
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionRow, CognitionSequence
+
+_WORD = re.compile(r"\w+")
+# row id, sequence id
+_ID_SIZE = 32
+
+def _load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def row_text(row: CognitionRow) -> str:
+    """The text a row is compared by: its goal, belief contents and output."""
+    return " ".join([row.goal, *(belief.content for belief in row.beliefs), row.output or ""])
+
+class SimilarityIndex:
+    """
+    Cosine nearest-neighbour index over hashed TF-IDF vectors of rows.
+
+    Unigrams and bigrams are hashed into `dim` signed buckets with sublinear term
+    frequency. Raw term-frequency vectors are appended to a float32 matrix on disk
+    and read through np.memmap, alongside the per-bucket document frequencies, so
+    IDF weights always reflect the whole corpus without re-encoding old rows.
+    Queries are scored in chunks of rows as one matrix product per chunk for the
+    whole batch, keeping a running top-k per query. Re-indexed rows supersede
+    their older vectors, which are masked out of results until the files are
+    compacted on load, once superseded vectors outnumber current ones.
+    """
+
+    def __init__(self, directory: str, dim: int = 512, chunk_rows: int = 65536):
+        self.directory = directory
+        self.dim = dim
+        self.chunk_rows = chunk_rows
+        self.np = _load_numpy()
+        self._matrix = None
+        self._df = None
+        self._documents = 0
+        self._ids: List[Tuple[bytes, bytes]] = []
+        self._latest: Dict[bytes, int] = {}
+        self._stale = None
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def available(self) -> bool:
+        return self.np is not None
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, f"vectors-{self.dim}.f32")
+
+    @property
+    def _ids_path(self) -> str:
+        return os.path.join(self.directory, f"ids-{self.dim}.bin")
+
+    @property
+    def _df_path(self) -> str:
+        return os.path.join(self.directory, f"df-{self.dim}.f64")
+
+    def load(self) -> None:
+        """Map the stored vectors and read their ids. Safe to call more than once."""
+        if not self.available:
+            return
+        np = self.np
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._finish_compaction()
+            try:
+                with open(self._ids_path, "rb") as f:
+                    ids = f.read()
+            except FileNotFoundError:
+                ids = b""
+            vector_bytes = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+
+            # Keep only records that made it into both files
+            count = min(len(ids) // _ID_SIZE, vector_bytes // (4 * self.dim))
+            if count * _ID_SIZE != len(ids) or count * 4 * self.dim != vector_bytes:
+                app_logger.warning("Truncating unmatched similarity index records")
+                for path, size in ((self._ids_path, count * _ID_SIZE), (self._vectors_path, count * 4 * self.dim)):
+                    if os.path.exists(path):
+                        with open(path, "r+b") as f:
+                            f.truncate(size)
+
+            self._ids = [(ids[i:i + 16], ids[i + 16:i + 32]) for i in range(0, count * _ID_SIZE, _ID_SIZE)]
+            self._stale = np.zeros(count, dtype=bool)
+            for index, (row_id, _) in enumerate(self._ids):
+                previous = self._latest.get(row_id)
+                if previous is not None:
+                    self._stale[previous] = True
+                self._latest[row_id] = index
+            if count > 2 * len(self._latest) and count > 1024:
+                self._compact(count)
+                count = len(self._ids)
+
+            # The saved frequencies are prefixed by the number of records they cover
+            saved = np.fromfile(self._df_path, dtype=np.float64) if os.path.exists(self._df_path) else None
+            if saved is not None and len(saved) == self.dim + 1 and saved[0] == count:
+                self._df = saved[1:]
+            else:
+                self._df = self._document_frequencies(count)
+            self._documents = len(self._latest)
+            self._remap()
+            self._loaded = True
+        app_logger.info(f"Similarity index loaded with {len(self._latest)} rows")
+
+    def _finish_compaction(self) -> None:
+        """Complete or roll back a compaction interrupted by a crash."""
+        vectors_tmp, ids_tmp = f"{self._vectors_path}.tmp", f"{self._ids_path}.tmp"
+        if os.path.exists(vectors_tmp):
+            # The old files were not touched yet
+            for path in (vectors_tmp, ids_tmp):
+                if os.path.exists(path):
+                    os.remove(path)
+        elif os.path.exists(ids_tmp):
+            # The vectors were already replaced; the ids must follow
+            os.replace(ids_tmp, self._ids_path)
+
+    def _compact(self, count: int) -> None:
+        """Rewrite the vector and id files keeping only the current vector of each row."""
+        np = self.np
+        live = np.flatnonzero(~self._stale)
+        matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+        vectors_tmp, ids_tmp = f"{self._vectors_path}.tmp", f"{self._ids_path}.tmp"
+        with open(vectors_tmp, "wb") as f:
+            for start in range(0, len(live), self.chunk_rows):
+                f.write(np.asarray(matrix[live[start:start + self.chunk_rows]]).tobytes())
+        del matrix
+        ids = [self._ids[index] for index in live]
+        with open(ids_tmp, "wb") as f:
+            f.write(b"".join(row_id + sequence_id for row_id, sequence_id in ids))
+        # Vectors first: _finish_compaction relies on this order
+        os.replace(vectors_tmp, self._vectors_path)
+        os.replace(ids_tmp, self._ids_path)
+
+        app_logger.info(f"Compacted similarity index from {count} to {len(ids)} vectors")
+        self._ids = ids
+        self._latest = {row_id: index for index, (row_id, _) in enumerate(ids)}
+        self._stale = np.zeros(len(ids), dtype=bool)
+
+    def missing(self, row_ids: Iterable[bytes]) -> List[bytes]:
+        """Return the given row ids (raw bytes) that are not indexed."""
+        self.load()
+        with self._lock:
+            return [row_id for row_id in row_ids if row_id not in self._latest]
+
+    def _document_frequencies(self, count: int):
+        """Count, per bucket, the current (not superseded) rows using it."""
+        np = self.np
+        df = np.zeros(self.dim, dtype=np.float64)
+        if count:
+            matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+            for start in range(0, count, self.chunk_rows):
+                live = ~self._stale[start:start + self.chunk_rows]
+                df += (matrix[start:start + self.chunk_rows][live] != 0).sum(axis=0)
+        return df
+
+    def _remap(self) -> None:
+        count = len(self._ids)
+        self._matrix = (
+            self.np.memmap(self._vectors_path, dtype=self.np.float32, mode="r", shape=(count, self.dim))
+            if count else None
+        )
+
+    def encode(self, texts: Iterable[str]):
+        """Return the raw sublinear term-frequency vectors of `texts`, one row per text."""
+        np = self.np
+        texts = list(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            counts: Dict[int, float] = {}
+            for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = zlib.crc32(term.encode("utf-8"))
+                bucket = digest % self.dim
+                counts[bucket] = counts.get(bucket, 0.0) + (1.0 if digest & 0x80000000 else -1.0)
+            for bucket, value in counts.items():
+                if value:
+                    vectors[i, bucket] = math.copysign(1.0 + math.log(abs(value)), value)
+        return vectors
+
+    def add_sequences(self, sequences: Iterable[CognitionSequence]) -> None:
+        """Index (or re-index) every row of the given sequences."""
+        self.add_rows((row.id.bytes, sequence.id.bytes, row_text(row)) for sequence in sequences for row in sequence.rows)
+
+    def add_rows(self, rows: Iterable[Tuple[bytes, bytes, str]]) -> None:
+        """Index (or re-index) rows given as raw (row id, sequence id, row text) tuples."""
+        if not self.available:
+            return
+        self.load()
+        np = self.np
+        entries = list(rows)
+        if not entries:
+            return
+        vectors = self.encode(text for _, _, text in entries)
+
+        with self._lock:
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._ids_path, "ab") as f:
+                f.write(b"".join(row_id + sequence_id for row_id, sequence_id, _ in entries))
+
+            start = len(self._ids)
+            self._stale = np.concatenate([self._stale, np.zeros(len(entries), dtype=bool)])
+            for offset, (row_id, sequence_id, _) in enumerate(entries):
+                previous = self._latest.get(row_id)
+                if previous is not None:
+                    self._stale[previous] = True
+                    old = self._matrix[previous] if previous < start else vectors[previous - start]
+                    self._df -= old != 0
+                    self._documents -= 1
+                self._latest[row_id] = start + offset
+                self._ids.append((row_id, sequence_id))
+            self._df += (vectors != 0).sum(axis=0)
+            self._documents += len(entries)
+            np.concatenate([[len(self._ids)], self._df]).tofile(self._df_path)
+            self._remap()
+
+    def vector(self, row_id: UUID):
+        """The stored vector of an indexed row, or None."""
+        self.load()
+        with self._lock:
+            index = self._latest.get(row_id.bytes)
+            return None if index is None else self.np.array(self._matrix[index])
+
+    def query(
+        self,
+        vectors,
+        k: int = 10,
+        exclude: Optional[List[Optional[UUID]]] = None
+    ) -> List[List[Tuple[UUID, UUID, float]]]:
+        """
+        Find the k nearest rows of each query vector by IDF-weighted cosine similarity.
+
+        Args:
+            vectors: Raw query vectors from encode() or vector(), one row per query
+            k: Number of neighbours per query
+            exclude: Per query, a row id to leave out (e.g. the query row itself)
+
+        Returns:
+            Per query, (row id, sequence id, similarity) tuples, most similar first
+        """
+        self.load()
+        np = self.np
+        with self._lock:
+            matrix, stale, ids = self._matrix, self._stale, list(self._ids)
+            idf = np.log((1.0 + self._documents) / (1.0 + self._df)) + 1.0
+            excluded = [self._latest.get(row_id.bytes) if row_id else None for row_id in (exclude or [])]
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if matrix is None or not len(queries):
+            return [[] for _ in range(len(queries))]
+
+        weights = (idf * idf).astype(np.float32)
+        weighted = queries * weights
+        query_norms = np.sqrt((queries * queries) @ weights)
+        query_norms[query_norms == 0] = 1.0
+
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_indexes = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(matrix), self.chunk_rows):
+            chunk = np.asarray(matrix[start:start + self.chunk_rows])
+            norms = np.sqrt((chunk * chunk) @ weights)
+            norms[norms == 0] = 1.0
+            scores = (weighted @ chunk.T) / norms / query_norms[:, None]
+            scores[:, stale[start:start + len(chunk)]] = -np.inf
+            for q, index in enumerate(excluded):
+                if index is not None and start <= index < start + len(chunk):
+                    scores[q, index - start] = -np.inf
+
+            take = min(k, scores.shape[1])
+            top = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            best_indexes = np.concatenate([best_indexes, top + start], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_indexes = np.take_along_axis(best_indexes, keep, axis=1)
+
+        results = []
+        for scores, indexes in zip(best_scores, best_indexes):
+            order = np.argsort(-scores)
+            results.append([
+                (UUID(bytes=ids[indexes[i]][0]), UUID(bytes=ids[indexes[i]][1]), float(scores[i]))
+                for i in order
+                if np.isfinite(scores[i])
+            ])
+        return results
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+# Create a singleton instance
+similarity_index = SimilarityIndex(settings.SIMILARITY_DIR, settings.SIMILARITY_DIM)
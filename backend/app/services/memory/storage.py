@@ -0,0 +1,714 @@
+"""
+Storage module for SimForge.
+SQLite-backed store for cognition sequences, rows and beliefs.
+"""
+import os
+import json
+import base64
+import struct
+import sqlite3
+import asyncio
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Tuple, Set, Any, Optional, Callable, Iterator, NamedTuple, TypeVar
+from uuid import UUID
+from ...core.utils.config import settings
+from ...core.utils.logger import app_logger
+from ...core.schema.cognition import CognitionSequence, CognitionRow, Belief
+from ...core.schema.search import SearchHit, SearchPage
+
+T = TypeVar("T")
+
+# row_num is an explicit INTEGER PRIMARY KEY so VACUUM cannot renumber it; it keys the rows' full-text entries
+_ROWS_TABLE = """
+CREATE TABLE IF NOT EXISTS rows (
+    row_num INTEGER PRIMARY KEY,
+    id BLOB NOT NULL UNIQUE,
+    sequence_id BLOB NOT NULL,
+    position INTEGER NOT NULL,
+    goal TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    output TEXT,
+    parent_id BLOB,
+    metadata TEXT NOT NULL
+);
+"""
+
+_ROWS_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_rows_sequence ON rows(sequence_id, position);
+CREATE INDEX IF NOT EXISTS idx_rows_parent ON rows(parent_id) WHERE parent_id IS NOT NULL;
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sequences (
+    id BLOB PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    metadata TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+""" + _ROWS_TABLE + _ROWS_INDEXES + """
+CREATE TABLE IF NOT EXISTS beliefs (
+    row_id BLOB NOT NULL,
+    position INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    source TEXT,
+    PRIMARY KEY (row_id, position)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS rows_fts USING fts5(goal, output, beliefs, tokenize = 'porter unicode61');
+CREATE TABLE IF NOT EXISTS imports (
+    digest TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    sequences INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    imported_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS histories (
+    sequence_id BLOB PRIMARY KEY,
+    head INTEGER NOT NULL,
+    redo TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history_versions (
+    sequence_id BLOB NOT NULL,
+    number INTEGER NOT NULL,
+    parent INTEGER,
+    forward TEXT NOT NULL,
+    inverse TEXT NOT NULL,
+    snapshot TEXT,
+    message TEXT,
+    created_at TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (sequence_id, number)
+) WITHOUT ROWID;
+"""
+
+# Databases created before rows had row_num: rebuild the table, keeping the old rowids,
+# and clear the full-text index so _FTS_SETUP rebuilds it against row_num
+_MIGRATE_ROW_NUM = """
+BEGIN;
+DROP INDEX IF EXISTS idx_rows_sequence;
+DROP INDEX IF EXISTS idx_rows_parent;
+ALTER TABLE rows RENAME TO rows_old;
+""" + _ROWS_TABLE + """
+INSERT INTO rows (row_num, id, sequence_id, position, goal, operation, output, parent_id, metadata)
+SELECT rowid, id, sequence_id, position, goal, operation, output, parent_id, metadata FROM rows_old;
+DROP TABLE rows_old;
+""" + _ROWS_INDEXES + """
+DELETE FROM rows_fts;
+COMMIT;
+"""
+
+# Full-text entries use their row's row_num as rowid; goal matches weigh double
+_FTS_SETUP = [
+    "INSERT INTO rows_fts(rows_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0, 1.0)')",
+    "INSERT INTO rows_fts(rowid, goal, output, beliefs) "
+    "SELECT r.row_num, r.goal, r.output, (SELECT group_concat(content, char(10)) FROM beliefs b WHERE b.row_id = r.id) "
+    "FROM rows r WHERE NOT EXISTS (SELECT 1 FROM rows_fts LIMIT 1)"
+]
+
+_ROW_COLUMNS = "id, sequence_id, position, goal, operation, output, parent_id, metadata"
+_TABLE_QUERIES = {
+    "sequences": "SELECT id, title, description, metadata, created_at, updated_at FROM sequences ORDER BY id",
+    "rows": f"SELECT {_ROW_COLUMNS} FROM rows ORDER BY sequence_id, position",
+    "beliefs": "SELECT row_id, position, content, confidence, source FROM beliefs ORDER BY row_id, position"
+}
+
+def _match_expression(query: str) -> str:
+    """Quote every term of a plain-text query so FTS5 operators in it are matched literally."""
+    terms = []
+    for term in query.split():
+        prefix = term.endswith("*") and len(term) > 1
+        term = term.rstrip("*")
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+# A search cursor is the (rank, row_num) of the last hit of the previous page
+_CURSOR = struct.Struct("<dq")
+
+def _encode_cursor(rank: float, row_num: int) -> str:
+    return base64.urlsafe_b64encode(_CURSOR.pack(rank, row_num)).decode("ascii")
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, row_num = _CURSOR.unpack(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, struct.error):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if rank != rank:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return rank, row_num
+
+class SequenceBatch(NamedTuple):
+    """Insert parameters for the sequences, rows, beliefs and full-text entries of a batch of sequences."""
+    sequences: List[tuple]
+    rows: List[tuple]
+    beliefs: List[tuple]
+    texts: List[tuple]
+
+class SequenceStore:
+    """
+    Normalized SQLite store (sequences, rows, beliefs) in WAL mode, with an FTS5
+    index over row goals, outputs and belief contents kept in the same transactions.
+
+    All database work runs on the store's own thread pools so the event loop never
+    blocks: one writer thread applies each batch of sequences as a single transaction
+    of executemany inserts, and a pool of reader threads, each with its own
+    connection, serves lookups concurrently with writes.
+    """
+
+    def __init__(self, path: str, read_threads: int = 4):
+        self.path = path
+        self.read_threads = read_threads
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._readers: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._initialized = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-65536")
+            with self._connections_lock:
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    columns = [column[1] for column in conn.execute("PRAGMA table_info(rows)")]
+                    if "row_num" not in columns:
+                        app_logger.info("Migrating the rows table to an explicit row_num key and rebuilding the search index")
+                        conn.executescript(_MIGRATE_ROW_NUM)
+                    with conn:
+                        # Backfills the index once for databases created before it existed
+                        for statement in _FTS_SETUP:
+                            conn.execute(statement)
+                    self._initialized = True
+                self._connections.append(conn)
+            self._local.conn = conn
+        return conn
+
+    async def _read(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        if self._readers is None:
+            self._readers = ThreadPoolExecutor(max_workers=self.read_threads, thread_name_prefix="store-reader")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, lambda: fn(self._connection()))
+
+    async def _write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-writer")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, lambda: fn(self._connection()))
+
+    async def start(self) -> None:
+        """Create the schema ahead of the first request."""
+        await self._write(lambda conn: None)
+        app_logger.info(f"Sequence store opened at {self.path}")
+
+    def close(self) -> None:
+        """Shut down the thread pools and close every connection."""
+        for pool in (self._writer, self._readers):
+            if pool is not None:
+                pool.shutdown(wait=True)
+        self._writer = None
+        self._readers = None
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    @staticmethod
+    def _pack_row(
+        sequence_id: bytes,
+        position: int,
+        row: CognitionRow,
+        row_params: List[tuple],
+        belief_params: List[tuple],
+        text_params: List[tuple]
+    ) -> None:
+        row_id = row.id.bytes
+        row_params.append((
+            row_id,
+            sequence_id,
+            position,
+            row.goal,
+            row.operation,
+            row.output,
+            row.parent_id.bytes if row.parent_id else None,
+            json.dumps(row.metadata)
+        ))
+        belief_params.extend(
+            (row_id, index, belief.content, belief.confidence, belief.source)
+            for index, belief in enumerate(row.beliefs)
+        )
+        text_params.append(("\n".join(belief.content for belief in row.beliefs), row_id))
+
+    @staticmethod
+    def pack(sequences: List[CognitionSequence]) -> SequenceBatch:
+        """Build the insert parameters of `sequences`. Needs no connection, so it can run in another process."""
+        sequence_params = []
+        row_params = []
+        belief_params = []
+        text_params = []
+        for sequence in sequences:
+            sequence_id = sequence.id.bytes
+            sequence_params.append((
+                sequence_id,
+                sequence.title,
+                sequence.description,
+                json.dumps(sequence.metadata),
+                sequence.created_at.isoformat(),
+                sequence.updated_at.isoformat()
+            ))
+            for position, row in enumerate(sequence.rows):
+                SequenceStore._pack_row(sequence_id, position, row, row_params, belief_params, text_params)
+        return SequenceBatch(sequence_params, row_params, belief_params, text_params)
+
+    def _apply(self, conn: sqlite3.Connection, batch: SequenceBatch) -> List[bytes]:
+        """
+        Replace the batch's sequences; the caller owns the transaction.
+
+        Returns:
+            IDs of the rows the previous versions of these sequences had and the new ones do not
+        """
+        sequence_params, row_params, belief_params, text_params = batch
+        sequence_ids = [(params[0],) for params in sequence_params]
+        row_ids = [(params[0],) for params in row_params]
+        kept = {params[0] for params in row_params}
+        dropped = []
+        for start in range(0, len(sequence_ids), 500):
+            chunk = [sequence_id for (sequence_id,) in sequence_ids[start:start + 500]]
+            placeholders = ", ".join("?" * len(chunk))
+            dropped.extend(
+                row_id for (row_id,) in conn.execute(f"SELECT id FROM rows WHERE sequence_id IN ({placeholders})", chunk)
+                if row_id not in kept
+            )
+        # Replace any previous version of these sequences wholesale, including rows
+        # with the same ids stored under another sequence
+        conn.executemany(
+            "DELETE FROM rows_fts WHERE rowid IN (SELECT row_num FROM rows WHERE sequence_id = ?)",
+            sequence_ids
+        )
+        conn.executemany("DELETE FROM rows_fts WHERE rowid IN (SELECT row_num FROM rows WHERE id = ?)", row_ids)
+        conn.executemany(
+            "DELETE FROM beliefs WHERE row_id IN (SELECT id FROM rows WHERE sequence_id = ?)",
+            sequence_ids
+        )
+        conn.executemany("DELETE FROM beliefs WHERE row_id = ?", row_ids)
+        conn.executemany("DELETE FROM rows WHERE sequence_id = ?", sequence_ids)
+        conn.executemany("INSERT OR REPLACE INTO sequences VALUES (?, ?, ?, ?, ?, ?)", sequence_params)
+        conn.executemany(f"INSERT OR REPLACE INTO rows ({_ROW_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row_params)
+        conn.executemany("INSERT OR REPLACE INTO beliefs VALUES (?, ?, ?, ?, ?)", belief_params)
+        conn.executemany(
+            "INSERT INTO rows_fts(rowid, goal, output, beliefs) SELECT row_num, goal, output, ? FROM rows WHERE id = ?",
+            text_params
+        )
+        return dropped
+
+    def save_many_sync(self, conn: sqlite3.Connection, sequences: List[CognitionSequence]) -> List[bytes]:
+        """
+        Insert or replace `sequences` in one transaction (runs on the writer thread).
+
+        Returns:
+            IDs of the rows dropped from re-saved sequences
+        """
+        batch = self.pack(sequences)
+        with conn:
+            return self._apply(conn, batch)
+
+    def save_packed(self, batch: SequenceBatch, imports: Optional[List[tuple]] = None) -> List[bytes]:
+        """
+        Apply a packed batch in one transaction on the calling thread's connection, for
+        bulk tools running outside the event loop.
+
+        Args:
+            batch: Parameters built by pack()
+            imports: (digest, path, sequences, errors, imported_at) records of import files
+                completed by this batch, committed together with it
+
+        Returns:
+            IDs of the rows dropped from re-saved sequences
+        """
+        conn = self._connection()
+        with conn:
+            dropped = self._apply(conn, batch)
+            if imports:
+                conn.executemany("INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?)", imports)
+        return dropped
+
+    def imported(self, digests: List[str]) -> Set[str]:
+        """Return which of the given file content digests were already imported (on the calling thread)."""
+        conn = self._connection()
+        found: Set[str] = set()
+        # Stay well below SQLite's bound parameter limit
+        for start in range(0, len(digests), 500):
+            chunk = digests[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            found.update(
+                digest for (digest,) in conn.execute(f"SELECT digest FROM imports WHERE digest IN ({placeholders})", chunk)
+            )
+        return found
+
+    def row_ids(self) -> List[bytes]:
+        """Return the id of every stored row (on the calling thread)."""
+        return [row_id for (row_id,) in self._connection().execute("SELECT id FROM rows")]
+
+    def row_texts(self, row_ids: List[bytes]) -> List[Tuple[bytes, bytes, str]]:
+        """
+        Return (row id, sequence id, text) for the given stored rows (on the calling thread),
+        the text being the goal, belief contents and output as compared by the similarity index.
+        """
+        conn = self._connection()
+        texts = []
+        for start in range(0, len(row_ids), 500):
+            chunk = row_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            texts.extend(
+                (row_id, sequence_id, " ".join((goal, beliefs or "", output or "")))
+                for row_id, sequence_id, goal, beliefs, output in conn.execute(
+                    f"SELECT r.id, r.sequence_id, r.goal, "
+                    f"(SELECT group_concat(content, ' ') FROM beliefs b WHERE b.row_id = r.id), r.output "
+                    f"FROM rows r WHERE r.id IN ({placeholders})",
+                    chunk
+                )
+            )
+        return texts
+
+    async def save_many(self, sequences: List[CognitionSequence]) -> List[bytes]:
+        """
+        Store (or replace) a batch of sequences in one transaction.
+
+        Args:
+            sequences: The sequences to store
+
+        Returns:
+            IDs of the rows the stored versions of these sequences had and the new ones do not
+        """
+        if not sequences:
+            return []
+        return await self._write(lambda conn: self.save_many_sync(conn, sequences))
+
+    async def save_edit(
+        self,
+        sequence: CognitionSequence,
+        changed: List[int],
+        moved: List[int],
+        deleted: List[UUID],
+        history: Optional[Tuple[tuple, List[tuple]]] = None
+    ) -> None:
+        """
+        Write an edit of a stored sequence in one transaction, touching only the rows it changed.
+
+        Args:
+            sequence: The sequence after the edit; its fields and updated_at are always written
+            changed: Positions of the rows that were inserted or whose content changed
+            moved: Positions of the rows that kept their content but changed position
+            deleted: IDs of the rows removed from the sequence
+            history: (head, redo) of the sequence's edit history and the version records
+                added to it, as (sequence id, number, parent, forward, inverse, snapshot,
+                message, created_at, size) tuples; a record numbered 0 starts a new history
+        """
+        sequence_id = sequence.id.bytes
+        row_params: List[tuple] = []
+        belief_params: List[tuple] = []
+        text_params: List[tuple] = []
+        for position in changed:
+            self._pack_row(sequence_id, position, sequence.rows[position], row_params, belief_params, text_params)
+        removed = [(row_id.bytes,) for row_id in deleted]
+        replaced = removed + [(params[0],) for params in row_params]
+
+        def write(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.executemany("DELETE FROM rows_fts WHERE rowid IN (SELECT row_num FROM rows WHERE id = ?)", replaced)
+                conn.executemany("DELETE FROM beliefs WHERE row_id = ?", replaced)
+                conn.executemany("DELETE FROM rows WHERE id = ?", removed)
+                conn.execute(
+                    "UPDATE sequences SET title = ?, description = ?, metadata = ?, updated_at = ? WHERE id = ?",
+                    (
+                        sequence.title,
+                        sequence.description,
+                        json.dumps(sequence.metadata),
+                        sequence.updated_at.isoformat(),
+                        sequence_id
+                    )
+                )
+                conn.executemany(
+                    "UPDATE rows SET position = ? WHERE id = ?",
+                    [(position, sequence.rows[position].id.bytes) for position in moved]
+                )
+                conn.executemany(f"INSERT OR REPLACE INTO rows ({_ROW_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row_params)
+                conn.executemany("INSERT OR REPLACE INTO beliefs VALUES (?, ?, ?, ?, ?)", belief_params)
+                conn.executemany(
+                    "INSERT INTO rows_fts(rowid, goal, output, beliefs) SELECT row_num, goal, output, ? FROM rows WHERE id = ?",
+                    text_params
+                )
+                if history is not None:
+                    (head, redo), versions = history
+                    if any(version[1] == 0 for version in versions):
+                        conn.execute("DELETE FROM history_versions WHERE sequence_id = ?", (sequence_id,))
+                    conn.executemany("INSERT OR REPLACE INTO history_versions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", versions)
+                    conn.execute("INSERT OR REPLACE INTO histories VALUES (?, ?, ?)", (sequence_id, head, redo))
+
+        await self._write(write)
+
+    async def get_history(self, sequence_id: UUID) -> Optional[Tuple[int, str, str, List[tuple]]]:
+        """
+        Load the stored edit history of a sequence.
+
+        Returns:
+            (head, redo, updated_at of the stored sequence, version records ordered by number),
+            or None if the sequence has no stored history
+        """
+        def read(conn: sqlite3.Connection) -> Optional[Tuple[int, str, str, List[tuple]]]:
+            state = conn.execute(
+                "SELECT h.head, h.redo, s.updated_at FROM histories h JOIN sequences s ON s.id = h.sequence_id "
+                "WHERE h.sequence_id = ?",
+                (sequence_id.bytes,)
+            ).fetchone()
+            if state is None:
+                return None
+            versions = conn.execute(
+                "SELECT number, parent, forward, inverse, snapshot, message, created_at, size "
+                "FROM history_versions WHERE sequence_id = ? ORDER BY number",
+                (sequence_id.bytes,)
+            ).fetchall()
+            return (*state, versions)
+
+        return await self._read(read)
+
+    def _beliefs_by_row(self, conn: sqlite3.Connection, row_ids: List[bytes]) -> Dict[bytes, List[Belief]]:
+        beliefs: Dict[bytes, List[Belief]] = {row_id: [] for row_id in row_ids}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(row_ids), 500):
+            chunk = row_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row_id, content, confidence, source in conn.execute(
+                f"SELECT row_id, content, confidence, source FROM beliefs "
+                f"WHERE row_id IN ({placeholders}) ORDER BY row_id, position",
+                chunk
+            ):
+                beliefs[row_id].append(Belief(content=content, confidence=confidence, source=source))
+        return beliefs
+
+    def _build_rows(self, conn: sqlite3.Connection, records: List[tuple]) -> List[CognitionRow]:
+        beliefs = self._beliefs_by_row(conn, [record[0] for record in records])
+        return [
+            CognitionRow(
+                id=UUID(bytes=row_id),
+                goal=goal,
+                beliefs=beliefs[row_id],
+                operation=operation,
+                output=output,
+                parent_id=UUID(bytes=parent_id) if parent_id else None,
+                metadata=json.loads(metadata)
+            )
+            for row_id, _, _, goal, operation, output, parent_id, metadata in records
+        ]
+
+    def _get_sequence(self, conn: sqlite3.Connection, sequence_id: UUID) -> Optional[CognitionSequence]:
+        record = conn.execute(
+            "SELECT title, description, metadata, created_at, updated_at FROM sequences WHERE id = ?",
+            (sequence_id.bytes,)
+        ).fetchone()
+        if record is None:
+            return None
+        title, description, metadata, created_at, updated_at = record
+        rows = conn.execute(
+            f"SELECT {_ROW_COLUMNS} FROM rows WHERE sequence_id = ? ORDER BY position",
+            (sequence_id.bytes,)
+        ).fetchall()
+        return CognitionSequence(
+            id=sequence_id,
+            title=title,
+            description=description,
+            rows=self._build_rows(conn, rows),
+            metadata=json.loads(metadata),
+            created_at=datetime.fromisoformat(created_at),
+            updated_at=datetime.fromisoformat(updated_at)
+        )
+
+    async def get_sequence(self, sequence_id: UUID) -> Optional[CognitionSequence]:
+        """
+        Load a stored sequence with its rows and beliefs.
+
+        Args:
+            sequence_id: ID of the sequence
+
+        Returns:
+            The sequence, or None if it is not stored
+        """
+        return await self._read(lambda conn: self._get_sequence(conn, sequence_id))
+
+    async def get_row(self, row_id: UUID) -> Optional[CognitionRow]:
+        """
+        Load a stored row by id.
+
+        Args:
+            row_id: ID of the row
+
+        Returns:
+            The row, or None if it is not stored
+        """
+        def read(conn: sqlite3.Connection) -> Optional[CognitionRow]:
+            record = conn.execute(f"SELECT {_ROW_COLUMNS} FROM rows WHERE id = ?", (row_id.bytes,)).fetchone()
+            return self._build_rows(conn, [record])[0] if record else None
+
+        return await self._read(read)
+
+    async def get_children(self, parent_id: UUID) -> List[CognitionRow]:
+        """
+        Load the stored rows forked from a row.
+
+        Args:
+            parent_id: ID of the parent row
+
+        Returns:
+            The rows whose parent_id is `parent_id`
+        """
+        def read(conn: sqlite3.Connection) -> List[CognitionRow]:
+            records = conn.execute(f"SELECT {_ROW_COLUMNS} FROM rows WHERE parent_id = ?", (parent_id.bytes,)).fetchall()
+            return self._build_rows(conn, records)
+
+        return await self._read(read)
+
+    @contextmanager
+    def snapshot(self) -> Iterator[None]:
+        """Hold one read transaction on the calling thread's connection, so consecutive reads see the same data."""
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            conn.rollback()
+
+    def iter_table(self, table: str, batch_size: int) -> Iterator[List[tuple]]:
+        """
+        Stream the raw records of one table in batches, on the calling thread's connection.
+
+        Args:
+            table: One of "sequences", "rows" or "beliefs"
+            batch_size: Maximum number of records per batch
+
+        Yields:
+            Lists of records in the table's column order
+        """
+        if table not in _TABLE_QUERIES:
+            raise ValueError(f"Unknown table: {table}")
+        cursor = self._connection().execute(_TABLE_QUERIES[table])
+        try:
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    return
+                yield batch
+        finally:
+            cursor.close()
+
+    def _search(
+        self,
+        conn: sqlite3.Connection,
+        query: str,
+        operations: Optional[List[str]],
+        min_confidence: Optional[float],
+        max_confidence: Optional[float],
+        sequence_id: Optional[UUID],
+        limit: int,
+        after: Optional[Tuple[float, int]]
+    ) -> SearchPage:
+        clauses = ["rows_fts MATCH ?"]
+        params: List[Any] = [query]
+        if operations:
+            clauses.append(f"r.operation IN ({','.join('?' * len(operations))})")
+            params.extend(operations)
+        if sequence_id is not None:
+            clauses.append("r.sequence_id = ?")
+            params.append(sequence_id.bytes)
+        if min_confidence is not None or max_confidence is not None:
+            clauses.append(
+                "EXISTS (SELECT 1 FROM beliefs b WHERE b.row_id = r.id AND b.confidence BETWEEN ? AND ?)"
+            )
+            params.extend([
+                min_confidence if min_confidence is not None else 0.0,
+                max_confidence if max_confidence is not None else 1.0
+            ])
+        if after is not None:
+            clauses.append("(rows_fts.rank, rows_fts.rowid) > (?, ?)")
+            params.extend(after)
+        params.append(limit + 1)
+
+        records = conn.execute(
+            f"SELECT {', '.join('r.' + column for column in _ROW_COLUMNS.split(', '))}, rows_fts.rank, "
+            f"snippet(rows_fts, -1, '[', ']', '...', 12), rows_fts.rowid "
+            f"FROM rows_fts JOIN rows r ON r.row_num = rows_fts.rowid "
+            f"WHERE {' AND '.join(clauses)} ORDER BY rows_fts.rank, rows_fts.rowid LIMIT ?",
+            params
+        ).fetchall()
+
+        page, more = records[:limit], len(records) > limit
+        rows = self._build_rows(conn, [record[:8] for record in page])
+        hits = [
+            SearchHit(row=row, sequence_id=UUID(bytes=record[1]), position=record[2], score=-record[8], snippet=record[9])
+            for row, record in zip(rows, page)
+        ]
+        next_cursor = _encode_cursor(page[-1][8], page[-1][10]) if more else None
+        return SearchPage(hits=hits, next_cursor=next_cursor)
+
+    async def search(
+        self,
+        query: str,
+        operations: Optional[List[str]] = None,
+        min_confidence: Optional[float] = None,
+        max_confidence: Optional[float] = None,
+        sequence_id: Optional[UUID] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> SearchPage:
+        """
+        Full-text search over row goals, outputs and belief contents, best match first.
+
+        Pages are keyed on the last hit's (rank, row_num), so each page starts right
+        after the previous one without re-reading it. While the store is unchanged,
+        paging returns every hit exactly once. Storing rows between two page requests
+        shifts bm25 scores, which can skip or repeat hits near the page boundary.
+
+        Args:
+            query: Search terms; every term must match (prefix matches with a trailing *)
+            operations: Only rows with one of these operations
+            min_confidence: Only rows with a belief at least this confident
+            max_confidence: Only rows with a belief at most this confident
+            sequence_id: Only rows of this sequence
+            limit: Maximum number of hits
+            cursor: The next_cursor of the previous page
+
+        Returns:
+            The page of hits and the cursor of the next page (None on the last page)
+        """
+        match = _match_expression(query)
+        if not match:
+            return SearchPage(hits=[])
+        after = _decode_cursor(cursor) if cursor else None
+        return await self._read(lambda conn: self._search(
+            conn, match, operations, min_confidence, max_confidence, sequence_id, limit, after
+        ))
+
+    async def stats(self) -> Dict[str, Any]:
+        """Return the number of stored sequences, rows and beliefs."""
+        def read(conn: sqlite3.Connection) -> Dict[str, Any]:
+            return {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("sequences", "rows", "beliefs")
+            }
+
+        return await self._read(read)
+
+# Create a singleton instance
+sequence_store = SequenceStore(settings.STORAGE_DB_PATH, settings.STORAGE_READ_THREADS)
@@ -0,0 +1,114 @@
+import re
+import json
+from typing import Callable, Iterable, Optional
+
+import httpx
+import pytest
+
+from app.core.utils.config import settings
+from app.core.schema.cognition import CognitionSequence, CognitionRow, Belief
+from app.services.llm.client import LLMClient, LLMError
+from app.services.llm.limiter import AdaptiveLimiter
+from app.services.llm.provider import Endpoint, ProviderPool, ProviderRegistry
+from app.services.memory.storage import SequenceStore
+from app.services.memory.row_index import RowIndex
+from app.services.memory.sequences import SequenceRepository
+
+
+def make_row(goal: str, operation: str = "Act", confidence: float = 0.5) -> CognitionRow:
+    """A row with two beliefs whose texts all derive from `goal`."""
+    return CognitionRow(
+        goal=goal,
+        beliefs=[Belief(content=f"{goal} belief", confidence=confidence, source="test"), Belief(content="second")],
+        operation=operation,
+        output=f"{goal} output",
+        metadata={"step": goal}
+    )
+
+
+def make_sequence(*goals: str, title: str = "sequence") -> CognitionSequence:
+    """A sequence with one make_row() row per goal."""
+    return CognitionSequence(title=title, description="d", rows=[make_row(goal) for goal in goals], metadata={"k": 1})
+
+
+def completion(*contents: str, total_tokens: int = 10) -> httpx.Response:
+    """A chat-completion response with one choice per content."""
+    return httpx.Response(200, json={
+        "choices": [{"message": {"role": "assistant", "content": content}} for content in contents],
+        "usage": {"total_tokens": total_tokens}
+    })
+
+
+def stream(*deltas: str) -> httpx.Response:
+    """A streamed chat-completion response sending the given content deltas."""
+    lines = [f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n" for delta in deltas]
+    return httpx.Response(200, content="".join(lines + ["data: [DONE]\n\n"]).encode("utf-8"))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SequenceStore(str(tmp_path / "store.db"), read_threads=2)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def repository(store, tmp_path):
+    return SequenceRepository(store, RowIndex(str(tmp_path / "rows.idx")))
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """
+    Build an LLMClient whose endpoints are served by `handler(request, endpoint url)`
+    instead of the network, with caching off and instant retries.
+    """
+    monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "LLM_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(settings, "LLM_DEFAULT_RETRY_AFTER", 0.0)
+    monkeypatch.setattr(settings, "LLM_HEDGE", False)
+
+    def make(
+        handler: Callable[[httpx.Request, str], httpx.Response],
+        urls: Iterable[str] = ("http://primary",),
+        fallback_urls: Optional[Iterable[str]] = None,
+        concurrency: int = 4
+    ) -> LLMClient:
+        client = LLMClient()
+        client.registry = ProviderRegistry(
+            ProviderPool("local", [Endpoint("local", url, "model") for url in urls]),
+            ProviderPool("local", [Endpoint("local", url, "fallback-model") for url in fallback_urls])
+            if fallback_urls is not None else None
+        )
+        client.limiter = AdaptiveLimiter(0, 0, concurrency, max(concurrency, 8))
+        transport = httpx.MockTransport(lambda request: handler(request, f"{request.url.scheme}://{request.url.host}"))
+        client._client = httpx.AsyncClient(transport=transport)
+        return client
+
+    return make
+
+
+class FakeForkLLM:
+    """
+    Stands in for the LLM client in fork tests: answers every fork prompt with one
+    fork per row, leaving rows whose goal is in `skip` out of packed answers and
+    failing calls whose first row has a goal in `fail`.
+    """
+
+    def __init__(self, skip: Iterable[str] = (), fail: Iterable[str] = ()):
+        self.skip = set(skip)
+        self.fail = set(fail)
+        self.calls = []
+
+    async def chat_completion(self, system_prompt: str, user_prompt: str, temperature: float = 0.7, cache=None) -> str:
+        goals = re.findall(r"^Goal: (.*)$", user_prompt, re.M)
+        labels = re.findall(r"^\[(r\d+)\]$", user_prompt, re.M)
+        self.calls.append(goals)
+        if goals[0] in self.fail:
+            raise LLMError("fork call failed", status_code=500)
+        if labels:
+            return json.dumps({
+                label: [{"output": f"fork of {goal}"}]
+                for label, goal in zip(labels, goals) if goal not in self.skip
+            })
+        return json.dumps({"forks": [{"output": f"fork of {goals[0]}"}]})
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm import cache as cache_module
+from app.services.llm.cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+
+    def time():
+        now.value += 0.001
+        return now.value
+
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=time))
+    return now
+
+
+def test_cache_key_ignores_transport_fields_and_splits_samples():
+    payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "temperature": 0.7}
+    key = ResponseCache.make_key(payload)
+    assert ResponseCache.make_key({**payload, "stream": True, "stream_options": {"include_usage": True}}) == key
+    assert ResponseCache.make_key(dict(reversed(list(payload.items())))) == key
+    assert ResponseCache.make_key(payload, sample=1) != key
+    assert ResponseCache.make_key({**payload, "temperature": 0.2}) != key
+
+
+def test_cache_expires_entries_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache" / "responses.db"), max_bytes=1 << 20, ttl=60)
+    cache.put("a", {"content": "first"})
+    assert cache.get("a") == {"content": "first"}
+
+    clock.value += 61
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+
+def test_cache_evicts_least_recently_used_entries(tmp_path, clock):
+    value = {"content": "x" * 100}
+    cache = ResponseCache(str(tmp_path / "cache" / "responses.db"), max_bytes=300, ttl=0)
+    cache.put("a", value)
+    cache.put("b", value)
+    assert cache.get("a") == value
+
+    cache.put("c", value)
+    assert cache.get("b") is None
+    assert cache.get("a") == value and cache.get("c") == value
+    assert cache.evictions == 1
+    assert cache.stats()["bytes"] <= 300
+    cache.close()
+
+    # The byte count survives reopening
+    reopened = ResponseCache(cache.path, max_bytes=300, ttl=0)
+    assert reopened.get("c") == value
+    assert reopened.stats()["bytes"] == cache.stats()["bytes"]
+    reopened.close()
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app.core.engine.coalescer import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+    assert results == [1] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "shared": 4}
+
+    # A finished call is not reused
+    assert await flight.do("key", work) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_one_waiter_cancelling():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", work))
+    second = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_single_flight_cancels_call_once_every_waiter_is_gone():
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiters = [asyncio.create_task(flight.do("key", work)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.stats()["in_flight"] == 0
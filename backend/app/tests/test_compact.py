@@ -0,0 +1,26 @@
+from uuid import uuid4
+
+from app.core.schema.cognition import CognitionRow, Belief
+from app.core.engine.compact import CompactRow
+
+
+def test_compact_rows_convert_losslessly():
+    rows = [
+        CognitionRow(
+            goal="g",
+            beliefs=[Belief(content="a", confidence=0.25, source="log"), Belief(content="b", confidence=1.0)],
+            operation="Plan",
+            output=None,
+            parent_id=uuid4(),
+            metadata={"n": 1, "ok": True}
+        ),
+        CognitionRow(goal="", beliefs=[], operation="Reflect", output="o")
+    ]
+    for row in rows:
+        compact = CompactRow.from_model(row)
+        assert compact.to_model() == row
+        assert CompactRow.from_list(compact.to_list()).to_model() == row
+
+    # Rows without sources or metadata store neither
+    compact = CompactRow.from_model(rows[1])
+    assert (compact.sources, compact._metadata, compact.metadata, compact.operation) == (None, None, {}, "Reflect")
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from app.core.schema.cognition import CognitionRow, Belief
+from app.core.engine.decoding import decode_sequence, decode_row, decode_forks, decode_packed_forks
+
+
+def _row(goal: str, output: str = "done", operation: str = "Act") -> CognitionRow:
+    return CognitionRow(goal=goal, beliefs=[Belief(content=f"belief about {goal}", confidence=0.5)], operation=operation, output=output)
+
+
+def test_decode_sequence_fills_defaults_and_ignores_assigned_fields():
+    sequence = decode_sequence(json.dumps({
+        "id": "not-a-uuid",
+        "rows": [{"goal": "g", "operation": "Dance", "id": "also-not-a-uuid", "metadata": {"x": [1]}}, {"output": "o"}]
+    }))
+    assert sequence.title == "Untitled Sequence"
+    assert [row.operation for row in sequence.rows] == ["Reflect", "Reflect"]
+    assert sequence.rows[0].metadata == {}
+    assert sequence.rows[1].goal == ""
+
+
+def test_decode_row_rejects_objects_without_row_fields():
+    with pytest.raises(ValueError):
+        decode_row('{"unrelated": 1}')
+    assert decode_row('{"goal": "g"}').goal == "g"
+
+
+def test_decode_forks_drops_invalid_forks_individually():
+    original = _row("parent goal")
+    content = json.dumps({"forks": [{"output": "a"}, {"beliefs": "not a list"}, {"goal": "own goal", "output": "b"}, {"output": "c"}]})
+    forks = decode_forks(content, original, limit=2)
+    assert [fork.output for fork in forks] == ["a", "b"]
+    assert [fork.goal for fork in forks] == ["parent goal", "own goal"]
+    assert all(fork.parent_id == original.id for fork in forks)
+
+
+def test_decode_packed_forks_gives_unusable_answers_no_forks():
+    rows = {"r0": _row("first"), "r1": _row("second"), "r2": _row("third")}
+    forks = decode_packed_forks(json.dumps({"r0": [{"output": "x"}], "r1": "garbage"}), rows, limit=3)
+    assert [fork.output for fork in forks["r0"]] == ["x"]
+    assert forks["r1"] == [] and forks["r2"] == []
@@ -0,0 +1,29 @@
+from app.core.schema.cognition import CognitionRow, Belief
+from app.core.engine.dedup import Deduplicator, lsh_bands, row_fields
+
+
+def _row(goal: str, output: str = "done", operation: str = "Act") -> CognitionRow:
+    return CognitionRow(goal=goal, beliefs=[Belief(content=f"belief about {goal}", confidence=0.5)], operation=operation, output=output)
+
+
+def test_lsh_bands_divide_the_permutations():
+    bands, rows = lsh_bands(64, 0.8)
+    assert bands * rows == 64
+    assert abs((1 / bands) ** (1 / rows) - 0.8) < 0.1
+
+
+def test_deduplicator_keeps_first_of_near_duplicates():
+    text = "the agent inspects the failing build log and finds a missing dependency in the lock file"
+    rows = [
+        _row(text),
+        _row(text.capitalize() + "."),
+        _row("the user asks for a summary of the quarterly sales figures by region and product line"),
+        # Same state as the first row but a different action: not a duplicate
+        _row(text, output="rolls back the release and pages the on-call engineer", operation="Plan"),
+    ]
+    kept = Deduplicator(threshold=0.8).filter(rows, row_fields)
+    assert kept == [rows[0], rows[2], rows[3]]
+    assert Deduplicator(threshold=0.8).filter(rows, row_fields, limit=1) == [rows[0]]
+
+    track = Deduplicator(threshold=0.8).tracker(row_fields)
+    assert [track(row) for row in rows] == [True, False, True, True]
@@ -0,0 +1,27 @@
+import pytest
+
+from app.services.memory.export import ParquetExporter
+from .conftest import make_sequence
+
+
+def test_parquet_export_schema(store, tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    sequence = make_sequence("a", "b")
+    sequence.rows[1].parent_id = sequence.rows[0].id
+    store.save_many_sync(store._connection(), [sequence])
+
+    result = ParquetExporter(store, batch_size=1).export(str(tmp_path / "export"))
+    assert {table: info["records"] for table, info in result["tables"].items()} == {"sequences": 1, "rows": 2, "beliefs": 4}
+
+    rows = pq.read_table(result["tables"]["rows"]["path"])
+    assert rows.schema.names == ["id", "sequence_id", "position", "goal", "operation", "output", "parent_id", "metadata"]
+    assert str(rows.schema.field("operation").type) == "dictionary<values=string, indices=int32, ordered=0>"
+    assert rows.column("parent_id").to_pylist() == [None, str(sequence.rows[0].id)]
+    sequences = pq.read_table(result["tables"]["sequences"]["path"])
+    assert str(sequences.schema.field("created_at").type) == "timestamp[us]"
+    assert sequences.column("id").to_pylist() == [str(sequence.id)]
+    beliefs = pq.read_table(result["tables"]["beliefs"]["path"])
+    assert beliefs.schema.names == ["row_id", "position", "content", "confidence", "source"]
+    assert sorted(beliefs.column("source").to_pylist(), key=str) == sorted(["test", "test", None, None], key=str)
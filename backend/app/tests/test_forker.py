@@ -0,0 +1,76 @@
+import pytest
+
+from app.core.utils.config import settings
+from app.core.schema.cognition import CognitionRow
+from app.core.engine.forker import Forker
+from .conftest import FakeForkLLM
+
+GOALS = ["alpha", "bravo", "charlie", "delta", "echo"]
+
+
+@pytest.fixture
+def fork_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_ENABLED", False)
+    monkeypatch.setattr(settings, "FORK_PACK_MAX_ROWS", 3)
+    monkeypatch.setattr(settings, "FORK_PACK_TOKEN_BUDGET", 100000)
+
+
+def _rows(goals):
+    return [CognitionRow(goal=goal, beliefs=[], operation="Act", output="done") for goal in goals]
+
+
+def _forker(llm: FakeForkLLM) -> Forker:
+    forker = Forker()
+    forker.provider = "local"
+    forker.llm = llm
+    return forker
+
+
+def test_rows_are_packed_by_row_count_and_token_budget(fork_settings, monkeypatch):
+    forker = _forker(FakeForkLLM())
+    rows = _rows(GOALS)
+    assert [len(pack) for pack in forker._pack_rows(rows, 1)] == [3, 2]
+
+    monkeypatch.setattr(settings, "FORK_PACK_TOKEN_BUDGET", forker.estimate_fork_tokens(rows[0], 1) * 2)
+    assert forker.estimate_pack_calls(rows, 1) == 3
+
+
+@pytest.mark.asyncio
+async def test_packed_forks_map_back_to_their_rows(fork_settings):
+    llm = FakeForkLLM()
+    rows = _rows(GOALS)
+    forks = await _forker(llm).create_batch_forks(rows, num_forks=1)
+
+    assert [len(goals) for goals in llm.calls] == [3, 2]
+    for row in rows:
+        assert [(fork.parent_id, fork.goal, fork.output) for fork in forks[row.id]] == [(row.id, row.goal, f"fork of {row.goal}")]
+
+
+@pytest.mark.asyncio
+async def test_rows_skipped_by_a_packed_answer_are_retried_alone(fork_settings):
+    llm = FakeForkLLM(skip=["bravo", "charlie"])
+    rows = _rows(GOALS[:3])
+    forks = await _forker(llm).create_batch_forks(rows, num_forks=1)
+
+    assert llm.calls[0] == ["alpha", "bravo", "charlie"]
+    assert sorted(llm.calls[1:]) == [["bravo"], ["charlie"]]
+    assert all(forks[row.id][0].output == f"fork of {row.goal}" for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_failed_retry_or_pack_only_loses_its_own_rows(fork_settings):
+    rows = _rows(GOALS)
+
+    # A retry that fails leaves that row without forks
+    forks = await _forker(FakeForkLLM(skip=["bravo"], fail=["bravo"])).create_batch_forks(rows[:3], num_forks=1)
+    assert forks[rows[1].id] == []
+    assert forks[rows[0].id] and forks[rows[2].id]
+
+    # A failed pack leaves the other packs' forks intact
+    forks = await _forker(FakeForkLLM(fail=["delta"])).create_batch_forks(rows, num_forks=1)
+    assert all(forks[row.id] for row in rows[:3])
+    assert forks[rows[3].id] == [] and forks[rows[4].id] == []
+
+    # Only when every pack fails does the batch fail
+    with pytest.raises(Exception, match="fork call failed"):
+        await _forker(FakeForkLLM(fail=GOALS)).create_batch_forks(rows, num_forks=1)
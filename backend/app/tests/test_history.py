@@ -0,0 +1,145 @@
+import sqlite3
+import asyncio
+
+import pytest
+
+from app.core.schema.history import EditOperation
+from app.core.engine.history import HistoryManager
+from app.services.memory.storage import SequenceStore
+from app.services.memory.row_index import RowIndex
+from app.services.memory.sequences import SequenceRepository
+from .conftest import make_row, make_sequence
+
+
+@pytest.mark.asyncio
+async def test_history_undo_redo_persists_across_restarts(repository, tmp_path):
+    sequence = make_sequence("one", "two", "three", "four")
+    await repository.save([sequence])
+    history = HistoryManager(repository, snapshot_interval=2, max_sequences=1)
+    first, second, third, fourth = sequence.rows
+
+    edited = first.model_copy(update={"goal": "one edited"})
+    await history.commit(sequence.id, [EditOperation(op="set_row", row=edited)], "edit")
+    await history.commit(sequence.id, [
+        EditOperation(op="move_row", row_id=fourth.id, index=0),
+        EditOperation(op="delete_row", row_id=second.id),
+        EditOperation(op="set_fields", fields={"title": "renamed"})
+    ])
+    version, head = await history.commit(sequence.id, [EditOperation(op="insert_row", row=make_row("five"), index=1)])
+    assert version.number == 3
+    stored = await repository.get(sequence.id)
+    assert stored.model_dump() == head.model_dump()
+    assert [row.goal for row in stored.rows] == ["four", "five", "one edited", "three"]
+    assert repository.index.get(third.id).position == 3
+
+    with pytest.raises(ValueError):
+        await history.commit(sequence.id, [EditOperation(op="delete_row", row_id=second.id)])
+    version, _ = await history.undo(sequence.id)
+    assert version.number == 2
+
+    # Dropping the history from memory and reopening the store keeps every version
+    other = make_sequence("other")
+    await repository.save([other])
+    await history.get(other.id)
+    repository.store.close()
+    reopened = SequenceRepository(SequenceStore(repository.store.path), RowIndex(str(tmp_path / "rows.idx")))
+    history = HistoryManager(reopened, snapshot_interval=2)
+    restored = await history.get(sequence.id)
+    assert [info.version for info in restored.versions()] == [0, 1, 2, 3]
+    assert restored.head.number == 2
+
+    version, head = await history.redo(sequence.id)
+    assert version.number == 3 and head.title == "renamed"
+    for _ in range(3):
+        version, head = await history.undo(sequence.id)
+    assert version.number == 0
+    stored = await reopened.get(sequence.id)
+    assert stored.model_dump(exclude={"updated_at"}) == sequence.model_dump(exclude={"updated_at"})
+    with pytest.raises(ValueError):
+        await history.undo(sequence.id)
+
+    diff = restored.diff(0, 3)
+    assert diff.fields == {"title": {"from": "sequence", "to": "renamed"}}
+    assert diff.removed == [second.id]
+    assert [row.goal for row in diff.added] == ["five"]
+    assert {change.row_id for change in diff.changed} >= {first.id, fourth.id}
+
+    conn = sqlite3.connect(repository.store.path)
+    assert conn.execute("SELECT count(*) FROM rows_fts").fetchone()[0] == 5
+    assert conn.execute("SELECT count(*) FROM rows_fts WHERE rows_fts MATCH 'edited'").fetchone()[0] == 0
+    conn.close()
+    reopened.store.close()
+
+
+@pytest.mark.asyncio
+async def test_history_starts_over_when_the_sequence_is_saved_over(repository):
+    sequence = make_sequence("one")
+    await repository.save([sequence])
+    await HistoryManager(repository).commit(sequence.id, [EditOperation(op="set_fields", fields={"title": "edited"})])
+    await repository.save([sequence])
+
+    history = await HistoryManager(repository).get(sequence.id)
+    assert len(history.versions()) == 1
+    assert history.checkout().title == "sequence"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fields", [{"title": None}, {"metadata": {"nested": [1]}}, {"description": 5}])
+async def test_invalid_field_values_are_rejected_before_any_change(repository, fields):
+    sequence = make_sequence("one")
+    await repository.save([sequence])
+    history = HistoryManager(repository)
+    await history.commit(sequence.id, [EditOperation(op="set_fields", fields={"title": "edited"})])
+
+    with pytest.raises(ValueError):
+        await history.commit(sequence.id, [
+            EditOperation(op="delete_row", row_id=sequence.rows[0].id),
+            EditOperation(op="set_fields", fields=fields)
+        ])
+    current = await history.get(sequence.id)
+    assert current.head.number == 1 and len(current.versions()) == 2
+    assert (await repository.get(sequence.id)).title == "edited"
+
+    # Undo and redo still work on the untouched history
+    version, head = await history.undo(sequence.id)
+    assert version.number == 0 and head.title == "sequence"
+    assert (await history.redo(sequence.id))[1].title == "edited"
+
+
+@pytest.mark.asyncio
+async def test_failed_write_drops_the_unstored_head(repository, monkeypatch):
+    sequence = make_sequence("one")
+    await repository.save([sequence])
+    history = HistoryManager(repository)
+
+    async def fail(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(repository, "save_edit", fail)
+    with pytest.raises(RuntimeError):
+        await history.commit(sequence.id, [EditOperation(op="set_fields", fields={"title": "lost"})])
+    monkeypatch.undo()
+
+    reloaded = await history.get(sequence.id)
+    assert reloaded.checkout().title == "sequence"
+    assert len(reloaded.versions()) == 1
+
+
+@pytest.mark.asyncio
+async def test_evicting_a_history_keeps_its_lock_while_in_use(repository):
+    sequences = [make_sequence("one"), make_sequence("two")]
+    await repository.save(sequences)
+    history = HistoryManager(repository, max_sequences=1)
+    first, second = (sequence.id for sequence in sequences)
+
+    lock = history._lock(first)
+    async with lock:
+        await history.get(first)
+        # Loading another history evicts the first while its lock is held
+        await history.get(second)
+        assert history._lock(first) is lock
+        waiter = asyncio.create_task(history.commit(first, [EditOperation(op="set_fields", fields={"title": "queued"})]))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+    version, head = await waiter
+    assert (version.number, head.title) == (1, "queued")
@@ -0,0 +1,45 @@
+import json
+
+from app.services.memory.importer import BulkImporter
+from .conftest import make_sequence
+
+
+def _write_import_files(directory):
+    directory.mkdir()
+    good = make_sequence("good")
+    (directory / "good.json").write_text(good.model_dump_json())
+    lines = [
+        json.dumps({"title": "from jsonl", "rows": [{"goal": "g", "beliefs": [], "operation": "Plan"}]}),
+        "",
+        '{"title": "broken", "rows": [{"goal": "g", "beliefs": [], "operation": "Dance"}]}',
+        "not json at all",
+        json.dumps({"title": "from jsonl too", "rows": []}),
+    ]
+    (directory / "dump.jsonl").write_text("\n".join(lines) + "\n")
+    (directory / "bad.json").write_text("[{\"title\": 1}, {\"title\": \"ok\"}]")
+    return good
+
+
+def test_import_reports_per_file_errors_and_resumes(repository, tmp_path):
+    good = _write_import_files(tmp_path / "data")
+    importer = BulkImporter(repository, workers=1, batch_size=2, chunk_bytes=64)
+
+    report = importer.run([str(tmp_path / "data")])
+    files = {file.path.rsplit("/", 1)[-1]: file for file in report.files}
+    assert files["good.json"].error_count == 0 and files["good.json"].sequences == 1
+    assert files["dump.jsonl"].sequences == 2
+    assert [error.split(":")[0] for error in files["dump.jsonl"].errors] == ["line 3", "line 4"]
+    assert [error.split(":")[0] for error in files["bad.json"].errors] == ["item 1"]
+    assert files["bad.json"].sequences == 1
+    assert report.errors == 3
+
+    connection = repository.store._connection()
+    assert connection.execute("SELECT count(*) FROM sequences").fetchone()[0] == 4
+    assert connection.execute("SELECT count(*) FROM imports").fetchone()[0] == 1
+
+    # Files imported without errors are skipped; files with errors are attempted again
+    report = importer.run([str(tmp_path / "data")])
+    statuses = {file.path.rsplit("/", 1)[-1]: file.status for file in report.files}
+    assert statuses == {"bad.json": "imported", "dump.jsonl": "imported", "good.json": "skipped"}
+    assert connection.execute("SELECT count(*) FROM sequences").fetchone()[0] == 4
+    assert repository.index.get(good.rows[0].id).sequence_id == good.id
@@ -0,0 +1,119 @@
+import json
+import asyncio
+
+import pytest
+
+from app.core.schema.cognition import CognitionSequence
+from app.core.schema.jobs import JobRequest
+from app.core.engine.jobs import JobManager
+
+
+def _manager(tmp_path, generate, concurrency: int = 2, max_attempts: int = 2) -> JobManager:
+    manager = JobManager(str(tmp_path / "jobs.db"), str(tmp_path / "output"), concurrency, max_attempts)
+    manager._generate = generate
+    return manager
+
+
+async def _wait_for(manager: JobManager, job_id: str, predicate):
+    for _ in range(500):
+        job = await manager.get(job_id)
+        if predicate(job):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job never reached the expected state: {job}")
+
+
+def _output_items(path: str):
+    with open(path) as f:
+        return sorted(json.loads(line)["item"] for line in f)
+
+
+@pytest.mark.asyncio
+async def test_job_resumes_unfinished_items_after_restart(tmp_path):
+    stuck = asyncio.Event()
+
+    async def first_run(context, params):
+        if context == "b":
+            stuck.set()
+            await asyncio.sleep(10)
+        return [CognitionSequence(title=context)]
+
+    manager = _manager(tmp_path, first_run)
+    job = await manager.submit(JobRequest(contexts=["a", "b", "c"]))
+    await _wait_for(manager, job.id, lambda job: job.completed == 2)
+    await stuck.wait()
+    await manager.stop()
+
+    job = await manager.get(job.id)
+    assert (job.status, job.completed, job.pending) == ("running", 2, 1)
+
+    generated = []
+
+    async def second_run(context, params):
+        generated.append(context)
+        return [CognitionSequence(title=context)]
+
+    restarted = _manager(tmp_path, second_run)
+    await restarted.start()
+    job = await _wait_for(restarted, job.id, lambda job: job.status == "completed")
+    await restarted.stop()
+
+    # Only the interrupted item runs again
+    assert generated == ["b"]
+    assert (job.completed, job.sequences_written) == (3, 3)
+    assert _output_items(job.output_path) == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_in_flight_and_pending_items(tmp_path):
+    started = asyncio.Event()
+    cancelled = []
+
+    async def generate(context, params):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(context)
+            raise
+        return []
+
+    manager = _manager(tmp_path, generate, concurrency=1)
+    job = await manager.submit(JobRequest(contexts=["a", "b", "c"]))
+    await started.wait()
+
+    job = await manager.cancel(job.id)
+    await asyncio.sleep(0.05)
+    assert job.status == "cancelled"
+    assert cancelled == ["a"]
+
+    # Nothing else is claimed, and a restart does not pick the job up again
+    await manager.stop()
+    restarted = _manager(tmp_path, generate, concurrency=1)
+    await restarted.start()
+    await asyncio.sleep(0.05)
+    job = await restarted.get(job.id)
+    await restarted.stop()
+    assert (job.status, job.completed, job.pending) == ("cancelled", 0, 3)
+    assert cancelled == ["a"]
+    assert await restarted.cancel("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_items_are_retried_up_to_max_attempts(tmp_path):
+    attempts = {}
+
+    async def generate(context, params):
+        attempts[context] = attempts.get(context, 0) + 1
+        if context == "bad" or attempts[context] == 1:
+            raise RuntimeError(f"{context} failed")
+        return [CognitionSequence(title=context)]
+
+    manager = _manager(tmp_path, generate, max_attempts=3)
+    job = await manager.submit(JobRequest(contexts=["good", "bad"]))
+    job = await _wait_for(manager, job.id, lambda job: job.pending == 0)
+    await manager.stop()
+
+    assert attempts == {"good": 2, "bad": 3}
+    assert (job.status, job.completed, job.failed) == ("completed", 1, 1)
+    assert _output_items(job.output_path) == [0]
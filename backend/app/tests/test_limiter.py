@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.llm.client import LLMError
+from app.services.llm.limiter import AdaptiveLimiter, parse_retry_after
+from .conftest import completion, stream
+
+
+def _limiter(initial: int = 2, maximum: int = 8) -> AdaptiveLimiter:
+    return AdaptiveLimiter(requests_per_minute=0, tokens_per_minute=0, initial_concurrency=initial, max_concurrency=maximum)
+
+
+@pytest.mark.asyncio
+async def test_limiter_grows_additively_up_to_the_maximum():
+    limiter = _limiter(initial=2, maximum=3)
+    await limiter.on_success(None, 0)
+    assert limiter.limit == pytest.approx(2.5)
+    assert limiter.concurrency == 2
+    await limiter.on_success(None, 0)
+    assert limiter.concurrency == 2
+    await limiter.on_success(None, 0)
+    assert limiter.concurrency == 3
+    for _ in range(10):
+        await limiter.on_success(None, 0)
+    assert limiter.limit == 3.0
+
+
+def test_limiter_decreases_once_per_throttle_window():
+    limiter = _limiter(initial=8)
+    limiter.on_throttle(0.0)
+    assert limiter.concurrency == 4
+    # A burst of 429s within the cool-down window only halves once
+    limiter.on_throttle(0.0)
+    limiter.on_throttle(0.0)
+    assert limiter.concurrency == 4
+    assert limiter.throttled == 3
+
+    limiter._last_decrease -= 1.0
+    limiter.on_throttle(0.0)
+    assert limiter.concurrency == 2
+    for _ in range(5):
+        limiter._last_decrease -= 1.0
+        limiter.on_throttle(0.0)
+    assert limiter.concurrency == limiter.min_concurrency
+
+
+@pytest.mark.asyncio
+async def test_limiter_wakes_waiters_when_concurrency_grows():
+    limiter = _limiter(initial=1, maximum=4)
+    await limiter.acquire(0)
+    waiter = asyncio.create_task(limiter.acquire(0))
+    await asyncio.sleep(0.01)
+    assert not waiter.done() and limiter.saturated
+
+    # Growing to two slots admits the waiter without any slot being released
+    await limiter.on_success(None, 0)
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.stats()["in_flight"] == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_reconciles_token_estimates():
+    limiter = AdaptiveLimiter(requests_per_minute=0, tokens_per_minute=600, initial_concurrency=1, max_concurrency=1)
+    async with limiter.slot(500):
+        pass
+    assert limiter.token_bucket.available == pytest.approx(100, abs=1)
+    await limiter.on_success(100, 500)
+    assert limiter.token_bucket.available == pytest.approx(500, abs=1)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after-ms": "1500"}) == 1.5
+    assert parse_retry_after({"retry-after": "3"}) == 3.0
+    assert parse_retry_after({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0.0
+    assert parse_retry_after({"retry-after": "soon"}) is None
+    assert parse_retry_after({}) is None
+
+
+
+
+@pytest.mark.parametrize("status", [429, 503])
+@pytest.mark.asyncio
+async def test_throttling_statuses_feed_the_limiter(llm, status):
+    responses = [httpx.Response(status, headers={"Retry-After": "0"}), completion("ok")]
+    client = llm(lambda request, url: responses.pop(0), concurrency=8)
+
+    assert await client.chat_completion("system", "user", cache=False) == "ok"
+    assert client.limiter.throttled == 1
+    assert client.limiter.concurrency == 4
+    # A 503 is also a server error against the endpoint, cleared by the success that followed
+    assert client.registry.primary.endpoints[0].failures == 0
+
+
+@pytest.mark.asyncio
+async def test_503_retry_after_pauses_the_limiter(llm):
+    responses = [httpx.Response(503, headers={"Retry-After": "30"})]
+    client = llm(lambda request, url: responses.pop(0) if responses else completion("ok"), concurrency=8)
+    client.limiter.on_throttle = lambda retry_after: setattr(client.limiter, "seen", retry_after)
+
+    await client.chat_completion("system", "user", cache=False)
+    assert client.limiter.seen == 30.0
+
+
+@pytest.mark.asyncio
+async def test_streamed_503_feeds_the_limiter(llm):
+    responses = [httpx.Response(503, headers={"Retry-After": "0"}), stream("a", "b")]
+    client = llm(lambda request, url: responses.pop(0), concurrency=8)
+
+    assert [delta async for delta in client.stream_chat_completion("system", "user", cache=False)] == ["a", "b"]
+    assert client.limiter.throttled == 1
+    assert client.limiter.concurrency == 4
+
+
+@pytest.mark.asyncio
+async def test_other_server_errors_only_count_against_the_endpoint(llm):
+    client = llm(lambda request, url: httpx.Response(500), concurrency=8)
+
+    with pytest.raises(LLMError):
+        await client.chat_completion("system", "user", cache=False)
+    assert client.limiter.throttled == 0
+    assert client.registry.primary.endpoints[0].failures == 4
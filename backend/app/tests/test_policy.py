@@ -0,0 +1,112 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.utils.config import settings
+from app.services.llm import client as client_module
+from app.services.llm.client import DeadlineExceededError
+from app.services.llm.policy import deadline_scope, remaining_time
+from .conftest import completion
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE", True)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_SAMPLES", 1)
+    monkeypatch.setattr(settings, "LLM_HEDGE_MIN_DELAY", 0.02)
+
+
+def test_nested_deadline_scopes_only_tighten():
+    assert remaining_time() is None
+    with deadline_scope(10):
+        with deadline_scope(60):
+            assert remaining_time() <= 10
+        with deadline_scope(1):
+            assert remaining_time() <= 1
+        assert 1 < remaining_time() <= 10
+        with deadline_scope(0):
+            assert 1 < remaining_time() <= 10
+    assert remaining_time() is None
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_over_a_slow_first_attempt(llm, hedging):
+    calls = []
+    cancelled = asyncio.Event()
+
+    async def handler(request, url):
+        calls.append(url)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        return completion("hedged")
+
+    client = llm(handler)
+    client.latency.record(0.01)
+    started = time.monotonic()
+    assert await client.chat_completion("system", "user", cache=False) == "hedged"
+    assert time.monotonic() - started < 1
+    assert (client.hedged, client.hedge_wins) == (1, 1)
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_spare_concurrency(llm, hedging):
+    calls = []
+
+    async def handler(request, url):
+        calls.append(url)
+        await asyncio.sleep(0.1)
+        return completion("slow")
+
+    client = llm(handler, concurrency=1)
+    client.latency.record(0.01)
+    assert await client.chat_completion("system", "user", cache=False) == "slow"
+    assert len(calls) == 1
+    assert client.hedged == 0
+
+
+@pytest.mark.asyncio
+async def test_deadline_cuts_a_slow_call_short(llm):
+    async def handler(request, url):
+        await asyncio.sleep(10)
+        return completion("late")
+
+    client = llm(handler)
+    started = time.monotonic()
+    with deadline_scope(0.05):
+        with pytest.raises(DeadlineExceededError):
+            await client.chat_completion("system", "user", cache=False)
+    assert time.monotonic() - started < 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_skips_retries_it_cannot_wait_for(llm, monkeypatch):
+    calls = []
+
+    def handler(request, url):
+        calls.append(url)
+        return httpx.Response(502)
+
+    monkeypatch.setattr(client_module, "backoff_delay", lambda attempt: 5.0)
+    client = llm(handler)
+    with deadline_scope(1):
+        with pytest.raises(DeadlineExceededError, match="Not enough time left"):
+            await client.chat_completion("system", "user", cache=False)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline_fails_before_sending(llm):
+    calls = []
+    client = llm(lambda request, url: calls.append(url) or completion("ok"))
+    with deadline_scope(0.01):
+        await asyncio.sleep(0.02)
+        with pytest.raises(DeadlineExceededError, match="before the LLM call started"):
+            await client.chat_completion("system", "user", cache=False)
+    assert calls == []
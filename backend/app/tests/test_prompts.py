@@ -0,0 +1,35 @@
+from app.core.prompts import manager as manager_module
+from app.core.prompts.manager import PromptManager
+from app.core.prompts.templates import GENERATION_SYSTEM_PROMPT
+
+
+def test_equal_schemas_render_identical_prompts():
+    prompts = PromptManager()
+    first = prompts.generation_system_prompt({"rows": 3, "tone": {"a": 1, "b": 2}})
+    second = prompts.generation_system_prompt({"tone": {"b": 2, "a": 1}, "rows": 3})
+    assert first == second
+    assert first.startswith(GENERATION_SYSTEM_PROMPT) and '"rows": 3' in first
+    assert prompts.generation_system_prompt({}) is GENERATION_SYSTEM_PROMPT
+
+
+def test_reused_schema_object_skips_hashing(monkeypatch):
+    prompts = PromptManager(max_schema_entries=2)
+    hashed = []
+    sha256 = manager_module.hashlib.sha256
+    monkeypatch.setattr(manager_module.hashlib, "sha256", lambda data: hashed.append(data) or sha256(data))
+
+    schema = {"rows": 3}
+    prompt = prompts.generation_system_prompt(schema)
+    assert all(prompts.generation_system_prompt(schema) is prompt for _ in range(5))
+    assert len(hashed) == 1
+
+    # An equal but distinct object is hashed once, then served by identity too
+    copy = dict(schema)
+    assert prompts.generation_system_prompt(copy) is prompt
+    assert prompts.generation_system_prompt(copy) is prompt
+    assert len(hashed) == 2
+
+    # The identity map is bounded like the prompt cache
+    for rows in range(4, 8):
+        prompts.generation_system_prompt({"rows": rows})
+    assert len(prompts._by_identity) == 2 and len(prompts._schema_prompts) == 2
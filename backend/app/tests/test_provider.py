@@ -0,0 +1,89 @@
+import json
+
+import httpx
+import pytest
+
+from app.core.utils.config import settings
+from app.services.llm.provider import Endpoint, ProviderPool, ProviderRegistry
+from .conftest import completion
+
+
+@pytest.fixture(autouse=True)
+def eject_after(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_EJECT_AFTER_FAILURES", 3)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 5)
+
+
+@pytest.mark.asyncio
+async def test_failing_endpoint_is_ejected_and_skipped(llm):
+    calls = []
+
+    def handler(request, url):
+        calls.append(url)
+        return httpx.Response(500) if url == "http://bad" else completion("ok")
+
+    client = llm(handler, urls=("http://bad", "http://good"))
+    bad, good = client.registry.primary.endpoints
+    # Make the failing endpoint look fastest so routing keeps trying it until it is ejected
+    bad.latency_ewma, good.latency_ewma = 0.001, 10.0
+    for _ in range(3):
+        assert await client.chat_completion("system", "user", cache=False) == "ok"
+
+    assert calls.count("http://bad") == 3
+    assert not bad.healthy and bad.ejected_at is not None
+    assert calls[-2:] == ["http://good", "http://good"]
+    assert good.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_calls_fail_over_to_the_fallback_provider(llm):
+    models = []
+
+    def handler(request, url):
+        if url == "http://primary":
+            return httpx.Response(502)
+        models.append(json.loads(request.content)["model"])
+        return completion("from fallback")
+
+    client = llm(handler, fallback_urls=("http://fallback",))
+    assert await client.chat_completion("system", "user", cache=False) == "from fallback"
+    assert not client.registry.primary.endpoints[0].healthy
+    assert client.registry.failovers == 1
+    # The payload is re-addressed to the fallback provider's model
+    assert models == ["fallback-model"]
+
+    # Once readmitted, the primary serves again
+    client.registry.primary.endpoints[0].readmit()
+    assert client.registry.acquire().base_url == "http://primary"
+
+
+def test_registry_uses_least_failed_primary_when_everything_is_ejected():
+    first, second = Endpoint("local", "http://a", "m"), Endpoint("local", "http://b", "m")
+    fallback = Endpoint("local", "http://c", "m")
+    registry = ProviderRegistry(ProviderPool("local", [first, second]), ProviderPool("local", [fallback]))
+    for endpoint, failures in ((first, 5), (second, 3), (fallback, 3)):
+        for _ in range(failures):
+            endpoint.record_failure()
+
+    assert registry.acquire() is second
+    assert registry.failovers == 0
+
+
+@pytest.mark.asyncio
+async def test_health_check_readmits_and_ejects():
+    healthy, broken = Endpoint("local", "http://healthy", "m"), Endpoint("local", "http://broken", "m")
+    registry = ProviderRegistry(ProviderPool("local", [healthy, broken]))
+    for _ in range(3):
+        healthy.record_failure()
+    assert not healthy.healthy
+
+    def handler(request):
+        return httpx.Response(200 if request.url.host == "healthy" else 503)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        for _ in range(3):
+            await registry._check(client, healthy)
+            await registry._check(client, broken)
+
+    assert healthy.healthy and healthy.failures == 0
+    assert not broken.healthy and broken.failures == 3
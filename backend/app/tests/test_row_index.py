@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from app.services.memory.row_index import RowIndex
+from .conftest import make_sequence
+
+
+def test_row_index_survives_reload_and_torn_records(tmp_path):
+    path = str(tmp_path / "rows.idx")
+    sequence = make_sequence("a", "b")
+    sequence.rows[1].parent_id = sequence.rows[0].id
+    index = RowIndex(path)
+    index.add_sequence(sequence)
+    with open(path, "ab") as f:
+        f.write(b"torn")
+
+    reloaded = RowIndex(path)
+    location = reloaded.get(sequence.rows[1].id)
+    assert (location.sequence_id, location.position, location.parent_id) == (sequence.id, 1, sequence.rows[0].id)
+    assert len(reloaded) == 2
+
+
+@pytest.mark.asyncio
+async def test_removed_rows_leave_the_index(repository, tmp_path):
+    sequence = make_sequence("a", "b", "c", "d")
+    await repository.save([sequence])
+    a, b, c, d = sequence.rows
+
+    # Re-saving with fewer rows drops the missing ones
+    sequence.rows = [a, b, c]
+    await repository.save([sequence])
+    assert repository.index.get(d.id) is None
+
+    # So does an edit that deletes a row
+    sequence.rows = [a, c]
+    await repository.save_edit(sequence, [], [1], [b.id])
+    assert repository.index.get(b.id) is None
+    assert await repository.get_row(b.id) is None
+    assert repository.index.get(c.id).position == 1
+
+    reloaded = RowIndex(repository.index.path)
+    assert [reloaded.get(row.id) is not None for row in (a, b, c, d)] == [True, False, True, False]
+    assert len(reloaded) == 2
+
+
+def test_compaction_drops_tombstones(tmp_path):
+    path = str(tmp_path / "rows.idx")
+    sequences = [make_sequence("a", "b") for _ in range(600)]
+    index = RowIndex(path)
+    for sequence in sequences:
+        index.add_sequence(sequence)
+    index.remove_rows(sequence.rows[1].id.bytes for sequence in sequences[1:])
+    index.remove_rows(sequence.rows[0].id.bytes for sequence in sequences[1:])
+
+    # 1200 row records and 1198 tombstones compact down to the 2 live rows
+    record_size = os.path.getsize(path) // 2398
+    reloaded = RowIndex(path)
+    reloaded.load()
+    assert len(reloaded) == 2
+    assert os.path.getsize(path) == 2 * record_size
+    assert reloaded.get(sequences[0].rows[1].id).position == 1
+    assert reloaded.get(sequences[1].rows[0].id) is None
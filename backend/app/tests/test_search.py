@@ -0,0 +1,54 @@
+import pytest
+
+from .conftest import make_sequence
+
+
+@pytest.mark.asyncio
+async def test_search_pages_and_filters(store):
+    sequences = [make_sequence(*(f"deploy service {i}-{j}" for j in range(5))) for i in range(5)]
+    sequences[0].rows[0].operation = "Plan"
+    await store.save_many(sequences)
+
+    seen = []
+    cursor = None
+    while True:
+        page = await store.search("deploy", limit=7, cursor=cursor)
+        seen.extend(hit.row.id for hit in page.hits)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 25
+
+    plans = await store.search("deploy", operations=["Plan"])
+    assert [hit.row.id for hit in plans.hits] == [sequences[0].rows[0].id]
+    assert "[deploy]" in plans.hits[0].snippet
+    scoped = await store.search("depl*", sequence_id=sequences[1].id)
+    assert {hit.sequence_id for hit in scoped.hits} == {sequences[1].id}
+    assert (await store.search('deploy" OR "x')).hits == []
+
+    # Replaced rows leave no stale full-text entries
+    sequences[0].rows[0].goal = "rollback"
+    await store.save_many([sequences[0]])
+    assert [hit.row.id for hit in (await store.search("rollback")).hits] == [sequences[0].rows[0].id]
+    assert len((await store.search("deploy", limit=100)).hits) == 25
+
+
+@pytest.mark.asyncio
+async def test_search_rejects_bad_cursors(store):
+    with pytest.raises(ValueError):
+        await store.search("anything", cursor="not a cursor")
+
+
+@pytest.mark.asyncio
+async def test_search_pages_by_rank_and_row_num(store):
+    # Identical rows tie on rank, so the row_num half of the cursor orders them
+    sequence = make_sequence(*(["deploy"] * 6))
+    await store.save_many([sequence])
+    everything = [hit.row.id for hit in (await store.search("deploy", limit=100)).hits]
+
+    first = await store.search("deploy", limit=4)
+    assert first.next_cursor is not None
+    second = await store.search("deploy", limit=4, cursor=first.next_cursor)
+    assert [hit.row.id for hit in first.hits + second.hits] == everything
+    assert second.next_cursor is None
+
@@ -0,0 +1,105 @@
+import os
+import threading
+
+import pytest
+
+from app.services.memory.segments import SegmentLog
+from .conftest import make_sequence
+
+
+def test_tail_records_missing_from_the_index_are_recovered(tmp_path):
+    directory = str(tmp_path / "segments")
+    log = SegmentLog(directory, segment_max_bytes=2048)
+    first, second, third = (make_sequence(goal) for goal in ("first", "second", "third"))
+    log.append([first])
+    indexed = os.path.getsize(log.index_path)
+    log.append([second, third])
+    log.close()
+
+    # A crash after writing the records but before their index entries, with a torn record behind them
+    with open(log.index_path, "r+b") as f:
+        f.truncate(indexed)
+    segments = sorted(os.listdir(directory))
+    with open(os.path.join(directory, segments[-1]), "ab") as f:
+        f.write(b"torn")
+
+    recovered = SegmentLog(directory, segment_max_bytes=2048)
+    assert [recovered.get(sequence.id).rows[0].goal for sequence in (first, second, third)] == ["first", "second", "third"]
+    assert len(recovered) == 3
+    # The log keeps appending after the recovered tail
+    fourth = make_sequence("fourth")
+    recovered.append([fourth])
+    assert recovered.get(fourth.id) == fourth
+    recovered.close()
+
+    reopened = SegmentLog(directory, segment_max_bytes=2048)
+    assert [sequence.rows[0].goal for sequence in reopened.iter_sequences()] == ["first", "second", "third", "fourth"]
+    reopened.close()
+
+
+def test_torn_index_entry_and_torn_record_are_truncated(tmp_path):
+    directory = str(tmp_path / "segments")
+    log = SegmentLog(directory)
+    sequence = make_sequence("only")
+    log.append([sequence])
+    log.close()
+    segment = os.path.join(directory, sorted(os.listdir(directory))[0])
+    segment_size, index_size = os.path.getsize(segment), os.path.getsize(log.index_path)
+    with open(segment, "ab") as f:
+        f.write(b"\x00" * 40)
+    with open(log.index_path, "ab") as f:
+        f.write(b"\x01\x02")
+
+    recovered = SegmentLog(directory)
+    assert recovered.get(sequence.id) == sequence
+    assert (os.path.getsize(segment), os.path.getsize(recovered.index_path)) == (segment_size, index_size)
+    recovered.close()
+
+
+def test_superseded_versions_are_skipped_on_replay(tmp_path):
+    log = SegmentLog(str(tmp_path / "segments"), segment_max_bytes=1024)
+    sequence = make_sequence("a", "b")
+    log.append([sequence])
+    sequence.title = "renamed"
+    log.append([sequence, make_sequence("c")])
+
+    assert log.get(sequence.id).title == "renamed"
+    assert [archived.title for archived in log.iter_sequences()] == ["renamed", "sequence"]
+    assert len(list(log.iter_sequences(latest_only=False))) == 3
+    log.close()
+
+
+def test_reads_run_alongside_appends_that_grow_the_segment(tmp_path):
+    log = SegmentLog(str(tmp_path / "segments"))
+    sequences = [make_sequence(f"goal {i}") for i in range(200)]
+    log.append(sequences[:1])
+    errors = []
+
+    def read():
+        try:
+            for _ in range(200):
+                assert log.get(sequences[0].id) == sequences[0]
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for sequence in sequences[1:]:
+        log.append([sequence])
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
+    assert log.get(sequences[-1].id) == sequences[-1]
+    log.close()
+
+
+def test_compressed_records_round_trip(tmp_path):
+    pytest.importorskip("zstandard")
+    log = SegmentLog(str(tmp_path / "segments"), compression="zstd")
+    sequence = make_sequence("compressed")
+    log.append([sequence])
+    assert log.get(sequence.id) == sequence
+    assert list(log.iter_sequences()) == [sequence]
+    log.close()
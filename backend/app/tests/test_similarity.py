@@ -0,0 +1,32 @@
+import pytest
+
+from app.core.schema.cognition import CognitionSequence, CognitionRow
+from app.services.memory.similarity import SimilarityIndex
+
+
+def test_similarity_finds_related_rows_and_supersedes_old_vectors(tmp_path):
+    pytest.importorskip("numpy")
+    index = SimilarityIndex(str(tmp_path / "similarity"), dim=256, chunk_rows=2)
+    sequence = CognitionSequence(title="s", rows=[
+        CognitionRow(goal="book a flight to Paris", beliefs=[], operation="Act", output="flight booked"),
+        CognitionRow(goal="reserve a hotel room in Paris", beliefs=[], operation="Act", output="hotel reserved"),
+        CognitionRow(goal="water the garden plants", beliefs=[], operation="Act", output="plants watered"),
+    ])
+    index.add_sequences([sequence])
+    flight = sequence.rows[0]
+
+    [hits] = index.query(index.encode(["book a cheap flight to Paris"]), k=2)
+    assert hits[0][:2] == (flight.id, sequence.id)
+    assert hits[0][2] > hits[1][2]
+    [hits] = index.query(index.vector(flight.id)[None, :], k=1, exclude=[flight.id])
+    assert hits[0][0] != flight.id
+
+    # Re-indexing a row replaces its vector, and the state survives a reload
+    flight.goal = "water the garden"
+    index.add_sequences([sequence])
+    assert len(index) == 3
+    reloaded = SimilarityIndex(index.directory, dim=256)
+    [hits] = reloaded.query(reloaded.encode(["water the garden"]), k=3)
+    assert [hit[0] for hit in hits][:2] in ([flight.id, sequence.rows[2].id], [sequence.rows[2].id, flight.id])
+    assert len(hits) == 3
+    assert reloaded.missing([row.id.bytes for row in sequence.rows] + [b"x" * 16]) == [b"x" * 16]
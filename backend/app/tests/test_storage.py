@@ -0,0 +1,22 @@
+import pytest
+
+from .conftest import make_sequence
+
+
+@pytest.mark.asyncio
+async def test_store_round_trips_sequences(store):
+    sequence = make_sequence("alpha", "beta", "gamma")
+    sequence.rows[1].parent_id = sequence.rows[0].id
+    await store.save_many([sequence])
+
+    loaded = await store.get_sequence(sequence.id)
+    assert loaded.model_dump() == sequence.model_dump()
+    assert await store.get_row(sequence.rows[2].id) == sequence.rows[2]
+    assert await store.get_children(sequence.rows[0].id) == [sequence.rows[1]]
+
+    # Saving again replaces the rows wholesale
+    sequence.rows = sequence.rows[:1]
+    await store.save_many([sequence])
+    assert len((await store.get_sequence(sequence.id)).rows) == 1
+    assert await store.get_row(sequence.rows[0].id) is not None
+    assert (await store.stats())["rows"] == 1
@@ -0,0 +1,57 @@
+import re
+import json
+
+import pytest
+
+from app.core.engine.decoding import decode_row
+from app.core.engine.stream_parser import IncrementalSequenceParser, StreamParseError
+
+_STREAMED = json.dumps({
+    "title": "Streamed",
+    "rows": [
+        {"goal": "first", "beliefs": [{"content": "x" * 1000, "confidence": 0.4}], "operation": "Plan", "output": "a"},
+        {"goal": "second {with] brackets", "beliefs": [], "operation": "Act", "output": "b \"quoted\""},
+    ],
+    "metadata": {"rows": 2}
+})
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, len(_STREAMED)])
+def test_stream_parser_emits_rows_as_they_close(chunk_size):
+    parser = IncrementalSequenceParser(decode_row)
+    emitted = []
+    for start in range(0, len(_STREAMED), chunk_size):
+        emitted.extend(row.goal for row in parser.feed(_STREAMED[start:start + chunk_size]))
+    assert emitted == ["first", "second {with] brackets"]
+    sequence = parser.finish()
+    assert sequence.title == "Streamed"
+    assert sequence.rows == parser.rows
+    assert sequence.rows[1].output == 'b "quoted"'
+
+
+@pytest.mark.parametrize("text, message", [
+    ('["not", "an", "object"]', "Expected a JSON object, got '[' at offset 0"),
+    ('{"rows": [}', "Mismatched '}' at offset 10"),
+    ('{"title": "t"} trailing', "Unexpected content after the sequence object at offset 15"),
+    ('{"rows": [{"beliefs": 5}]}', "Row 0 is not a valid cognition row"),
+    ('{"rows": [{"unrelated": 1}]}', "Row 0 is not a valid cognition row"),
+])
+def test_stream_parser_rejects_malformed_streams(text, message):
+    parser = IncrementalSequenceParser(decode_row)
+    with pytest.raises(StreamParseError, match=re.escape(message)):
+        for char in text:
+            parser.feed(char)
+
+
+def test_stream_parser_reports_absolute_offsets_after_trimming():
+    parser = IncrementalSequenceParser(decode_row)
+    parser.feed('{"title": "' + "t" * 5000 + '", ')
+    with pytest.raises(StreamParseError, match="offset 5014"):
+        parser.feed("]")
+
+
+def test_stream_parser_requires_a_closed_object():
+    parser = IncrementalSequenceParser(decode_row)
+    parser.feed('{"title": "t", "rows": [')
+    with pytest.raises(StreamParseError, match="ended before"):
+        parser.finish()
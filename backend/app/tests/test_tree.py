@@ -0,0 +1,77 @@
+import pytest
+
+from app.core.utils.config import settings
+from app.core.schema.cognition import CognitionRow, Belief
+from app.core.engine.forker import Forker, CallBudget
+from app.core.engine.tree import ForkTreeExpander
+from .conftest import FakeForkLLM
+
+
+@pytest.fixture
+def fork_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_ENABLED", False)
+    monkeypatch.setattr(settings, "FORK_PACK_MAX_ROWS", 3)
+    monkeypatch.setattr(settings, "FORK_PACK_TOKEN_BUDGET", 100000)
+
+
+def _forker(llm: FakeForkLLM) -> Forker:
+    forker = Forker()
+    forker.provider = "local"
+    forker.llm = llm
+    return forker
+
+
+def _root() -> CognitionRow:
+    return CognitionRow(goal="root", beliefs=[Belief(content="b", confidence=0.5)], operation="Act", output="done")
+
+
+async def _expand(expander: ForkTreeExpander, **kwargs):
+    return [event async for event in expander.expand(_root(), **kwargs)]
+
+
+@pytest.mark.asyncio
+async def test_expansion_stops_when_the_call_budget_runs_out(fork_settings):
+    llm = FakeForkLLM()
+    events = await _expand(ForkTreeExpander(_forker(llm)), max_depth=5, branching=1, max_calls=3)
+
+    levels = [event for event in events if event["type"] == "level"]
+    assert [level["calls_used"] for level in levels] == [1, 2, 3]
+    assert events[-1] == {"type": "budget_exhausted", "depth": 4, "calls_used": 3, "tokens_used": levels[-1]["tokens_used"]}
+    assert len(llm.calls) == 3
+    assert sum(event["type"] == "node" for event in events) == 4
+
+
+@pytest.mark.asyncio
+async def test_level_expands_only_the_rows_that_fit(fork_settings, monkeypatch):
+    monkeypatch.setattr(settings, "FORK_PACK_MAX_ROWS", 1)
+    llm = FakeForkLLM()
+    # One call for the root's two children, then one of the two children fits
+    events = await _expand(ForkTreeExpander(_forker(llm)), max_depth=2, branching=2, beam_width=4, max_calls=2)
+
+    levels = [event for event in events if event["type"] == "level"]
+    assert [(level["expanded"], level["calls_used"]) for level in levels] == [(1, 1), (1, 2)]
+    assert len(llm.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_token_budget_limits_the_expansion(fork_settings):
+    llm = FakeForkLLM()
+    forker = _forker(llm)
+    max_tokens = forker.estimate_fork_tokens(_root(), 1)
+    events = await _expand(ForkTreeExpander(forker), max_depth=3, branching=1, max_calls=10, max_tokens=max_tokens)
+
+    assert [event["type"] for event in events] == ["node", "node", "level", "budget_exhausted"]
+    assert events[-1]["tokens_used"] == max_tokens
+
+
+@pytest.mark.asyncio
+async def test_retries_are_charged_to_the_budget(fork_settings):
+    llm = FakeForkLLM(skip=["bravo", "charlie"])
+    rows = [CognitionRow(goal=goal, beliefs=[], operation="Act", output="done") for goal in ("alpha", "bravo", "charlie")]
+    budget = CallBudget(max_calls=2)
+    results = [result async for _, result in _forker(llm).iter_batch_forks(rows, 1, budget=budget)]
+
+    # The packed call and one retry fit; the other skipped row is left without forks
+    assert budget.calls_used == 2
+    assert len(llm.calls) == 2
+    assert sorted(len(forks) for forks in results[0].values()) == [0, 1, 1]
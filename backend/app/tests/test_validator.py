@@ -0,0 +1,108 @@
+import json
+import random
+from pathlib import Path
+
+import jsonschema
+import pytest
+
+from app.core.engine.validator import Validator
+
+DATA_DIR = Path(__file__).resolve().parents[3] / "data"
+
+# Values that are equal as Python objects but not all equal as JSON
+_SCALARS = [0, 1, 1.0, 2.5, -1, 7, True, False, None, "a", "abcd", "b"]
+
+
+def _random_schema(rng: random.Random, depth: int = 0) -> dict:
+    kind = rng.random()
+    if depth < 3 and kind < 0.3:
+        properties = {name: _random_schema(rng, depth + 1) for name in rng.sample("abcd", rng.randint(0, 3))}
+        schema = {"type": "object", "properties": properties}
+        if properties and rng.random() < 0.5:
+            schema["required"] = rng.sample(sorted(properties), 1)
+        if rng.random() < 0.3:
+            schema["additionalProperties"] = rng.choice([False, {"type": "integer"}])
+        return schema
+    if depth < 3 and kind < 0.5:
+        schema = {"type": "array", "items": _random_schema(rng, depth + 1)}
+        if rng.random() < 0.3:
+            schema["minItems"] = 1
+        if rng.random() < 0.5:
+            schema["uniqueItems"] = True
+        return schema
+    if kind < 0.6:
+        return {"enum": [1, "x", None, True]}
+    if kind < 0.7:
+        return {"const": rng.choice([1, 1.0, True, [1], {"a": 1}])}
+    if kind < 0.8:
+        return {"type": rng.choice(["number", "integer"]), "minimum": 0, "exclusiveMaximum": 5}
+    if kind < 0.88:
+        return {"type": "string", "maxLength": 3, "pattern": "^a"}
+    if depth < 3:
+        keyword = rng.choice(["anyOf", "oneOf", "allOf"])
+        return {keyword: [_random_schema(rng, depth + 1), _random_schema(rng, depth + 1)]}
+    return {"type": ["string", "null"]}
+
+
+def _random_document(rng: random.Random, depth: int = 0):
+    kind = rng.random()
+    if depth < 3 and kind < 0.3:
+        return {name: _random_document(rng, depth + 1) for name in rng.sample("abcde", rng.randint(0, 4))}
+    if depth < 3 and kind < 0.5:
+        return [_random_document(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    return rng.choice(_SCALARS)
+
+
+def test_matches_draft7_validator_on_random_schemas():
+    rng = random.Random(7)
+    validator = Validator()
+    mismatches = []
+    for _ in range(3000):
+        schema = _random_schema(rng)
+        document = _random_document(rng)
+        expected = jsonschema.Draft7Validator(schema).is_valid(document)
+        valid, _ = validator.validate_json_against_schema(document, schema)
+        if valid != expected:
+            mismatches.append((schema, document, expected))
+    assert not mismatches, mismatches[:3]
+
+
+@pytest.mark.parametrize("items, unique", [
+    ([1, 1.0], False),
+    ([[1], [1.0]], False),
+    ([{"a": 1}, {"a": 1.0}], False),
+    ([1, True], True),
+    ([0, False], True),
+    ([{"a": 1}, {"a": True}], True),
+    (["1", 1], True),
+])
+def test_unique_items_uses_json_equality(items, unique):
+    compiled = Validator().compile_schema({"type": "array", "uniqueItems": True})
+    assert compiled.is_valid(items) is unique
+    assert jsonschema.Draft7Validator({"uniqueItems": True}).is_valid(items) is unique
+
+
+def test_errors_carry_json_paths():
+    schema = json.loads((DATA_DIR / "schemas" / "cognition_sequence.json").read_text())
+    document = json.loads((DATA_DIR / "sequences" / "example_sequence.json").read_text())
+    validator = Validator()
+    assert validator.validate_json_against_schema(document, schema) == (True, [])
+
+    document["rows"][1]["beliefs"][0]["confidence"] = 1.5
+    del document["rows"][2]["goal"]
+    valid, errors = validator.validate_json_against_schema(document, schema)
+    assert not valid
+    assert any(error.startswith("$.rows[1].beliefs[0].confidence:") for error in errors)
+    assert any(error.startswith("$.rows[2]:") and "goal" in error for error in errors)
+
+
+def test_compiled_schemas_are_cached_by_identity_and_content():
+    validator = Validator(max_compiled_schemas=2)
+    schema = {"type": "object", "required": ["a"]}
+    compiled = validator.compile_schema(schema)
+    assert validator.compile_schema(schema) is compiled
+    assert validator.compile_schema(json.loads(json.dumps(schema))) is compiled
+
+    for index in range(3):
+        validator.compile_schema({"type": "object", "required": [str(index)]})
+    assert validator.compile_schema(dict(schema)) is not compiled
@@ -1,3 +1,4 @@
+import asyncio
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,6 +7,13 @@ from fastapi.responses import RedirectResponse
 from app.api import api_router
 from app.core.utils.config import settings
 from app.core.utils.logger import app_logger
+from app.services.llm.client import llm_client
+from app.core.engine.jobs import job_manager
+from app.services.memory.row_index import row_index
+from app.services.memory.storage import sequence_store
+from app.services.memory.segments import segment_log
+from app.services.memory.similarity import similarity_index
+from app.services.memory.sequences import sequence_repository
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
@@ -39,10 +47,29 @@ def create_app() -> FastAPI:
         app_logger.info(f"Starting {settings.APP_NAME} API")
         app_logger.info(f"API documentation available at http://{settings.HOST}:{settings.PORT}/docs")
         app_logger.info(f"LLM provider: {settings.LLM_PROVIDER}, model: {settings.LLM_MODEL}")
+        await row_index.aload()
+        await sequence_store.start()
+        if settings.SEGMENT_ARCHIVE_ENABLED:
+            # Re-indexes only the records written after the last index entry
+            await asyncio.to_thread(segment_log.load)
+        if settings.SIMILARITY_ENABLED:
+            if similarity_index.available:
+                await asyncio.to_thread(similarity_index.load)
+                backfilled = await asyncio.to_thread(sequence_repository.backfill_similarity)
+                if backfilled:
+                    app_logger.info(f"Added {backfilled} stored rows to the similarity index")
+            else:
+                app_logger.warning("SIMILARITY_ENABLED is set but the 'numpy' package is not installed; the similarity index is disabled")
+        await llm_client.start()
+        await job_manager.start()
     
     @app.on_event("shutdown")
     async def shutdown_event():
         app_logger.info(f"Shutting down {settings.APP_NAME} API")
+        await job_manager.stop()
+        await llm_client.close()
+        sequence_store.close()
+        segment_log.close()
     
     return app
 